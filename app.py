@@ -1,47 +1,89 @@
 import streamlit as st
 import os
+import re
+import time
+import uuid
+import pandas as pd
 from dotenv import load_dotenv
-from twilio.rest import Client
-from twilio.twiml.voice_response import VoiceResponse
-from groq import Groq
-import requests
-from elevenlabs import VoiceSettings
-from elevenlabs.client import ElevenLabs
-import tempfile
+
+from outbound import notices
+from outbound.call_status import get_call_status_store
+from outbound.caller_id import caller_id_stats
+from outbound.calls import reconcile_campaign, serve_metrics
+from outbound.config import configure, load_settings
+from outbound.importer import import_recipients
+from outbound.jobs import DONE, FAILED, IN_FLIGHT, PAUSED, PENDING, RUNNABLE_STATES, SENT, get_campaign_worker
+from outbound.languages import LANGUAGE_ALIASES, LANGUAGE_LABELS, LANGUAGES_BY_CODE
+from outbound.metrics import CALL_RATE, CALLS, FALLBACKS, STAGE_SECONDS, stage_summary, timed
+from outbound.personalize import PersonalizedMessage, template_slots
+from outbound.phone_numbers import normalize_number
+from outbound.prewarm import FAILED as PREWARM_FAILED, READY as PREWARM_READY, get_prewarmer
+from outbound.recipients import CallingList, Recipient
+from outbound.resilience import resilience_stats
+from outbound.shared_cache import shared_cache_stats
+from outbound.translation import translate_text_groq
+from outbound.tts import generate_and_publish_elevenlabs_audio, preview_audio
+from outbound.tts_router import tts_router_stats
+
+# Full reruns are timed as the "page" stage (see the Performance section); fragments time themselves
+page_started = time.perf_counter()
+
+# Page configuration (must be the first Streamlit command)
+st.set_page_config(
+    page_title="Outbound Call Demo",
+    page_icon="📞",
+    layout="centered",
+    initial_sidebar_state="collapsed"
+)
 
 # Load environment variables
 load_dotenv()
 
 # Function to get secrets (works for both local .env and Streamlit Cloud)
 def get_secret(key):
-    # Try Streamlit secrets first (for Streamlit Cloud)
+    # Try Streamlit secrets first (for Streamlit Cloud); without a secrets.toml, st.secrets[key]
+    # would put a "No secrets files found" error in the page for every key
     try:
-        return st.secrets[key]
+        if st.secrets.load_if_toml_exists():
+            return st.secrets[key]
     except:
-        # Fall back to environment variables (for local development)
-        return os.getenv(key)
+        pass
+    # Fall back to environment variables (for local development)
+    return os.getenv(key)
 
-# Twilio configuration
-TWILIO_ACCOUNT_SID = get_secret("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = get_secret("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = get_secret("TWILIO_PHONE_NUMBER")
+# Function to read the settings for Twilio, Groq, ElevenLabs, caches and dispatch (see README for the keys)
+# once per process: configuring on every rerun would reread every key and reset the provider guards
+@st.cache_resource(show_spinner=False)
+def load_app_settings():
+    return configure(load_settings(get_secret))
 
-# Groq configuration
-GROQ_API_KEY = get_secret("GROQ_API_KEY")
+settings = load_app_settings()
 
-# ElevenLabs configuration
-ELEVENLABS_API_KEY = get_secret("ELEVENLABS_API_KEY")
+# Campaigns run on a background worker, outside the rerun cycle; jobs a crashed process left running resume here
+campaign_worker = get_campaign_worker(settings.job_store_path, settings.job_batch_size)
 
-# Page configuration
-st.set_page_config(
-    page_title="Outbound Call Demo",
-    page_icon="📞",
-    layout="centered",
-    initial_sidebar_state="collapsed"
-)
+# The message being edited is translated and synthesized in the background, so sending starts dialing at once
+prewarmer = get_prewarmer(settings.prewarm_debounce, settings.personalized_playback) if settings.prewarm_enabled else None
+# How often the page checks on that preparation, in seconds
+PREWARM_POLL_SECONDS = 1.0
+
+# Prometheus metrics for scraping (the same numbers are summarized at the bottom of the page)
+if settings.metrics_enabled:
+    try:
+        serve_metrics()
+    except OSError as e:
+        st.warning(f"Metrics endpoint could not start: {e}")
+
+# Function to show provider warnings in the page. Handlers belong to the thread that sets them, and
+# every rerun (of the page or of a fragment) runs on a new script thread, so each one sets them;
+# warnings from background threads are logged
+def show_notices_in_page():
+    notices.set_handlers(warning=st.warning, error=st.error)
+
+show_notices_in_page()
 
 # Custom CSS to match React app exactly
-st.markdown("""
+PAGE_STYLE = """
 <style>
     /* Main app styling */
     .stApp {
@@ -151,23 +193,6 @@ st.markdown("""
     }
     
     /* Phone number list styling */
-    .phone-list-item {
-        background: #ffffff;
-        color: #000000;
-        border: 2px solid #e7000b;
-        border-radius: 8px;
-        padding: 15px;
-        margin: 8px 0;
-        font-weight: 500;
-        transition: all 0.3s ease;
-    }
-    
-    .phone-list-item:hover {
-        background: #f8f8f8;
-        transform: translateX(8px);
-        box-shadow: 0 4px 15px rgba(231, 0, 11, 0.4);
-    }
-    
     .empty-list {
         text-align: center;
         color: #ffffff;
@@ -305,7 +330,24 @@ st.markdown("""
         border: 2px solid #999999 !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Header (matching React app exactly)
+PAGE_HEADER = """
+<div class="main-header">
+    <h1>Outbound Call Demo</h1>
+    <p>Automated Reminder System</p>
+</div>
+"""
+
+# Function to strip comments and indentation from static HTML, once per process (every rerun sends the page's
+# markdown to the browser again, and the style sheet is the largest element)
+@st.cache_resource(show_spinner=False)
+def compact_html(html):
+    html = re.sub(r"/\*.*?\*/", "", html, flags=re.DOTALL)
+    return re.sub(r"\s*\n\s*", " ", html).strip()
+
+st.markdown(compact_html(PAGE_STYLE), unsafe_allow_html=True)
 
 # Country codes data (matching React app)
 COUNTRY_CODES = [
@@ -322,211 +364,53 @@ COUNTRY_CODES = [
     {"code": "+971", "country": "UAE", "flag": "🇦🇪"},
     {"code": "+65", "country": "Singapore", "flag": "🇸🇬"}
 ]
+# Selector labels ("🇮🇳 +91 India") and names, by country code
+COUNTRY_LABELS = {c["code"]: f"{c['flag']} {c['code']} {c['country']}" for c in COUNTRY_CODES}
+COUNTRY_NAMES = {c["code"]: c["country"] for c in COUNTRY_CODES}
 
-# Languages with TTS provider info
-LANGUAGES = [
-    # Indian Languages (ElevenLabs - Multi-lingual support)
-    {"code": "en-IN", "name": "English (India)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam
-    {"code": "hi-IN", "name": "Hindi (हिंदी)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    {"code": "ta-IN", "name": "Tamil (தமிழ்)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    {"code": "te-IN", "name": "Telugu (తెలుగు)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    {"code": "bn-IN", "name": "Bengali (বাংলা)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    {"code": "mr-IN", "name": "Marathi (मराठी)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    {"code": "gu-IN", "name": "Gujarati (ગુજરાતી)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    {"code": "kn-IN", "name": "Kannada (ಕನ್ನಡ)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    {"code": "ml-IN", "name": "Malayalam (മലയാളം)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
-    
-    # International Languages (Twilio Polly)
-    {"code": "en-US", "name": "English (US)", "flag": "🇺🇸", "voice": "alice", "provider": "twilio"},
-    {"code": "en-GB", "name": "English (UK)", "flag": "🇬🇧", "voice": "Polly.Amy", "provider": "twilio"},
-    {"code": "es-ES", "name": "Spanish (Español)", "flag": "🇪🇸", "voice": "Polly.Conchita", "provider": "twilio"},
-    {"code": "fr-FR", "name": "French (Français)", "flag": "🇫🇷", "voice": "Polly.Celine", "provider": "twilio"},
-    {"code": "de-DE", "name": "German (Deutsch)", "flag": "🇩🇪", "voice": "Polly.Marlene", "provider": "twilio"},
-    {"code": "pt-BR", "name": "Portuguese (Brazil)", "flag": "🇧🇷", "voice": "Polly.Vitoria", "provider": "twilio"}
-]
+# A recipient's preferred language: the campaign language (None) or one of the call languages
+PREFERENCE_OPTIONS = [None] + list(LANGUAGE_LABELS)
 
-# Function to translate text using Groq
-def translate_text_groq(text, target_language):
-    try:
-        if not GROQ_API_KEY:
-            st.error("❌ Groq API key not found! Translation disabled.")
-            return text  # Return original if no API key
-        
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        # Language mapping for better translation prompts
-        language_names = {
-            "en-IN": "English",
-            "hi-IN": "Hindi",
-            "ta-IN": "Tamil",
-            "te-IN": "Telugu",
-            "bn-IN": "Bengali",
-            "mr-IN": "Marathi",
-            "gu-IN": "Gujarati",
-            "kn-IN": "Kannada",
-            "ml-IN": "Malayalam",
-            "en-US": "English",
-            "en-GB": "English",
-            "es-ES": "Spanish",
-            "fr-FR": "French",
-            "de-DE": "German",
-            "pt-BR": "Portuguese"
-        }
-        
-        target_lang_name = language_names.get(target_language, "English")
-        
-        # Skip translation if already in English
-        if target_lang_name == "English":
-            return text
-        
-        # Use Groq's LLM for translation
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are a professional translator specializing in {target_lang_name}. Translate the following English text to {target_lang_name}. Provide ONLY the {target_lang_name} translation, no explanations or English text."
-                },
-                {
-                    "role": "user",
-                    "content": f"Translate this to {target_lang_name}:\n\n{text}"
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=2048
-        )
-        
-        translated_text = chat_completion.choices[0].message.content.strip()
-        
-        # Debug: Show what was returned
-        if translated_text == text or translated_text.lower() == text.lower():
-            st.warning(f"⚠️ Translation may have failed. Groq returned same text.")
-        
-        return translated_text
-        
-    except Exception as e:
-        st.warning(f"Translation failed: {str(e)}. Using original text.")
-        return text
-
-# Function to generate speech using ElevenLabs TTS
-def generate_elevenlabs_tts(text, voice_id):
-    try:
-        if not ELEVENLABS_API_KEY:
-            return None
-        
-        # Initialize ElevenLabs client
-        client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-        
-        # Generate speech
-        response = client.text_to_speech.convert(
-            voice_id=voice_id,
-            optimize_streaming_latency="0",
-            output_format="mp3_22050_32",
-            text=text,
-            model_id="eleven_multilingual_v2",  # Supports 29 languages including Indian languages
-            voice_settings=VoiceSettings(
-                stability=0.5,
-                similarity_boost=0.75,
-                style=0.0,
-                use_speaker_boost=True,
-            ),
-        )
-        
-        # Save audio to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
-            for chunk in response:
-                if chunk:
-                    temp_audio.write(chunk)
-            return temp_audio.name
-            
-    except Exception as e:
-        st.warning(f"ElevenLabs TTS failed: {str(e)}. Falling back to Twilio.")
-        return None
+# Reminder in section 3 until it is edited
+DEFAULT_MESSAGE = (
+    "Hello, this is an automated payment reminder from Prime Financial Bank. "
+    "Your loan account number PF123456789 has an upcoming EMI payment due on 15th November 2025. "
+    "The EMI amount is Rupees 25,000. Your outstanding loan balance is Rupees 4,50,000. "
+    "Please ensure the payment is made on or before the due date to avoid late payment charges of Rupees 500 "
+    "and impact on your credit score. You can make the payment through our mobile app, internet banking, "
+    "or visit the nearest branch. For any queries, please call our customer care at 1800-555-0123. "
+    "Thank you for banking with Prime Financial Bank."
+)
 
-# Function to upload audio to tmpfiles.org (more reliable temporary hosting)
-def upload_audio_to_tmpfiles(audio_file_path):
-    try:
-        with open(audio_file_path, 'rb') as f:
-            files = {'file': f}
-            response = requests.post('https://tmpfiles.org/api/v1/upload', files=files)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('status') == 'success':
-                    # tmpfiles.org returns URL like: https://tmpfiles.org/12345
-                    # We need to convert it to direct download: https://tmpfiles.org/dl/12345
-                    url = data.get('data', {}).get('url', '')
-                    if url:
-                        # Convert to direct download URL
-                        direct_url = url.replace('tmpfiles.org/', 'tmpfiles.org/dl/')
-                        return direct_url
-        return None
-    except Exception as e:
-        st.warning(f"Audio upload failed: {str(e)}")
-        return None
+# Sample values for previewing a personalized template when no recipient has them
+SAMPLE_RECIPIENT = Recipient(
+    "+910000000000", None, "Customer", "25,000", "15th November 2025", "PF123456789"
+)
 
-# Function to make Twilio call with multi-lingual support
-def make_twilio_call(to_number, message, language_code="en-IN", voice="alice", provider="twilio"):
-    try:
-        # Initialize Twilio client
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        
-        if provider == "elevenlabs":
-            # Check if we have cached audio URL
-            if st.session_state.cached_audio_url:
-                # Use cached audio
-                twiml = VoiceResponse()
-                twiml.play(st.session_state.cached_audio_url)
-            else:
-                # Generate new audio
-                audio_file = generate_elevenlabs_tts(message, voice)
-                
-                if audio_file:
-                    # Upload audio to temporary hosting
-                    audio_url = upload_audio_to_tmpfiles(audio_file)
-                    
-                    if audio_url:
-                        # Cache the URL
-                        st.session_state.cached_audio_url = audio_url
-                        st.session_state.cached_audio_file = audio_file
-                        
-                        # Create TwiML with audio playback
-                        twiml = VoiceResponse()
-                        twiml.play(audio_url)
-                    else:
-                        # Fallback to Twilio TTS if upload fails
-                        st.warning("Audio upload failed. Using Twilio TTS fallback.")
-                        twiml = VoiceResponse()
-                        twiml.say(message, language=language_code)
-                else:
-                    # Fallback to Twilio TTS
-                    twiml = VoiceResponse()
-                    twiml.say(message, language=language_code)
-        else:
-            # Use Twilio Polly voices
-            twiml = VoiceResponse()
-            twiml.say(message, voice=voice, language=language_code)
-        
-        # Make the call
-        call = client.calls.create(
-            to=to_number,
-            from_=TWILIO_PHONE_NUMBER,
-            twiml=str(twiml)
-        )
-        
-        return {
-            "success": True, 
-            "sid": call.sid, 
-            "status": call.status,
-            "to": to_number,
-            "from": TWILIO_PHONE_NUMBER
-        }
-        
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+# Function to find the calling-list numbers matching a search (None without one), reusing the last
+# result until the query or the list changes
+def calling_list_matches(calling_list, query):
+    cache_key = (id(calling_list), calling_list.version, query.strip().lower())
+    cached = st.session_state.get("calling_list_matches")
+    if cached is None or cached[0] != cache_key:
+        cached = (cache_key, calling_list.search(query) if cache_key[2] else None)
+        st.session_state.calling_list_matches = cached
+    return cached[1]
+
+# Function to label a recipient's preferred language for the calling list
+def preferred_language_label(language_code):
+    return LANGUAGE_LABELS.get(language_code, "🌐 Campaign language")
+
+# Function to rerun the whole page when a change made in a fragment shows outside it: SEND ALL REMINDERS
+# is disabled while the list is empty, and the status message is at the bottom of the page
+def rerun_page_if_changed(list_was_empty, status_before):
+    list_is_empty = len(st.session_state.calling_list) == 0
+    if list_is_empty != list_was_empty or st.session_state.status_message != status_before:
+        st.rerun()
 
 # Initialize session state
-if 'phone_numbers' not in st.session_state:
-    st.session_state.phone_numbers = []
+if 'calling_list' not in st.session_state:
+    st.session_state.calling_list = CallingList()  # indexed by number, keeps per-recipient fields
 if 'status_message' not in st.session_state:
     st.session_state.status_message = ""
 if 'selected_language' not in st.session_state:
@@ -534,161 +418,296 @@ if 'selected_language' not in st.session_state:
 if 'translated_message' not in st.session_state:
     st.session_state.translated_message = ""
 if 'cached_audio_file' not in st.session_state:
-    st.session_state.cached_audio_file = None
+    st.session_state.cached_audio_file = None  # AudioBuffer behind cached_audio_url
 if 'cached_audio_url' not in st.session_state:
     st.session_state.cached_audio_url = None
+if 'prewarm_session' not in st.session_state:
+    st.session_state.prewarm_session = uuid.uuid4().hex  # this session's background preparation
+if 'prewarm_request' not in st.session_state:
+    st.session_state.prewarm_request = None  # (message, text, language code) being prepared
+if 'prewarm_key' not in st.session_state:
+    st.session_state.prewarm_key = None  # its Prewarmer key
+if 'prewarm_polling' not in st.session_state:
+    st.session_state.prewarm_polling = False  # whether its progress is being polled
+if 'campaign_id' not in st.session_state:
+    st.session_state.campaign_id = None  # last campaign job queued from this session
+
+# Section 1 and the calling list rerun on their own: adding a number, searching or turning a page does
+# not redraw the rest of the page
+@st.fragment
+@timed("page_recipients")
+def recipients_section():
+    show_notices_in_page()
+    calling_list = st.session_state.calling_list
+    list_was_empty = len(calling_list) == 0
+    status_before = st.session_state.status_message
 
-# Main app
-def main():
-    # Header (matching React app exactly)
-    st.markdown("""
-    <div class="main-header">
-        <h1>Outbound Call Demo</h1>
-        <p>Automated Reminder System</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
     # Section 1: Add Customer Phone Numbers
     with st.container():
         st.markdown('<div class="section-box"><h3>1. Add Customer Phone Numbers</h3>', unsafe_allow_html=True)
-        
-        col1, col2, col3 = st.columns([2.5, 4, 1.5])
-        
+
+        col1, col2, col3, col4 = st.columns([2.5, 3, 2.5, 1.5])
+
         with col1:
-            # Country code dropdown
-            country_options = [f"{c['flag']} {c['code']} {c['country']}" for c in COUNTRY_CODES]
-            selected_country = st.selectbox(
+            # Country code dropdown (defaults to India)
+            country_code = st.selectbox(
                 "Country Code",
-                options=country_options,
-                index=0,  # Default to India
+                options=list(COUNTRY_LABELS),
+                index=0,
+                format_func=COUNTRY_LABELS.get,
                 label_visibility="collapsed",
                 key="country_select"
             )
-            # Extract country code
-            country_code = selected_country.split()[1]  # Gets "+91" from "🇮🇳 +91 India"
-        
+
         with col2:
             phone_number = st.text_input(
                 "Phone Number",
-                placeholder="Enter 10-digit number",
-                max_chars=10,
+                placeholder="Enter phone number",
+                max_chars=20,
                 label_visibility="collapsed",
                 key="phone_input"
             )
-        
+
         with col3:
+            # Preferred language for this recipient (defaults to the campaign language in section 2)
+            preferred_language = st.selectbox(
+                "Preferred Language",
+                options=PREFERENCE_OPTIONS,
+                index=0,
+                format_func=preferred_language_label,
+                label_visibility="collapsed",
+                key="recipient_language_select"
+            )
+
+        with col4:
             if st.button("Add to List", use_container_width=True, key="add_btn"):
-                if phone_number and len(phone_number) == 10 and phone_number.isdigit():
-                    full_number = f"{country_code}{phone_number}"
-                    if full_number not in st.session_state.phone_numbers:
-                        st.session_state.phone_numbers.append(full_number)
+                # Checked against the selected country's number lengths; a leading 0 or the country code is accepted
+                full_number = normalize_number(phone_number, country_code) if phone_number else None
+                if full_number:
+                    if calling_list.add(Recipient(full_number, preferred_language)):
                         st.session_state.status_message = ""
-                        st.rerun()
                     else:
                         st.session_state.status_message = f"Number {full_number} is already in the list."
                 else:
-                    st.session_state.status_message = "Please enter a valid 10-digit phone number."
-        
+                    st.session_state.status_message = f"Please enter a valid phone number for {COUNTRY_NAMES[country_code]}."
+                # The calling list below already shows the new number
+                rerun_page_if_changed(list_was_empty, status_before)
+
+        # Bulk import: rows are validated and normalized in chunks straight into the indexed list
+        with st.expander("📂 Import recipients (CSV / TSV / Excel)"):
+            st.caption(
+                "Columns: phone (required), country_code, language, name, amount, due_date. "
+                "Numbers without a country code use the code selected above."
+            )
+            uploaded_file = st.file_uploader(
+                "Recipients file",
+                type=["csv", "tsv", "txt", "xlsx"],
+                label_visibility="collapsed",
+                key="recipients_file"
+            )
+            if uploaded_file is not None and st.button("Import", key="import_btn"):
+                import_status = st.empty()
+                try:
+                    report = import_recipients(
+                        uploaded_file,
+                        uploaded_file.name,
+                        calling_list,
+                        default_country_code=country_code,
+                        language_aliases=LANGUAGE_ALIASES,
+                        on_progress=lambda r: import_status.text(f"Imported {r.added:,} of {r.rows:,} rows...")
+                    )
+                except ValueError as e:
+                    st.session_state.status_message = f"Import failed: {e}"
+                else:
+                    message_parts = [f"Imported {report.added:,} numbers"]
+                    if report.duplicates:
+                        message_parts.append(f"{report.duplicates:,} duplicates skipped")
+                    if report.invalid:
+                        first_row, first_error = report.errors[0]
+                        message_parts.append(f"{report.invalid:,} invalid rows (row {first_row}: {first_error})")
+                    st.session_state.status_message = "; ".join(message_parts) + "."
+                rerun_page_if_changed(list_was_empty, status_before)
+
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
     # Calling List Section
     with st.container():
         st.markdown('<div class="section-box"><h3>Calling List</h3>', unsafe_allow_html=True)
-        
-        if len(st.session_state.phone_numbers) == 0:
+
+        if len(calling_list) == 0:
             st.markdown('<p class="empty-list">No numbers added yet.</p>', unsafe_allow_html=True)
         else:
-            for i, number in enumerate(st.session_state.phone_numbers):
-                col1, col2 = st.columns([6, 1])
-                with col1:
-                    st.markdown(f'<div class="phone-list-item">{number}</div>', unsafe_allow_html=True)
-                with col2:
-                    if st.button("×", key=f"remove_{i}", help="Remove number"):
-                        st.session_state.phone_numbers.remove(number)
+            # Only the visible page goes to the browser, so a rerun costs the same at 100 or 100,000 numbers
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                search_query = st.text_input(
+                    "Search",
+                    placeholder="Search by number, name or account",
+                    label_visibility="collapsed",
+                    key="list_search"
+                )
+            with col2:
+                page_size = st.selectbox(
+                    "Rows per page",
+                    options=[25, 50, 100, 250],
+                    index=1,
+                    label_visibility="collapsed",
+                    help="Rows per page",
+                    key="list_page_size"
+                )
+
+            matches = calling_list_matches(calling_list, search_query)
+            match_count = len(calling_list) if matches is None else len(matches)
+            page_count = max(1, -(-match_count // page_size))
+            if st.session_state.get("list_page", 1) > page_count:
+                st.session_state.list_page = page_count
+            offset = (st.session_state.get("list_page", 1) - 1) * page_size
+            if matches is None:
+                page_recipients = calling_list.page(offset, page_size)
+            else:
+                page_recipients = [calling_list.get(number) for number in matches[offset:offset + page_size]]
+
+            select_page = st.checkbox("Select all on this page", key="list_select_page")
+            edited_rows = st.data_editor(
+                pd.DataFrame({
+                    "selected": [select_page] * len(page_recipients),
+                    "number": [recipient.number for recipient in page_recipients],
+                    "language": [preferred_language_label(recipient.language) for recipient in page_recipients],
+                    "name": [recipient.name or "" for recipient in page_recipients],
+                }).astype({"selected": bool}),  # keeps the checkbox column valid on an empty page
+                column_config={
+                    "selected": st.column_config.CheckboxColumn("", width="small"),
+                    "number": st.column_config.TextColumn("Number"),
+                    "language": st.column_config.TextColumn("Language"),
+                    "name": st.column_config.TextColumn("Name"),
+                },
+                disabled=["number", "language", "name"],
+                hide_index=True,
+                use_container_width=True,
+                # A new key whenever the rows change, so ticks never carry over to other numbers
+                key=f"list_editor_{calling_list.version}_{offset}_{page_size}_{search_query}_{select_page}"
+            )
+            selected_numbers = edited_rows.loc[edited_rows["selected"], "number"].tolist()
+
+            col1, col2, col3, col4 = st.columns([1.5, 2.5, 2, 2])
+            with col1:
+                st.number_input(
+                    "Page",
+                    min_value=1,
+                    max_value=page_count,
+                    step=1,
+                    label_visibility="collapsed",
+                    key="list_page"
+                )
+            with col2:
+                if match_count:
+                    scope = "matching numbers" if matches is not None else "numbers"
+                    st.caption(f"{offset + 1:,}–{offset + len(page_recipients):,} of {match_count:,} {scope} ({page_count:,} pages)")
+                else:
+                    st.caption("No matching numbers.")
+            # The list is drawn above these buttons, so removing numbers reruns the page
+            with col3:
+                if st.button(f"Remove selected ({len(selected_numbers)})", disabled=not selected_numbers,
+                             use_container_width=True, key="remove_selected_btn"):
+                    calling_list.remove_many(selected_numbers)
+                    st.rerun()
+            with col4:
+                if matches is not None:
+                    if st.button(f"Remove {match_count:,} matching", disabled=not match_count,
+                                 use_container_width=True, key="remove_matching_btn"):
+                        calling_list.remove_many(matches)
                         st.rerun()
-        
+                elif st.button("Clear list", use_container_width=True, key="clear_list_btn"):
+                    calling_list.clear()
+                    st.rerun()
+
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
+# Sections 2 and 3 (language and message) rerun on their own while the message is edited; SEND ALL
+# REMINDERS reads what they leave in the session state
+@st.fragment
+@timed("page_message")
+def message_section():
+    show_notices_in_page()
     # Section 2: Select Language
     with st.container():
         st.markdown('<div class="section-box"><h3>2. Select Language for Call</h3>', unsafe_allow_html=True)
-        
-        language_options = [f"{lang['flag']} {lang['name']}" for lang in LANGUAGES]
-        selected_language_display = st.selectbox(
+
+        st.session_state.selected_language = st.selectbox(
             "Language",
-            options=language_options,
+            options=list(LANGUAGE_LABELS),
             index=0,  # Default to English (India)
+            format_func=LANGUAGE_LABELS.get,
             label_visibility="collapsed",
             key="language_select"
         )
-        
-        # Extract language code
-        selected_lang_index = language_options.index(selected_language_display)
-        st.session_state.selected_language = LANGUAGES[selected_lang_index]["code"]
-        selected_voice = LANGUAGES[selected_lang_index]["voice"]
-        
+        selected_lang_obj = LANGUAGES_BY_CODE[st.session_state.selected_language]
+
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
     # Section 3: Review Reminder Message
     with st.container():
         st.markdown('<div class="section-box"><h3>3. Review Reminder Message</h3>', unsafe_allow_html=True)
-        
-        default_message = (
-            "Hello, this is an automated payment reminder from Prime Financial Bank. "
-            "Your loan account number PF123456789 has an upcoming EMI payment due on 15th November 2025. "
-            "The EMI amount is Rupees 25,000. Your outstanding loan balance is Rupees 4,50,000. "
-            "Please ensure the payment is made on or before the due date to avoid late payment charges of Rupees 500 "
-            "and impact on your credit score. You can make the payment through our mobile app, internet banking, "
-            "or visit the nearest branch. For any queries, please call our customer care at 1800-555-0123. "
-            "Thank you for banking with Prime Financial Bank."
-        )
-        
+
         message = st.text_area(
             "Message",
-            value=default_message,
+            value=DEFAULT_MESSAGE,
             height=140,
             label_visibility="collapsed",
             key="message_input"
         )
-        
-        # Translate and Generate Audio buttons
+        st.caption(
+            "Personalize per recipient with {name}, {account}, {amount} and {due_date} "
+            "(filled from imported columns)."
+        )
+
+        # Translate and Generate Audio buttons (their results are shown further down in this section)
         col1, col2, col3 = st.columns([2, 1, 1])
         with col2:
             if st.button("🌐 Translate", use_container_width=True, key="translate_btn"):
                 with st.spinner("Translating..."):
                     st.session_state.translated_message = translate_text_groq(
-                        message, 
+                        message,
                         st.session_state.selected_language
                     )
                     # Clear cached audio when translating
                     st.session_state.cached_audio_url = None
                     st.session_state.cached_audio_file = None
-                    st.rerun()
-        
+
         with col3:
             # Show generate audio button for ElevenLabs languages
-            selected_lang_obj = next((l for l in LANGUAGES if l["code"] == st.session_state.selected_language), None)
-            if selected_lang_obj and selected_lang_obj["provider"] == "elevenlabs":
+            if selected_lang_obj["provider"] == "elevenlabs":
                 if st.button("🎙️ Generate Audio", use_container_width=True, key="generate_audio_btn"):
                     with st.spinner("Generating audio..."):
                         final_msg = st.session_state.translated_message if st.session_state.translated_message else message
-                        audio_file = generate_elevenlabs_tts(final_msg, selected_lang_obj["voice"])
-                        
-                        if audio_file:
-                            audio_url = upload_audio_to_tmpfiles(audio_file)
-                            if audio_url:
-                                st.session_state.cached_audio_url = audio_url
-                                st.session_state.cached_audio_file = audio_file
-                                st.success("✅ Audio generated and cached!")
-                                
-                                # Show audio player
-                                with open(audio_file, 'rb') as f:
-                                    st.audio(f.read(), format='audio/mp3')
-                            else:
-                                st.error("Failed to upload audio")
+                        if template_slots(message):
+                            # Personalized template: synthesize the static segments and preview the first recipient
+                            preview_recipient = next(iter(st.session_state.calling_list), SAMPLE_RECIPIENT)
+                            try:
+                                personalized = PersonalizedMessage(message, selected_lang_obj, playback="stitched")
+                                st.success("✅ Template audio generated and cached!")
+                                st.caption(f"Preview for {preview_recipient.name or preview_recipient.number}")
+                                preview_data, preview_format = preview_audio(personalized.audio_for(preview_recipient))
+                                st.audio(preview_data, format=preview_format)
+                            except Exception as e:
+                                st.error(f"Failed to generate audio: {e}")
                         else:
-                            st.error("Failed to generate audio")
-        
+                            audio, audio_url = generate_and_publish_elevenlabs_audio(final_msg, selected_lang_obj["voice"])
+
+                            if audio:
+                                if audio_url:
+                                    st.session_state.cached_audio_url = audio_url
+                                    st.session_state.cached_audio_file = audio
+                                    st.success("✅ Audio generated and cached!")
+
+                                    # Show audio player (MP3 shares the published buffer; telephony WAV is decoded for browsers)
+                                    preview_data, preview_format = preview_audio(audio)
+                                    st.audio(preview_data, format=preview_format)
+                                else:
+                                    st.error("Failed to publish audio")
+                            else:
+                                st.error("Failed to generate audio")
+
         # Show translated message if available
         if st.session_state.translated_message and st.session_state.selected_language != "en-IN":
             st.markdown("**Translated Message:**")
@@ -700,88 +719,274 @@ def main():
                 key="translated_display",
                 disabled=True
             )
-        
+
         # Show cached audio status
         if st.session_state.cached_audio_url:
             st.success("✅ Audio ready for calls!")
-        
+
+        # Prepare what SEND ALL REMINDERS will send once edits pause; this session's older request is superseded.
+        # Only edits ask again: a failed preparation is not retried by every rerun
+        prewarm_request = (
+            message,
+            st.session_state.translated_message if st.session_state.translated_message else message,
+            selected_lang_obj["code"]
+        )
+        if prewarmer is not None and prewarm_request != st.session_state.prewarm_request:
+            first_request = st.session_state.prewarm_request is None
+            st.session_state.prewarm_request = prewarm_request
+            st.session_state.prewarm_key = prewarmer.request(*prewarm_args(prewarm_request))
+            # Its progress shows outside this section; without a poll running it only updates with the page
+            if not first_request and not st.session_state.prewarm_polling:
+                st.rerun()
+
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
+# Function to turn the session's preparation request into Prewarmer.request arguments
+def prewarm_args(prewarm_request):
+    message, text, language_code = prewarm_request
+    return message, text, LANGUAGES_BY_CODE[language_code], st.session_state.prewarm_session
+
+# Function to get the state of the session's background preparation; None when there is none
+def current_prewarm_status():
+    if prewarmer is None or st.session_state.prewarm_request is None:
+        return None
+    prewarm_status = prewarmer.status(st.session_state.prewarm_key)
+    if prewarm_status is None:
+        # Expired (or forgotten): prepared again. Failures are retried by the next edit, not by polling
+        st.session_state.prewarm_key = prewarmer.request(*prewarm_args(st.session_state.prewarm_request))
+        prewarm_status = prewarmer.status(st.session_state.prewarm_key)
+    return prewarm_status
+
+# Function to check whether the background preparation is still waiting or running
+def prewarm_pending(prewarm_status):
+    return prewarm_status is not None and prewarm_status.state not in (PREWARM_READY, PREWARM_FAILED)
+
+# Progress of the background preparation, checked again every PREWARM_POLL_SECONDS while it is pending.
+# Polls stop only with a full page run, so the page reruns once the preparation settles
+@st.fragment(run_every=PREWARM_POLL_SECONDS)
+def prewarm_poll():
+    prewarm_status = current_prewarm_status()
+    show_prewarm_status(prewarm_status)
+    if not prewarm_pending(prewarm_status):
+        st.rerun()
+
+# Function to show the progress of the background preparation
+def prewarm_section():
+    prewarm_status = current_prewarm_status()
+    st.session_state.prewarm_polling = prewarm_pending(prewarm_status)
+    if st.session_state.prewarm_polling:
+        prewarm_poll()
+    else:
+        show_prewarm_status(prewarm_status)
+
+# Function to show the state of the background preparation as a caption
+def show_prewarm_status(prewarm_status):
+    if prewarm_status is None:
+        return
+    if prewarm_status.state == PREWARM_READY:
+        st.caption("⚡ Message prepared: calls start as soon as you send.")
+    elif prewarm_status.state == PREWARM_FAILED:
+        st.caption(f"Background preparation failed ({prewarm_status.error}); the message is prepared when you send.")
+    else:
+        st.caption("⏳ Preparing translation and audio in the background...")
+
+# Section 5: Progress of the last campaign (or one still unfinished from an earlier session), and call
+# outcomes from status callbacks or reconciled with Twilio; refreshing it reruns only this section
+@st.fragment
+@timed("page_campaign")
+def campaign_section():
+    show_notices_in_page()
+    job_store = campaign_worker.store
+    job = job_store.get_job(st.session_state.campaign_id) if st.session_state.campaign_id else None
+    if job is None:
+        job = next((j for j in job_store.list_jobs(10) if j["state"] in RUNNABLE_STATES + (PAUSED,)), None)
+    if job is None:
+        return
+    job_id = job["id"]
+    st.markdown(f'<div class="section-box"><h3>Campaign {job_id}</h3>', unsafe_allow_html=True)
+
+    progress = job_store.counts(job_id)
+    finished = progress[SENT] + progress[FAILED]
+    st.progress(finished / job["total"] if job["total"] else 1.0)
+    st.caption(
+        f"{job['state'].capitalize()}: {progress[SENT]} placed, {progress[FAILED]} failed, "
+        f"{progress[PENDING] + progress[IN_FLIGHT]} to go (of {job['total']})"
+    )
+
+    # Actions run as callbacks, before the section is drawn again
+    outcome_col1, outcome_col2, outcome_col3 = st.columns(3)
+    with outcome_col1:
+        st.button("Refresh", use_container_width=True)
+    with outcome_col2:
+        if job["state"] in RUNNABLE_STATES:
+            st.button("Pause", use_container_width=True, on_click=campaign_worker.pause, args=(job_id,))
+        elif job["state"] == PAUSED:
+            st.button("Resume", use_container_width=True, on_click=campaign_worker.resume, args=(job_id,))
+        elif job["state"] == DONE and progress[FAILED]:
+            st.button("Retry failed", use_container_width=True, on_click=campaign_worker.retry_failed, args=(job_id,))
+    with outcome_col3:
+        if st.button("Check with Twilio", use_container_width=True):
+            try:
+                reconcile_campaign(job_id)
+            except Exception as e:
+                st.warning(f"Could not fetch call outcomes: {e}")
+
+    counts = get_call_status_store(settings.call_status_path).outcome_counts(job_id)
+    metric_cols = st.columns(5)
+    for col, (label, key) in zip(metric_cols, [
+        ("Answered", "answered"), ("Busy", "busy"), ("No answer", "no-answer"),
+        ("Failed", "failed"), ("Pending", "pending")
+    ]):
+        col.metric(label, counts[key])
+    if not settings.status_callback_base_url and counts["pending"]:
+        st.caption("Status callbacks need MEDIA_PUBLIC_BASE_URL; use Check with Twilio to update pending calls.")
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# Section 6: Where time goes, per stage and provider (this process only); refreshing it reruns only this section
+@st.fragment
+@timed("page_performance")
+def performance_section():
+    with st.expander("Performance"):
+        st.button("Refresh", key="performance_refresh_btn")
+        perf_col1, perf_col2, perf_col3 = st.columns(3)
+        perf_col1.metric("Calls/sec (last min)", f"{CALL_RATE.rate():.2f}")
+        perf_col2.metric("Calls placed / failed", f"{CALLS.value(result='placed')} / {CALLS.value(result='failed')}")
+        perf_col3.metric("Fallbacks to Twilio voice", sum(value for _, _, value in FALLBACKS.samples()))
+
+        # "page" is a full rerun of the app, "page_*" a section rerunning on its own
+        stages = stage_summary()
+        if stages:
+            st.table([
+                {
+                    "Stage": row["stage"],
+                    "Count": row["count"],
+                    "Errors": row["errors"],
+                    "Mean (ms)": round(row["mean_s"] * 1000),
+                    "p50 (ms)": round(row["p50_s"] * 1000),
+                    "p95 (ms)": round(row["p95_s"] * 1000),
+                    "In flight": row["in_flight"],
+                }
+                for row in stages
+            ])
+        else:
+            st.caption("No activity yet.")
+
+        providers = resilience_stats()
+        if providers:
+            st.table([
+                {
+                    "Provider": name,
+                    "Requests": stats["calls"],
+                    "Retries": stats["retries"],
+                    "Throttled": stats["throttled"],
+                    "Failed": stats["failures"],
+                    "Concurrency limit": stats["concurrency_limit"],
+                    "Breaker": stats["breaker"],
+                }
+                for name, stats in providers.items()
+            ])
+
+        shared_caches = shared_cache_stats()
+        if shared_caches:
+            st.table([
+                {
+                    "Shared cache": name,
+                    "Hits": stats["hits"],
+                    "Misses": stats["misses"],
+                    "Duplicate calls avoided": stats["hits"] + stats["coalesced"],
+                    "Waited on in-flight call": stats["coalesced"],
+                    "Memory (MB)": round(stats["bytes"] / (1024 * 1024), 1),
+                }
+                for name, stats in shared_caches.items()
+            ])
+
+        routing = tts_router_stats()
+        if routing["policy"] == "adaptive":
+            voice_used = f"Twilio voice (ElevenLabs {routing['degraded']})" if routing["degraded"] else "ElevenLabs"
+            latency = f"{routing['latency']:.1f}s" if routing["latency"] is not None else "n/a"
+            caption = f"ElevenLabs languages: {voice_used} · latency {latency}, errors {routing['error_rate']:.0%}"
+            if routing["hourly_budget"] is not None:
+                caption += f", {routing['spent_last_hour']:.2f} of {routing['hourly_budget']:g} spent in the last hour"
+            st.caption(caption)
+
+        senders = caller_id_stats()
+        if len(senders) > 1:
+            st.table([
+                {
+                    "Sender number": number,
+                    "Calls": stats["calls"],
+                    "In flight": stats["in_flight"],
+                    "Failed": stats["failures"],
+                    "Resting (s)": round(stats["resting_for"]),
+                }
+                for number, stats in senders.items()
+            ])
+        if settings.metrics_enabled:
+            st.caption(f"Prometheus metrics: http://{settings.media_server_host}:{settings.media_server_port}/metrics")
+
+# Main app
+def main():
+    st.markdown(compact_html(PAGE_HEADER), unsafe_allow_html=True)
+
+    recipients_section()
+    message_section()
+    prewarm_section()
+
     # Section 4: Send All Reminders
     st.markdown('<div class="send-all-button" style="margin: 30px 0;">', unsafe_allow_html=True)
-    
+
     send_button = st.button(
         "SEND ALL REMINDERS",
-        disabled=(len(st.session_state.phone_numbers) == 0),
+        disabled=(len(st.session_state.calling_list) == 0),
         use_container_width=True
     )
-    
+
     st.markdown('</div>', unsafe_allow_html=True)
-    
+
     if send_button:
-            if len(st.session_state.phone_numbers) == 0:
+            if len(st.session_state.calling_list) == 0:
                 st.session_state.status_message = "Please add at least one phone number to the list."
             else:
-                st.session_state.status_message = "Initiating calls... Please wait."
-                
                 # Use translated message if available, otherwise original
+                message = st.session_state.message_input
                 final_message = st.session_state.translated_message if st.session_state.translated_message else message
-                
-                # Progress tracking
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                call_results = []
-                total_numbers = len(st.session_state.phone_numbers)
-                
-                for i, number in enumerate(st.session_state.phone_numbers):
-                    # Update progress
-                    progress = (i + 1) / total_numbers
-                    progress_bar.progress(progress)
-                    status_text.text(f"Calling {number}... ({i+1}/{total_numbers})")
-                    
-                    # Extract just the phone number (remove country code for API)
-                    if number.startswith('+91'):
-                        api_number = number[3:]  # Remove +91
-                    elif number.startswith('+1'):
-                        api_number = number[2:]  # Remove +1
-                    else:
-                        # For other country codes, remove the + and country code
-                        import re
-                        match = re.match(r'^\+\d{1,4}(.+)$', number)
-                        api_number = match.group(1) if match else number
-                    
-                    # Make the call with selected language
-                    # Get provider info
-                    selected_lang_obj = next((l for l in LANGUAGES if l["code"] == st.session_state.selected_language), None)
-                    provider = selected_lang_obj["provider"] if selected_lang_obj else "twilio"
-                    
-                    result = make_twilio_call(
-                        f"+91{api_number}", 
-                        final_message,
-                        st.session_state.selected_language,
-                        selected_voice,
-                        provider
-                    )
-                    call_results.append({"number": number, "result": result})
-                
-                # Clear progress indicators
-                progress_bar.empty()
-                status_text.empty()
-                
-                # Show results
-                successful_calls = sum(1 for r in call_results if r["result"]["success"])
-                failed_calls = total_numbers - successful_calls
-                
-                st.session_state.status_message = f"✅ Successfully initiated calls to {successful_calls} numbers."
-                
-                # Clear the list after sending
-                st.session_state.phone_numbers = []
+
+                total_numbers = len(st.session_state.calling_list)
+                campaign_language = st.session_state.selected_language
+
+                # The campaign language speaks the reviewed translation; the job keeps its text and
+                # publishes the audio (cached by the background preparation) when it starts, since
+                # audio URLs expire. Other preferred languages are prepared from the source message
+                translated = {}
+                if not template_slots(message):
+                    translated[campaign_language] = final_message
+
+                # Persist the campaign; the background worker dials it and checkpoints progress,
+                # so closing the tab or a crash does not lose or repeat calls. Numbers were
+                # normalized to E.164 when added, so each is dialed as listed
+                st.session_state.campaign_id = campaign_worker.submit(
+                    st.session_state.calling_list,
+                    message,
+                    campaign_language,
+                    translated=translated
+                )
+                st.session_state.status_message = f"✅ Campaign queued: {total_numbers} calls will be placed in the background."
+
+                # The job has its own copy of the list
+                st.session_state.calling_list.clear()
                 st.rerun()
-    
+
+    campaign_section()
+    performance_section()
+
     # Status message
     if st.session_state.status_message:
         st.markdown(f'<div class="status-message"><p>{st.session_state.status_message}</p></div>', unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Every full rerun, including the ones st.rerun() cuts short
+        STAGE_SECONDS.observe(time.perf_counter() - page_started, stage="page")
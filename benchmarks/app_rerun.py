@@ -0,0 +1,151 @@
+"""Rerun cost of the Streamlit app with a large calling list.
+
+    python benchmarks/app_rerun.py [--numbers 10000] [--repeat 20] [--budget-ms 50] [--out app_rerun.json]
+
+Loads ``app.py`` in Streamlit's ``AppTest`` with ``--numbers`` recipients in
+the calling list and repeats the interactions people repeat most: a rerun
+without changes, typing in the message, adding a number, searching the list
+and turning its page. For each it reports the median and p95 milliseconds of
+
+- ``page``: the app's full rerun, as the app times it (the ``page`` stage of
+  its Performance section);
+- ``fragment``: the section the interaction belongs to. In the browser these
+  interactions rerun only that fragment, so this is what they cost there;
+- ``apptest``: the wall time of ``AppTest.run()``, which also compiles the
+  script on every run (a server compiles it once).
+
+``AppTest`` runs fragments as part of full reruns only, so ``page`` is an
+upper bound. Exits with status 1 when a median ``page`` time is over
+``--budget-ms``. Needs Streamlit 1.37 or later; provider credentials are not
+needed (nothing is sent).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def measure(repeat, fragment, interact):
+    """Milliseconds per run of ``interact(index)``: AppTest wall time and the app's own stage times."""
+    from outbound.metrics import STAGE_SECONDS
+
+    samples = {"page": [], "fragment": [], "apptest": []}
+    for index in range(repeat):
+        before = {stage: STAGE_SECONDS.snapshot(stage=stage)[1:] for stage in ("page", fragment)}
+        started = time.perf_counter()
+        at = interact(index)
+        samples["apptest"].append((time.perf_counter() - started) * 1000)
+        if at.exception:
+            raise RuntimeError(f"app raised: {at.exception[0].value}")
+        for name, stage in (("page", "page"), ("fragment", fragment)):
+            total, count = STAGE_SECONDS.snapshot(stage=stage)[1:]
+            samples[name].append((total - before[stage][0]) * 1000 / max(1, count - before[stage][1]))
+    return {"fragment_stage": fragment, **{name: percentiles(values) for name, values in samples.items()}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--numbers", type=int, default=10000, help="Recipients in the calling list.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per interaction.")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Largest acceptable median full rerun, ms.")
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args(argv)
+
+    import streamlit
+    from streamlit.logger import set_log_level
+    from streamlit.testing.v1 import AppTest
+
+    from outbound.recipients import CallingList, Recipient
+
+    with tempfile.TemporaryDirectory(prefix="outbound-bench-") as home:
+        # Stores in a scratch directory, and no background preparation competing for the CPU
+        os.environ.update({
+            "JOB_STORE_PATH": os.path.join(home, "jobs.sqlite3"),
+            "CALL_STATUS_DB_PATH": os.path.join(home, "calls.sqlite3"),
+            "TRANSLATION_CACHE_PATH": os.path.join(home, "translations.sqlite3"),
+            "AUDIO_CACHE_DIR": os.path.join(home, "audio"),
+            "PREWARM_ENABLED": "false",
+            "METRICS_ENABLED": "false",
+        })
+        calling_list = CallingList()
+        for index in range(args.numbers):
+            calling_list.add(Recipient(f"+9198{index:08d}", None, f"Customer {index}"))
+
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+        at.session_state["calling_list"] = calling_list
+        started = time.perf_counter()
+        at.run()
+        first_run_ms = (time.perf_counter() - started) * 1000
+        if at.exception:
+            sys.exit(f"app raised: {at.exception[0].value}")
+        # A source checkout of Streamlit logs every rerun at debug level (set as the first run reads
+        # the config); installed releases do not
+        set_log_level("warning")
+
+        def add_number(index):
+            at.text_input(key="phone_input").input(f"97{index:08d}")
+            return at.button(key="add_btn").click().run()
+
+        def search(index):
+            return at.text_input(key="list_search").input(f"98{index:04d}").run()
+
+        def turn_page(index):
+            return at.number_input(key="list_page").set_value(1 + index % 5).run()
+
+        def type_message(index):
+            return at.text_area(key="message_input").input(f"Your EMI is due ({index}).").run()
+
+        interactions = [
+            ("rerun", "page_recipients", lambda index: at.run()),
+            ("type_message", "page_message", type_message),
+            ("add_number", "page_recipients", add_number),
+            ("search", "page_recipients", search),
+            ("turn_page", "page_recipients", turn_page),
+        ]
+        runs = {}
+        for name, fragment, interact in interactions:
+            runs[name] = measure(args.repeat, fragment, interact)
+            print(
+                f"{name}: page {runs[name]['page']['median_ms']:.1f} ms, "
+                f"{fragment} {runs[name]['fragment']['median_ms']:.1f} ms, "
+                f"AppTest {runs[name]['apptest']['median_ms']:.1f} ms",
+                file=sys.stderr,
+            )
+            if name == "search":
+                at.text_input(key="list_search").input("").run()
+
+    over_budget = sorted(name for name, run in runs.items() if run["page"]["median_ms"] > args.budget_ms)
+    report = {
+        "python": sys.version.split()[0],
+        "streamlit": streamlit.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {key: value for key, value in vars(args).items() if key != "out"},
+        "first_run_ms": first_run_ms,
+        "runs": runs,
+        "over_budget": over_budget,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
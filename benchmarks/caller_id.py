@@ -0,0 +1,110 @@
+"""Dial throughput against the number of sender numbers in the caller-ID pool.
+
+    python benchmarks/caller_id.py [--sizes 1,2,4,8] [--calls 200] [--rate 10] [--out caller_id.json]
+
+Places ``--calls`` calls through ``place_twilio_call`` and ``dispatch_calls``
+for each pool size, against the fake Twilio of ``benchmarks/fakes.py`` (the
+provider SDKs must be installed), which lets every From number create
+``--rate`` calls per second and answers 429 beyond that. The pool is
+configured with the same per-number rate, so throughput should grow about
+linearly with the pool size and no call should be throttled. Reports calls
+per second, the speedup over one number and the calls per sender number.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import Behavior, FakeProviders  # noqa: E402
+
+PROVIDER_SDKS = ["twilio", "groq", "elevenlabs"]
+TWIML = "<Response><Say>Reminder</Say></Response>"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,2,4,8", help="Comma separated pool sizes to measure.")
+    parser.add_argument("--calls", type=int, default=200, help="Calls placed per pool size.")
+    parser.add_argument("--rate", type=float, default=10, help="Calls per second each number may place.")
+    parser.add_argument("--latency", type=float, default=0.1, help="Twilio response latency, seconds.")
+    parser.add_argument("--workers", type=int, default=64, help="Calls in flight at most.")
+    parser.add_argument("--affinity", action="store_true", help="Call each recipient from a fixed number.")
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args(argv)
+
+    missing = [name for name in PROVIDER_SDKS if importlib.util.find_spec(name) is None]
+    if missing:
+        sys.exit("provider SDKs not installed: " + ", ".join(missing))
+
+    from outbound.caller_id import campaign_calls_per_second, get_caller_id_pool
+    from outbound.calls import place_twilio_call
+    from outbound.config import configure, load_settings
+    from outbound.dispatch import dispatch_calls
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    behaviors = {
+        "twilio": Behavior(latency=args.latency),
+        "groq": Behavior(),
+        "elevenlabs": Behavior(),
+        "upload": Behavior(),
+    }
+    runs = []
+    with FakeProviders(behaviors) as providers, tempfile.TemporaryDirectory(prefix="outbound-bench-") as home:
+        providers.twilio.per_number_rate = args.rate
+        env = providers.env()
+        base = load_settings(lambda key: env.get(key) or os.environ.get(key))
+        recipients = [(f"+9198{index:08d}", f"+9198{index:08d}") for index in range(args.calls)]
+        for size in sizes:
+            numbers = tuple(f"+1500555{index:04d}" for index in range(size))
+            settings = configure(
+                base,
+                twilio_phone_numbers=numbers,
+                calls_per_second=args.rate,
+                caller_id_affinity=args.affinity,
+                dispatch_max_workers=args.workers,
+                call_status_path=os.path.join(home, f"calls-{size}.sqlite3"),
+            )
+            throttled = providers.twilio.stats["throttled"]
+            started = time.perf_counter()
+            results = dispatch_calls(
+                recipients,
+                lambda to: place_twilio_call(to, TWIML),
+                calls_per_second=campaign_calls_per_second(settings),
+                max_workers=args.workers,
+            )
+            seconds = time.perf_counter() - started
+            placed = sum(1 for entry in results if entry["result"].get("success"))
+            pool = get_caller_id_pool(settings).stats()
+            runs.append({
+                "numbers": size,
+                "placed": placed,
+                "seconds": seconds,
+                "calls_per_second": placed / seconds if seconds else None,
+                "throttled": providers.twilio.stats["throttled"] - throttled,
+                "calls_per_number": [stats["calls"] for stats in pool.values()],
+            })
+            print(f"{size} numbers: {runs[-1]['calls_per_second']:.1f} calls/s", file=sys.stderr)
+
+    single = runs[0]["calls_per_second"] if runs and runs[0]["numbers"] == 1 else None
+    for run in runs:
+        run["speedup"] = run["calls_per_second"] / single if single else None
+    report = {
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {key: value for key, value in vars(args).items() if key != "out"},
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+"""Local stand-ins for the provider APIs on the send path.
+
+    python benchmarks/fakes.py [--latency 0.05] [--behavior twilio:rate_limit=50,error_rate=0.01]
+
+Each fake is a small threaded HTTP server that speaks just enough of the real
+API for the provider SDKs: Twilio's Calls resource, Groq's chat completions,
+the ElevenLabs text-to-speech stream and the tmpfiles.org upload. Latency,
+jitter, error rate and a rate limit are set per fake, so the send path can be
+measured without network access or provider accounts.
+
+Run on its own it serves all four until interrupted and prints the
+environment variables that point the app and the CLI at them.
+"""
+import argparse
+import email.utils
+import functools
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+FAKE_ACCOUNT_SID = "AC" + "0" * 32
+FAKE_FROM_NUMBER = "+15005550006"
+
+
+@dataclass(frozen=True)
+class Behavior:
+    """How a fake answers: ``latency`` (± ``jitter``) seconds before responding, a share of
+    500s, and ``rate_limit`` requests per second (0 = unlimited) before answering 429."""
+    latency: float = 0.05
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: float = 0.0
+    burst: int = None
+
+
+# Rough response times of the real services for a short reminder
+DEFAULT_BEHAVIORS = {
+    "twilio": Behavior(latency=0.15, jitter=0.05),
+    "groq": Behavior(latency=0.4, jitter=0.1),
+    "elevenlabs": Behavior(latency=0.6, jitter=0.2),
+    "upload": Behavior(latency=0.3, jitter=0.1),
+}
+
+
+def parse_behaviors(specs, base=None):
+    """Apply ``provider:field=value,...`` specs (``all:`` for every fake) to ``base`` behaviors."""
+    behaviors = dict(base or DEFAULT_BEHAVIORS)
+    types = {f.name: (int if f.name == "burst" else float) for f in fields(Behavior)}
+    for spec in specs or ():
+        provider, _, assignments = spec.partition(":")
+        targets = list(behaviors) if provider == "all" else [provider]
+        if not assignments or any(target not in behaviors for target in targets):
+            raise ValueError(f"expected provider:field=value, got {spec!r}")
+        changes = {}
+        for assignment in assignments.split(","):
+            name, _, raw = assignment.partition("=")
+            if name not in types:
+                raise ValueError(f"unknown behavior field {name!r}")
+            changes[name] = types[name](raw)
+        for target in targets:
+            behaviors[target] = replace(behaviors[target], **changes)
+    return behaviors
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(parts)
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _dispatch(self, method):
+        try:
+            body = self._read_body()
+            url = urlsplit(self.path)
+            query = dict(parse_qsl(url.query))
+            status, headers, payload = (
+                self.fake.admit()
+                or self.fake.handle(method, url.path, query, self.headers, body)
+            )
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if isinstance(payload, bytes):
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in payload:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # a campaign opens many pooled connections at once
+
+
+class FakeServer:
+    """Threaded HTTP server applying a ``Behavior`` to every request before ``handle`` answers it."""
+
+    name = None
+
+    def __init__(self, behavior=None, host="127.0.0.1", port=0):
+        self.behavior = behavior or DEFAULT_BEHAVIORS.get(self.name, Behavior())
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0}
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._refilled = time.monotonic()
+        handler = type(f"{type(self).__name__}Handler", (_Handler,), {"fake": self})
+        self.server = _Server((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"fake-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _take_token(self):
+        rate = self.behavior.rate_limit
+        capacity = self.behavior.burst or max(1.0, rate)
+        now = time.monotonic()
+        if self._tokens is None:
+            self._tokens = capacity
+        self._tokens = min(capacity, self._tokens + (now - self._refilled) * rate)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def admit(self):
+        """Apply the behavior: ``None`` to serve the request, else the 429/500 response to send."""
+        behavior = self.behavior
+        with self._lock:
+            self.stats["requests"] += 1
+            throttled = behavior.rate_limit and not self._take_token()
+            if throttled:
+                self.stats["throttled"] += 1
+        if throttled:
+            return self.error(429, "Too many requests", {"Retry-After": "1"})
+        time.sleep(max(0.0, behavior.latency + random.uniform(-behavior.jitter, behavior.jitter)))
+        with self._lock:
+            failed = behavior.error_rate and random.random() < behavior.error_rate
+            self.stats["errors" if failed else "ok"] += 1
+        if failed:
+            return self.error(500, "Internal server error")
+        return None
+
+    def handle(self, method, path, query, headers, body):
+        return self.error(404, "Not found")
+
+    def json(self, status, payload, headers=None):
+        return status, {"Content-Type": "application/json", **(headers or {})}, json.dumps(payload).encode()
+
+    def error(self, status, message, headers=None):
+        return self.json(status, {"message": message, "status": status}, headers)
+
+
+class FakeTwilio(FakeServer):
+    """Twilio's Calls resource: create, fetch and the paged list used to reconcile outcomes.
+
+    Created calls are ``queued``; fetches and list pages report a final status
+    drawn from ``outcomes``. ``per_number_rate`` (0 = unlimited) limits the calls
+    each From number may create per second, answering 429 (code 20429) beyond it.
+    """
+
+    name = "twilio"
+    CALLS = re.compile(r"^/2010-04-01/Accounts/(?P<account>\w+)/Calls(?:/(?P<sid>CA\w+))?\.json$")
+
+    def __init__(self, behavior=None, outcomes=None, per_number_rate=0.0, **kwargs):
+        super().__init__(behavior, **kwargs)
+        self.outcomes = outcomes or {"completed": 0.7, "no-answer": 0.15, "busy": 0.1, "failed": 0.05}
+        self.per_number_rate = per_number_rate
+        self.calls = []
+        self._by_sid = {}
+        self._number_tokens = {}  # From number -> (tokens, refilled)
+
+    def _number_admits(self, number):
+        rate = self.per_number_rate
+        if not rate:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, refilled = self._number_tokens.get(number, (max(1.0, rate), now))
+            tokens = min(max(1.0, rate), tokens + (now - refilled) * rate)
+            admitted = tokens >= 1
+            self._number_tokens[number] = (tokens - 1 if admitted else tokens, now)
+            if not admitted:
+                self.stats["throttled"] += 1
+        return admitted
+
+    def error(self, status, message, headers=None):
+        code = 20429 if status == 429 else 20500 if status >= 500 else 20404
+        return self.json(status, {"code": code, "message": message, "status": status}, headers)
+
+    def handle(self, method, path, query, headers, body):
+        match = self.CALLS.match(path)
+        if not match:
+            return self.error(404, "The requested resource was not found")
+        if method == "POST" and not match["sid"]:
+            params = dict(parse_qsl(body.decode("utf-8")))
+            if not params.get("To") or not params.get("From") or not (params.get("Twiml") or params.get("Url")):
+                return self.json(400, {"code": 21201, "message": "To, From and Twiml are required", "status": 400})
+            if not self._number_admits(params["From"]):
+                return self.error(429, "Too many requests from this number", {"Retry-After": "1"})
+            return self.json(201, self._create(match["account"], params))
+        if method == "GET" and match["sid"]:
+            call = self._by_sid.get(match["sid"])
+            return self.json(200, self._finished(call)) if call else self.error(404, "Call not found")
+        if method == "GET":
+            return self.json(200, self._page(path, query))
+        return self.error(405, "Method not allowed")
+
+    def _create(self, account, params):
+        sid = "CA" + uuid.uuid4().hex
+        call = {
+            "sid": sid,
+            "account_sid": account,
+            "to": params["To"],
+            "from": params["From"],
+            "status": "queued",
+            "direction": "outbound-api",
+            "duration": None,
+            "api_version": "2010-04-01",
+            "date_created": email.utils.formatdate(usegmt=True),
+            "uri": f"/2010-04-01/Accounts/{account}/Calls/{sid}.json",
+        }
+        with self._lock:
+            self.calls.append(call)
+            self._by_sid[sid] = call
+        return call
+
+    def _finished(self, call):
+        status = random.choices(list(self.outcomes), weights=list(self.outcomes.values()))[0]
+        return {**call, "status": status, "duration": str(random.randint(5, 60)) if status == "completed" else "0"}
+
+    def _page(self, path, query):
+        page_size = int(query.get("PageSize", 50))
+        page = int(query.get("Page", 0))
+        with self._lock:
+            calls = [call for call in self.calls if query.get("From") in (None, call["from"])]
+        start = page * page_size
+        rows = [self._finished(call) for call in calls[start:start + page_size]]
+        base = f"{path}?" + urlencode({"PageSize": page_size, **({"From": query["From"]} if "From" in query else {})})
+        return {
+            "calls": rows,
+            "page": page,
+            "page_size": page_size,
+            "start": start,
+            "end": start + len(rows) - 1,
+            "uri": f"{base}&Page={page}",
+            "first_page_uri": f"{base}&Page=0",
+            "previous_page_uri": f"{base}&Page={page - 1}" if page else None,
+            "next_page_uri": f"{base}&Page={page + 1}" if start + page_size < len(calls) else None,
+        }
+
+
+class FakeGroq(FakeServer):
+    """Groq's OpenAI-compatible chat completions; "translates" by tagging each ``<n>`` segment.
+    Completions take ``chars_per_second`` to generate (0 = at once) and can be streamed as
+    server-sent events."""
+
+    name = "groq"
+    TARGET = re.compile(r"specializing in ([^.]+)\.")
+    SEGMENT = re.compile(r"^<(\d+)>\s*(.*)$")
+    STREAM_PIECE = 8  # characters per streamed delta, about two tokens
+
+    def __init__(self, behavior=None, chars_per_second=0.0, **kwargs):
+        super().__init__(behavior, **kwargs)
+        self.chars_per_second = chars_per_second
+
+    def error(self, status, message, headers=None):
+        return self.json(status, {"error": {"message": message, "type": "fake_error"}}, headers)
+
+    def handle(self, method, path, query, headers, body):
+        if method != "POST" or path != "/openai/v1/chat/completions":
+            return self.error(404, "Unknown request URL")
+        request = json.loads(body or b"{}")
+        messages = request.get("messages") or []
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        target = self.TARGET.search(system)
+        tag = f"[{target.group(1) if target else 'translated'}]"
+        text = user.split("\n\n", 1)[-1]
+        lines = []
+        for line in text.splitlines():
+            segment = self.SEGMENT.match(line)
+            lines.append(f"<{segment[1]}> {tag} {segment[2]}" if segment else f"{tag} {line}")
+        content = "\n".join(lines)
+        completion_id = "chatcmpl-" + uuid.uuid4().hex
+        if request.get("stream"):
+            return 200, {"Content-Type": "text/event-stream"}, self._events(completion_id, request, content)
+        if self.chars_per_second:
+            time.sleep(len(content) / self.chars_per_second)
+        return self.json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "logprobs": None,
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(user) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(user) + len(content)) // 4,
+            },
+            "system_fingerprint": "fp_fake",
+        })
+
+    def _events(self, completion_id, request, content):
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+                "system_fingerprint": "fp_fake",
+            }
+            return b"data: " + json.dumps(chunk).encode() + b"\n\n"
+
+        yield event({"role": "assistant", "content": ""})
+        for start in range(0, len(content), self.STREAM_PIECE):
+            piece = content[start:start + self.STREAM_PIECE]
+            if self.chars_per_second:
+                time.sleep(len(piece) / self.chars_per_second)
+            yield event({"content": piece})
+        yield event({}, "stop")
+        yield b"data: [DONE]\n\n"
+
+
+class FakeElevenLabs(FakeServer):
+    """ElevenLabs text-to-speech: streams fake MP3 bytes sized to the text (about
+    ``bytes_per_char`` per character, like a 32 kbps voice) in ``chunk_size`` pieces,
+    ``chunk_interval`` seconds apart. Raw ``pcm_<rate>`` output formats get a tone
+    of the same duration as 16-bit PCM."""
+
+    name = "elevenlabs"
+    TTS = re.compile(r"^/v1/text-to-speech/(?P<voice>[^/]+)(?:/stream)?$")
+    FRAME = b"\xff\xf3\x44\xc4" + bytes(92)  # MPEG-2 layer III frame header + silence
+
+    def __init__(self, behavior=None, bytes_per_char=270, chunk_size=4096, chunk_interval=0.0, **kwargs):
+        super().__init__(behavior, **kwargs)
+        self.bytes_per_char = bytes_per_char
+        self.chunk_size = chunk_size
+        self.chunk_interval = chunk_interval
+        self.bytes_sent = 0
+
+    def error(self, status, message, headers=None):
+        return self.json(status, {"detail": {"status": "fake_error", "message": message}}, headers)
+
+    def handle(self, method, path, query, headers, body):
+        if method != "POST" or not self.TTS.match(path):
+            return self.error(404, "Not found")
+        text = json.loads(body or b"{}").get("text") or ""
+        if not text:
+            return self.error(400, "text is required")
+        output_format = query.get("output_format", "mp3_44100_128")
+        size = len(text) * self.bytes_per_char
+        if output_format.startswith("pcm_"):
+            # Same duration as the MP3 (bytes_per_char at 32 kbps), two bytes per sample
+            rate = int(output_format.split("_")[1])
+            size = size * rate * 2 // 4000 // 2 * 2
+            audio = (self.tone(rate) * (size // (rate * 2) + 1))[:size]
+            content_type = "audio/pcm"
+        else:
+            audio = (self.FRAME * (size // len(self.FRAME) + 1))[:size]
+            content_type = "audio/mpeg"
+        with self._lock:
+            self.bytes_sent += size
+
+        def chunks():
+            for start in range(0, size, self.chunk_size):
+                if start and self.chunk_interval:
+                    time.sleep(self.chunk_interval)
+                yield audio[start:start + self.chunk_size]
+
+        return 200, {"Content-Type": content_type}, chunks()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def tone(rate):
+        """One second of a 220 Hz tone as 16-bit little-endian PCM."""
+        return b"".join(
+            struct.pack("<h", int(6000 * math.sin(2 * math.pi * 220 * i / rate))) for i in range(rate)
+        )
+
+
+class FakeUpload(FakeServer):
+    """tmpfiles.org's upload endpoint: accepts a multipart file and returns its URL."""
+
+    name = "upload"
+
+    def __init__(self, behavior=None, **kwargs):
+        super().__init__(behavior, **kwargs)
+        self.uploads = 0
+        self.bytes_received = 0
+
+    def handle(self, method, path, query, headers, body):
+        if method != "POST" or path != "/api/v1/upload":
+            return self.error(404, "Not found")
+        if "multipart/form-data" not in headers.get("Content-Type", "") or b'name="file"' not in body:
+            return self.json(422, {"status": "error", "message": "file is required"})
+        with self._lock:
+            self.uploads += 1
+            self.bytes_received += len(body)
+            number = self.uploads
+        return self.json(200, {"status": "success", "data": {"url": f"{self.url}/{number}/audio.mp3"}})
+
+
+class FakeProviders:
+    """All four fakes, started and stopped together."""
+
+    def __init__(self, behaviors=None, host="127.0.0.1"):
+        behaviors = behaviors or DEFAULT_BEHAVIORS
+        self.twilio = FakeTwilio(behaviors.get("twilio"), host=host)
+        self.groq = FakeGroq(behaviors.get("groq"), host=host)
+        self.elevenlabs = FakeElevenLabs(behaviors.get("elevenlabs"), host=host)
+        self.upload = FakeUpload(behaviors.get("upload"), host=host)
+        self.servers = [self.twilio, self.groq, self.elevenlabs, self.upload]
+
+    def start(self):
+        for server in self.servers:
+            server.start()
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def env(self):
+        """Environment variables that point the app, the CLI and ``load_settings`` at the fakes."""
+        return {
+            "TWILIO_ACCOUNT_SID": FAKE_ACCOUNT_SID,
+            "TWILIO_AUTH_TOKEN": "fake-token",
+            "TWILIO_PHONE_NUMBER": FAKE_FROM_NUMBER,
+            "GROQ_API_KEY": "fake-groq-key",
+            "ELEVENLABS_API_KEY": "fake-elevenlabs-key",
+            "TWILIO_API_BASE_URL": self.twilio.url,
+            "GROQ_BASE_URL": self.groq.url,
+            "ELEVENLABS_BASE_URL": self.elevenlabs.url,
+            "AUDIO_UPLOAD_URL": self.upload.url + "/api/v1/upload",
+        }
+
+    def behaviors(self):
+        return {server.name: asdict(server.behavior) for server in self.servers}
+
+    def stats(self):
+        stats = {server.name: dict(server.stats) for server in self.servers}
+        stats["elevenlabs"]["bytes_sent"] = self.elevenlabs.bytes_sent
+        stats["upload"]["bytes_received"] = self.upload.bytes_received
+        return stats
+
+
+def add_behavior_arguments(parser):
+    parser.add_argument("--latency", type=float, help="Response latency of every fake, in seconds.")
+    parser.add_argument("--error-rate", type=float, help="Share of requests every fake answers with a 500.")
+    parser.add_argument(
+        "--behavior", action="append", default=[], metavar="PROVIDER:FIELD=VALUE,...",
+        help="Per-fake behavior, e.g. twilio:rate_limit=50,burst=10 (providers: twilio, groq, "
+             "elevenlabs, upload, all; fields: latency, jitter, error_rate, rate_limit, burst)."
+    )
+
+
+def behaviors_from_args(args):
+    shared = []
+    if args.latency is not None:
+        shared.append(f"all:latency={args.latency},jitter=0")
+    if args.error_rate is not None:
+        shared.append(f"all:error_rate={args.error_rate}")
+    return parse_behaviors(shared + args.behavior)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    add_behavior_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        behaviors = behaviors_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with FakeProviders(behaviors, args.host) as providers:
+        for name, value in providers.env().items():
+            print(f"export {name}={value}")
+        print("# Serving until interrupted", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        print(json.dumps(providers.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
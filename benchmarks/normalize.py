@@ -0,0 +1,97 @@
+"""Phone number normalization throughput.
+
+    python benchmarks/normalize.py [--count 1000000] [--out normalize.json]
+
+Normalizes a column of mixed-format numbers (national, with trunk prefix,
+'+' and '00' international, separators, spreadsheet floats, a few invalid
+ones) with ``normalize_numbers``, and runs the same column through the CSV
+import path. Reports numbers per minute for each.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outbound.importer import ImportReport, parse_recipients  # noqa: E402
+from outbound.phone_numbers import normalize_numbers  # noqa: E402
+
+FORMATS = [
+    lambda n: f"{n}",
+    lambda n: f"0{n}",
+    lambda n: f"+91 {n[:5]} {n[5:]}",
+    lambda n: f"0091-{n}",
+    lambda n: f"91{n}",
+    lambda n: f"({n[:3]}) {n[3:6]}-{n[6:]}",
+    lambda n: float(n),
+    lambda n: f"{n[:4]}x{n[4:]}",  # invalid
+]
+
+
+def sample_numbers(count, seed=7):
+    rng = random.Random(seed)
+    return [rng.choice(FORMATS)(str(rng.randint(6_000_000_000, 9_999_999_999))) for _ in range(count)]
+
+
+def per_minute(count, seconds):
+    return count / seconds * 60 if seconds else None
+
+
+def bench_batch(raws, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        numbers = normalize_numbers(raws, "+91")
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "seconds": best,
+        "numbers_per_minute": per_minute(len(raws), best),
+        "valid": sum(1 for number in numbers if number),
+    }
+
+
+def bench_import(raws, repeat):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["phone", "name"])
+    writer.writerows([raw, f"Customer {i}"] for i, raw in enumerate(raws))
+    best = None
+    for _ in range(repeat):
+        buffer.seek(0)
+        report = ImportReport()
+        start = time.perf_counter()
+        added = sum(len(chunk) for chunk in parse_recipients(csv.reader(buffer), report))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": best, "rows_per_minute": per_minute(len(raws), best), "added": added, "invalid": report.invalid}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args(argv)
+
+    raws = sample_numbers(args.count)
+    report = {
+        "python": sys.version.split()[0],
+        "count": args.count,
+        "normalize_numbers": bench_batch(raws, args.repeat),
+        "csv_import": bench_import(raws, args.repeat),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
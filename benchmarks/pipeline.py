@@ -0,0 +1,122 @@
+"""Time to audio for a paragraph: translate-then-synthesize versus sentence streaming.
+
+    python benchmarks/pipeline.py [--repeat 5] [--groq-chars-per-second 600] [--out pipeline.json]
+
+Prepares the audio of a paragraph-length reminder in one ElevenLabs language
+against the local fakes (``benchmarks/fakes.py``; the provider SDKs must be
+installed), starting from empty caches every time:
+
+- ``sequential``: ``translate_text_groq`` waits for the whole completion,
+  then ``generate_elevenlabs_tts`` synthesizes the whole translation;
+- ``streaming``: ``outbound.streaming.translate_and_synthesize`` synthesizes
+  each sentence as soon as its translation has streamed in.
+
+Groq generation speed and ElevenLabs synthesis speed are simulated per
+character, so longer text takes longer in both stages as it does for real.
+Reports the median seconds per mode and the speedup.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import Behavior, FakeProviders  # noqa: E402
+
+PROVIDER_SDKS = ["twilio", "groq", "elevenlabs"]
+MESSAGE = (
+    "Hello, this is an automated payment reminder from Prime Financial Bank. "
+    "Your loan account number PF123456789 has an upcoming EMI payment due on 15th November 2025. "
+    "The EMI amount is Rupees 25,000. Your outstanding loan balance is Rupees 4,50,000. "
+    "Please ensure the payment is made on or before the due date to avoid late payment charges of Rupees 500 "
+    "and impact on your credit score. You can make the payment through our mobile app, internet banking, "
+    "or visit the nearest branch. For any queries, please call our customer care at 1800-555-0123. "
+    "Thank you for banking with Prime Financial Bank."
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode (each with empty caches).")
+    parser.add_argument("--language", default="hi-IN", help="ElevenLabs language to prepare.")
+    parser.add_argument("--groq-latency", type=float, default=0.2, help="Groq time to first token, seconds.")
+    parser.add_argument("--groq-chars-per-second", type=float, default=600, help="Groq generation speed.")
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="ElevenLabs time to first byte, seconds.")
+    parser.add_argument("--tts-chars-per-second", type=float, default=300, help="ElevenLabs synthesis speed.")
+    parser.add_argument("--workers", type=int, default=4, help="Sentences synthesized at once when streaming.")
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args(argv)
+
+    missing = [name for name in PROVIDER_SDKS if importlib.util.find_spec(name) is None]
+    if missing:
+        sys.exit("provider SDKs not installed: " + ", ".join(missing))
+
+    from outbound.config import configure, load_settings
+    from outbound.languages import LANGUAGES_BY_CODE
+    from outbound.streaming import translate_and_synthesize
+    from outbound.translation import translate_text_groq
+    from outbound.tts import generate_elevenlabs_tts
+
+    voice = LANGUAGES_BY_CODE[args.language]["voice"]
+    behaviors = {
+        "twilio": Behavior(),
+        "groq": Behavior(latency=args.groq_latency),
+        "elevenlabs": Behavior(latency=args.tts_latency),
+        "upload": Behavior(),
+    }
+
+    def sequential():
+        translated = translate_text_groq(MESSAGE, args.language)
+        if generate_elevenlabs_tts(translated, voice) is None:
+            raise RuntimeError("synthesis failed")
+
+    def streaming():
+        translate_and_synthesize(MESSAGE, args.language, voice)
+
+    modes = {"sequential": sequential, "streaming": streaming}
+    timings = {name: [] for name in modes}
+    with FakeProviders(behaviors) as providers, tempfile.TemporaryDirectory(prefix="outbound-bench-") as home:
+        providers.groq.chars_per_second = args.groq_chars_per_second
+        # The fake streams bytes_per_char bytes per character in chunk_size pieces
+        providers.elevenlabs.chunk_interval = (
+            providers.elevenlabs.chunk_size / providers.elevenlabs.bytes_per_char / args.tts_chars_per_second
+        )
+        base = load_settings(lambda key: providers.env().get(key) or os.environ.get(key))
+        for run in range(args.repeat):
+            for name, prepare in modes.items():
+                # Fresh translation and audio caches for every run
+                directory = os.path.join(home, f"{name}-{run}")
+                configure(
+                    base,
+                    audio_cache_dir=os.path.join(directory, "audio"),
+                    translation_cache_path=os.path.join(directory, "translations.sqlite3"),
+                    sentence_synthesis_workers=args.workers,
+                )
+                started = time.perf_counter()
+                prepare()
+                timings[name].append(time.perf_counter() - started)
+                print(f"{name} run {run + 1}: {timings[name][-1]:.2f}s", file=sys.stderr)
+
+    report = {
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "message_chars": len(MESSAGE),
+        "settings": {key: value for key, value in vars(args).items() if key != "out"},
+        "median_seconds": {name: statistics.median(values) for name, values in timings.items()},
+        "runs_seconds": timings,
+    }
+    report["speedup"] = report["median_seconds"]["sequential"] / report["median_seconds"]["streaming"]
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
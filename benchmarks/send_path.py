@@ -0,0 +1,266 @@
+"""Send-path benchmark against local stand-ins for Twilio, Groq, ElevenLabs and the upload.
+
+    python benchmarks/send_path.py [--scenario '1k-*'] [--out send_path.json] [--baseline old.json]
+
+Scenarios are named ``<recipients>-<cache>-<languages>``: 1k, 10k or 100k
+recipients; ``cold`` (empty translation and audio caches) or ``warm`` (caches
+filled by an earlier run); a ``single`` language or a ``mixed`` list of
+ElevenLabs and Twilio voices. ``--scenario`` takes shell-style patterns and
+defaults to the 1k scenarios.
+
+Each scenario runs as a durable job (``outbound.jobs.run_job``) in a fresh
+interpreter with its own home directory, so caches and stores start from a
+known state, and dials the fakes from ``benchmarks/fakes.py`` through the real
+provider SDKs (which must be installed). Reports throughput, time to first
+call, p50/p99 dial latency and peak memory per scenario as JSON; with
+``--baseline`` the change against an earlier report is printed as well.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fakes import FakeProviders, add_behavior_arguments, behaviors_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROVIDER_SDKS = ["twilio", "groq", "elevenlabs"]
+
+MESSAGE = (
+    "Hello, this is a reminder that your appointment is tomorrow at 10 AM. "
+    "Please call us if you need to reschedule."
+)
+# ElevenLabs voices (translated and synthesized) mixed with Twilio voices (translated only)
+LANGUAGE_SETS = {
+    "single": ["hi-IN"],
+    "mixed": ["hi-IN", "ta-IN", "bn-IN", "en-US", "es-ES", "fr-FR"],
+}
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+SCENARIOS = {
+    f"{size}-{cache}-{languages}": {"recipients": count, "warm": cache == "warm", "languages": LANGUAGE_SETS[languages]}
+    for size, count in SIZES.items()
+    for cache in ("cold", "warm")
+    for languages in LANGUAGE_SETS
+}
+
+# Runs in the scenario's interpreter; prints one JSON line
+CHILD = """
+import json, sys
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {benchmarks!r})
+from send_path import run_child
+print(json.dumps(run_child(json.loads(sys.argv[1]))))
+"""
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(spec):
+    """Run one job of ``spec["recipients"]`` calls and measure it (in the scenario's interpreter)."""
+    import importlib.util
+    import threading
+    import tracemalloc
+
+    missing = [name for name in PROVIDER_SDKS if importlib.util.find_spec(name) is None]
+    if missing:
+        return {"error": "provider SDKs not installed: " + ", ".join(missing)}
+    if spec["trace_memory"]:
+        tracemalloc.start()
+
+    from outbound.calls import place_twilio_call
+    from outbound.config import configure, load_settings
+    from outbound.jobs import FAILED, SENT, get_job_store, run_job
+    from outbound.metrics import STAGE_SECONDS
+    from outbound.recipients import Recipient
+    from outbound.resilience import resilience_stats
+
+    settings = configure(load_settings())
+    languages = spec["languages"]
+    started = time.perf_counter()
+    store = get_job_store(settings.job_store_path)
+    job_id = store.create_job(
+        (Recipient(f"+9198{i:08d}", languages[i % len(languages)]) for i in range(spec["recipients"])),
+        MESSAGE,
+        languages[0],
+    )
+    enqueued = time.perf_counter()
+
+    # (start, end) of every dial, appended from the dispatch threads
+    dials = []
+    first_dial = []
+    first_dial_lock = threading.Lock()
+
+    def send_call(number, twiml):
+        start = time.perf_counter()
+        if not first_dial:
+            with first_dial_lock:
+                if not first_dial:
+                    first_dial.append(start)
+        result = place_twilio_call(number, twiml)
+        dials.append((start, time.perf_counter()))
+        return result
+
+    state = run_job(store, job_id, send_call=send_call, batch_size=settings.job_batch_size)
+    finished = time.perf_counter()
+
+    counts = store.counts(job_id)
+    latencies = sorted(end - start for start, end in dials)
+    dial_seconds = (max(end for _, end in dials) - min(start for start, _ in dials)) if dials else 0.0
+    _, prepare_total, prepare_count = STAGE_SECONDS.snapshot(stage="prepare")
+    result = {
+        "state": state,
+        "calls_placed": counts[SENT],
+        "calls_failed": counts[FAILED],
+        "enqueue_seconds": enqueued - started,
+        "seconds_to_first_call": (first_dial[0] - enqueued) if first_dial else None,
+        "dial_seconds": dial_seconds,
+        "total_seconds": finished - started,
+        "calls_per_second": counts[SENT] / dial_seconds if dial_seconds else None,
+        "dial_latency_p50_seconds": percentile(latencies, 0.50),
+        "dial_latency_p99_seconds": percentile(latencies, 0.99),
+        "prepare_count": prepare_count,
+        "prepare_mean_seconds": prepare_total / prepare_count if prepare_count else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "resilience": resilience_stats(),
+    }
+    if spec["trace_memory"]:
+        result["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    return result
+
+
+def run_in_child(spec, env):
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT, benchmarks=os.path.dirname(os.path.abspath(__file__))),
+         json.dumps(spec)],
+        cwd=ROOT, capture_output=True, text=True, env=env,
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"error": (proc.stderr.strip().splitlines() or ["exited with status %d" % proc.returncode])[-1]}
+    return json.loads(lines[-1])
+
+
+def stats_delta(after, before):
+    return {
+        provider: {key: value - before[provider].get(key, 0) for key, value in counters.items()}
+        for provider, counters in after.items()
+    }
+
+
+def run_scenario(name, scenario, providers, args):
+    with tempfile.TemporaryDirectory(prefix="outbound-bench-") as home:
+        env = {
+            **os.environ,
+            **providers.env(),
+            "HOME": home,
+            "TWILIO_CALLS_PER_SECOND": str(args.cps),
+            "DISPATCH_MAX_WORKERS": str(args.workers),
+            "JOB_BATCH_SIZE": str(args.batch_size),
+        }
+        for key in ("MEDIA_PUBLIC_BASE_URL", "STATUS_CALLBACK_BASE_URL", "METRICS_ENABLED"):
+            env.pop(key, None)
+        spec = {"recipients": scenario["recipients"], "languages": scenario["languages"],
+                "trace_memory": args.trace_memory}
+        if scenario["warm"]:
+            # One call per language fills the translation and audio caches on disk
+            primed = run_in_child({**spec, "recipients": len(scenario["languages"])}, env)
+            if "error" in primed:
+                return primed
+        before = providers.stats()
+        result = run_in_child(spec, env)
+        result["provider_requests"] = stats_delta(providers.stats(), before)
+        return result
+
+
+def git_revision():
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or None
+
+
+def print_comparison(report, baseline):
+    print(f"Compared with {baseline.get('revision')} ({baseline.get('timestamp')}):", file=sys.stderr)
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or "error" in result or "error" in old:
+            continue
+        changes = []
+        for key in ("calls_per_second", "dial_latency_p99_seconds", "seconds_to_first_call", "peak_rss_mb"):
+            if result.get(key) is not None and old.get(key):
+                changes.append(f"{key} {(result[key] / old[key] - 1) * 100:+.1f}%")
+        print(f"  {name}: " + ", ".join(changes), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", metavar="PATTERN",
+                        help=f"Scenarios to run (default 1k-*); available: {', '.join(SCENARIOS)}.")
+    parser.add_argument("--cps", type=float, default=0, help="Calls per second (0 = unthrottled).")
+    parser.add_argument("--workers", type=int, default=32, help="Calls in flight.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Recipients claimed per job batch.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the peak Python heap (tracemalloc; slows the run down).")
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against.")
+    add_behavior_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        behaviors = behaviors_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    patterns = args.scenario or ["1k-*"]
+    selected = [name for name in SCENARIOS if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+    if not selected:
+        parser.error(f"no scenario matches {', '.join(patterns)}")
+
+    report = {
+        "python": sys.version.split()[0],
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {"cps": args.cps, "workers": args.workers, "batch_size": args.batch_size},
+        "scenarios": {},
+    }
+    with FakeProviders(behaviors) as providers:
+        report["fakes"] = providers.behaviors()
+        for name in selected:
+            print(f"{name} ...", file=sys.stderr, flush=True)
+            result = run_scenario(name, SCENARIOS[name], providers, args)
+            report["scenarios"][name] = result
+            if "error" in result:
+                print(f"  error: {result['error']}", file=sys.stderr)
+                if result["error"].startswith("provider SDKs not installed"):
+                    break
+            else:
+                print(f"  {result['calls_per_second'] or 0:.1f} calls/s,"
+                      f" p99 {result['dial_latency_p99_seconds'] or 0:.3f}s,"
+                      f" {result['peak_rss_mb']:.0f} MB", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(report, json.load(f))
+    if any("error" in result for result in report["scenarios"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
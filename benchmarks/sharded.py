@@ -0,0 +1,113 @@
+"""Sharded dispatch: campaign throughput against the number of worker processes.
+
+    python benchmarks/sharded.py [--processes 1,2,4] [--recipients 2000] [--rate 30] [--out sharded.json]
+
+Creates a durable job of ``--recipients`` recipients and runs it with
+``outbound.sharding.run_sharded`` once per process count, against the fake
+Twilio of ``benchmarks/fakes.py`` (the provider SDKs must be installed).
+Every worker process has the same ``--workers`` calls in flight, so with an
+unlimited rate the throughput should grow about linearly with the number of
+processes until the CPUs or the fakes saturate. A last run with ``--rate``
+calls per second (one shared limit across all processes) checks that the
+processes together stay within it. Reports calls per second per run, the
+speedup over one process and the number of calls the job recorded.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import Behavior, FakeProviders  # noqa: E402
+
+PROVIDER_SDKS = ["twilio", "groq", "elevenlabs"]
+MESSAGE = "Hello, this is a reminder that your EMI payment is due tomorrow."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", default="1,2,4", help="Comma separated worker process counts.")
+    parser.add_argument("--recipients", type=int, default=2000, help="Recipients per run.")
+    parser.add_argument("--workers", type=int, default=8, help="Calls in flight per worker process.")
+    parser.add_argument("--latency", type=float, default=0.15, help="Twilio response latency, seconds.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Recipients per shard.")
+    parser.add_argument("--rate", type=float, default=30, help="Shared calls per second of the rate-limited run.")
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args(argv)
+
+    missing = [name for name in PROVIDER_SDKS if importlib.util.find_spec(name) is None]
+    if missing:
+        sys.exit("provider SDKs not installed: " + ", ".join(missing))
+
+    from outbound.config import configure, load_settings
+    from outbound.jobs import SENT, get_job_store
+    from outbound.recipients import Recipient
+    from outbound.sharding import run_sharded
+
+    behaviors = {
+        "twilio": Behavior(latency=args.latency),
+        "groq": Behavior(),
+        "elevenlabs": Behavior(),
+        "upload": Behavior(),
+    }
+    counts = [int(count) for count in args.processes.split(",")]
+    plan = [(count, 0.0) for count in counts] + [(max(counts), args.rate)]
+    runs = []
+    with FakeProviders(behaviors) as providers, tempfile.TemporaryDirectory(prefix="outbound-bench-") as home:
+        env = providers.env()
+        base = load_settings(lambda key: env.get(key) or os.environ.get(key))
+        recipients = [Recipient(f"+9198{index:08d}", "en-US") for index in range(args.recipients)]
+        for run, (processes, rate) in enumerate(plan):
+            directory = os.path.join(home, f"run-{run}")
+            configure(
+                base,
+                job_store_path=os.path.join(directory, "jobs.sqlite3"),
+                call_status_path=os.path.join(directory, "calls.sqlite3"),
+                translation_cache_path=os.path.join(directory, "translations.sqlite3"),
+                audio_cache_dir=os.path.join(directory, "audio"),
+                calls_per_second=rate,
+                dispatch_max_workers=args.workers,
+                job_batch_size=args.batch_size,
+            )
+            store = get_job_store(os.path.join(directory, "jobs.sqlite3"))
+            job_id = store.create_job(recipients, MESSAGE, "en-US")
+            created = len(providers.twilio.calls)
+            started = time.perf_counter()
+            state = run_sharded(job_id, processes)
+            seconds = time.perf_counter() - started
+            placed = store.counts(job_id)[SENT]
+            runs.append({
+                "processes": processes,
+                "rate_limit": rate or None,
+                "state": state,
+                "placed": placed,
+                "twilio_calls": len(providers.twilio.calls) - created,
+                "seconds": seconds,
+                "calls_per_second": placed / seconds if seconds else None,
+            })
+            label = f"limit {rate:g}/s" if rate else "unlimited"
+            print(f"{processes} processes ({label}): {runs[-1]['calls_per_second']:.1f} calls/s", file=sys.stderr)
+
+    single = next((run["calls_per_second"] for run in runs if run["processes"] == 1 and not run["rate_limit"]), None)
+    for run in runs:
+        run["speedup"] = run["calls_per_second"] / single if single and not run["rate_limit"] else None
+    report = {
+        "python": sys.version.split()[0],
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {key: value for key, value in vars(args).items() if key != "out"},
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Startup-time benchmark for the headless runner and the Streamlit app.
+
+    python benchmarks/startup.py [--repeat 5] [--out startup.json]
+
+Each measurement runs in a fresh interpreter so import caches do not hide
+cold-start cost. Reports the median wall time, the provider SDKs that were
+imported, and the CLI's time to first call in a dry run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["streamlit", "twilio", "groq", "elevenlabs", "requests", "httpx"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+APP_PROBE = """
+import json, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=60).run()
+print(json.dumps({"seconds": time.perf_counter() - start, "exceptions": len(at.exception)}))
+"""
+
+
+def run_python(code_or_args, env=None):
+    args = [sys.executable] + (["-c", code_or_args] if isinstance(code_or_args, str) else code_or_args)
+    start = time.perf_counter()
+    proc = subprocess.run(args, cwd=ROOT, capture_output=True, text=True, env=env)
+    return time.perf_counter() - start, proc
+
+
+def median_of(repeat, measure):
+    samples = [measure() for _ in range(repeat)]
+    samples = [s for s in samples if s is not None]
+    return statistics.median(samples) if samples else None
+
+
+def bench_import(module, repeat):
+    details = {}
+
+    def measure():
+        _, proc = run_python(IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES))
+        if proc.returncode != 0:
+            details["error"] = proc.stderr.strip().splitlines()[-1:]
+            return None
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        details["loaded"] = result["loaded"]
+        return result["seconds"]
+
+    return {"median_seconds": median_of(repeat, measure), **details}
+
+
+def bench_cli_help(repeat):
+    def measure():
+        elapsed, proc = run_python(["-m", "outbound", "--help"])
+        return elapsed if proc.returncode == 0 else None
+
+    return {"median_seconds": median_of(repeat, measure)}
+
+
+def bench_cli_first_call(repeat, recipients):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recipients.csv")
+        with open(path, "w") as f:
+            f.write("phone\n")
+            for i in range(recipients):
+                f.write(f"98{i:08d}\n")
+        env = {**os.environ, "HOME": tmp, "TWILIO_CALLS_PER_SECOND": "1000", "DISPATCH_MAX_WORKERS": "32"}
+        details = {}
+
+        def measure():
+            elapsed, proc = run_python(
+                ["-m", "outbound", "run", path, "--message", "Hello.", "--language", "en-US",
+                 "--dry-run", "--quiet", "--out", os.path.join(tmp, "out.jsonl")],
+                env=env,
+            )
+            marker = "first call after "
+            tail = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ""
+            if marker not in tail:
+                details["error"] = tail
+                return None
+            details.setdefault("total_seconds", []).append(elapsed)
+            return float(tail.split(marker)[1].rstrip("s)"))
+
+        first_call = median_of(repeat, measure)
+        total = details.pop("total_seconds", None)
+        return {
+            "recipients": recipients,
+            "median_first_call_seconds": first_call,
+            "median_process_seconds": statistics.median(total) if total else None,
+            **details,
+        }
+
+
+def bench_app(repeat):
+    details = {}
+
+    def measure():
+        _, proc = run_python(APP_PROBE)
+        if proc.returncode != 0:
+            details["error"] = proc.stderr.strip().splitlines()[-1:]
+            return None
+        return json.loads(proc.stdout.strip().splitlines()[-1])["seconds"]
+
+    return {"median_seconds": median_of(repeat, measure), **details}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--recipients", type=int, default=1000)
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "import_outbound_cli": bench_import("outbound.cli", args.repeat),
+        "import_outbound_campaign": bench_import("outbound.campaign", args.repeat),
+        "cli_help": bench_cli_help(args.repeat),
+        "cli_dry_run": bench_cli_first_call(args.repeat, args.recipients),
+        "streamlit_app_first_run": bench_app(args.repeat),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Campaign throughput against a slow or failing ElevenLabs, with and without speech routing.
+
+    python benchmarks/tts_routing.py [--recipients 200] [--latency 3] [--max-latency 1] [--out tts_routing.json]
+
+Runs a personalized campaign (every recipient's name and amount are
+synthesized as clips) through ``run_campaign`` against the fakes of
+``benchmarks/fakes.py`` (the provider SDKs must be installed), once per
+ElevenLabs behavior and routing policy. ``slow`` answers ElevenLabs requests
+after ``--latency`` seconds, ``failing`` answers ``--error-rate`` of them with
+a 500. With ``TTS_ROUTING=fixed`` every call waits for its clips; with
+``adaptive`` calls switch to Twilio ``<Say>`` once ElevenLabs is slower than
+``--max-latency`` or fails too often, so the campaign keeps its pace. Reports
+calls per second and how many calls played ElevenLabs audio.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import Behavior, FakeProviders  # noqa: E402
+
+PROVIDER_SDKS = ["twilio", "groq", "elevenlabs"]
+TEMPLATE = "Hello {name}, your EMI of {amount} rupees is due on {due_date}. Please pay on time."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipients", type=int, default=200, help="Recipients per run.")
+    parser.add_argument("--latency", type=float, default=3.0, help="ElevenLabs latency of the slow runs, seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.8, help="Share of failed ElevenLabs requests.")
+    parser.add_argument("--max-latency", type=float, default=1.0, help="TTS_MAX_LATENCY_SECONDS.")
+    parser.add_argument("--hold", type=float, default=10.0, help="TTS_ROUTE_HOLD_SECONDS.")
+    parser.add_argument("--workers", type=int, default=16, help="Calls in flight at most.")
+    parser.add_argument("--out", help="Write the JSON report here as well as to stdout.")
+    args = parser.parse_args(argv)
+
+    missing = [name for name in PROVIDER_SDKS if importlib.util.find_spec(name) is None]
+    if missing:
+        sys.exit("provider SDKs not installed: " + ", ".join(missing))
+
+    from outbound.calls import place_twilio_call
+    from outbound.campaign import run_campaign
+    from outbound.config import configure, load_settings
+    from outbound.recipients import Recipient
+    from outbound.shared_cache import get_shared_cache
+    from outbound.tts_router import get_tts_router, tts_router_stats
+
+    elevenlabs = {
+        "slow": Behavior(latency=args.latency),
+        "failing": Behavior(latency=0.2, error_rate=args.error_rate),
+    }
+    behaviors = {
+        "twilio": Behavior(latency=0.05),
+        "groq": Behavior(),
+        "elevenlabs": Behavior(),
+        "upload": Behavior(),
+    }
+    runs = []
+    with FakeProviders(behaviors) as providers, tempfile.TemporaryDirectory(prefix="outbound-bench-") as home:
+        env = providers.env()
+        base = load_settings(lambda key: env.get(key) or os.environ.get(key))
+        for run, (scenario, policy) in enumerate(
+                (scenario, policy) for scenario in elevenlabs for policy in ("fixed", "adaptive")):
+            providers.elevenlabs.behavior = elevenlabs[scenario]
+            directory = os.path.join(home, f"run-{run}")
+            configure(
+                base,
+                translation_cache_path=os.path.join(directory, "translations.sqlite3"),
+                audio_cache_dir=os.path.join(directory, "audio"),
+                call_status_path=os.path.join(directory, "calls.sqlite3"),
+                calls_per_second=0,
+                dispatch_max_workers=args.workers,
+                retry_max_attempts=2,
+                tts_routing=policy,
+                tts_max_latency=args.max_latency,
+                tts_route_hold=args.hold,
+            )
+            # Every run starts cold: no audio in memory and nothing observed about ElevenLabs
+            for cache in ("audio", "published"):
+                get_shared_cache(cache).clear()
+            get_tts_router().reset()
+            # Distinct names and amounts: every call needs clips of its own
+            recipients = [
+                Recipient(f"+9198{index:08d}", "hi-IN", f"Customer {index}", f"{1000 + index}", "5th March")
+                for index in range(args.recipients)
+            ]
+            played = []
+
+            def send_call(number, twiml):
+                played.append("<Play>" in twiml)
+                return place_twilio_call(number, twiml)
+
+            started = time.perf_counter()
+            results = run_campaign(recipients, TEMPLATE, "hi-IN", send_call=send_call)
+            seconds = time.perf_counter() - started
+            placed = sum(1 for entry in results if entry["result"].get("success"))
+            routing = tts_router_stats()
+            runs.append({
+                "elevenlabs": scenario,
+                "routing": policy,
+                "placed": placed,
+                "seconds": seconds,
+                "calls_per_second": placed / seconds if seconds else None,
+                "elevenlabs_audio_calls": sum(played),
+                "twilio_voice_calls": len(played) - sum(played),
+                "router_switches": routing["switches"],
+            })
+            print(f"{scenario} ElevenLabs, {policy} routing: {runs[-1]['calls_per_second']:.1f} calls/s", file=sys.stderr)
+
+    report = {
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {key: value for key, value in vars(args).items() if key != "out"},
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Campaign engine for the Outbound Call Demo.
+
+Everything in this package is independent of Streamlit so it can be driven
+from ``app.py`` or from a worker process.
+"""
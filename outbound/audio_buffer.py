@@ -0,0 +1,156 @@
+"""Single-copy in-memory audio buffers.
+
+Provider chunks are collected once. The finished audio is one ``bytes``
+object that the upload, the on-disk cache and the ``st.audio`` preview all
+share through ``memoryview`` slices. Very long audio can spill to a file
+instead of growing in memory; the caller picks the directory (the audio
+cache's, so the cache can adopt the file by renaming it).
+"""
+import os
+import shutil
+import tempfile
+
+
+class AudioBuffer:
+    def __init__(self, spill_threshold=None, spill_dir=None, suffix=".mp3"):
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self.suffix = suffix
+        self.size = 0
+        self.path = None
+        self._chunks = []
+        self._data = None
+        self._file = None
+        self._closed = False
+
+    @classmethod
+    def from_bytes(cls, data):
+        buffer = cls()
+        buffer._data = bytes(data)
+        buffer.size = len(buffer._data)
+        buffer._closed = True
+        return buffer
+
+    @classmethod
+    def from_file(cls, path, spill_threshold=None):
+        """Wrap a finished file; small files are loaded, large ones stay on disk."""
+        size = os.path.getsize(path)
+        if spill_threshold is not None and size > spill_threshold:
+            buffer = cls(spill_threshold)
+            buffer.path = path
+            buffer.size = size
+            buffer._closed = True
+            return buffer
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def spilled(self):
+        return self.path is not None
+
+    def write(self, chunk):
+        if self._closed:
+            raise ValueError("write to a closed AudioBuffer")
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+        self._chunks.append(chunk)
+        if self.spill_threshold is not None and self.size > self.spill_threshold:
+            self._spill()
+
+    def _spill(self):
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(suffix=self.suffix, dir=self.spill_dir)
+        self._file = os.fdopen(fd, "wb")
+        for chunk in self._chunks:
+            self._file.write(chunk)
+        self._chunks = []
+
+    def tee(self, chunks):
+        """Yield ``chunks`` unchanged while recording them. Closes the buffer when exhausted."""
+        for chunk in chunks:
+            if chunk:
+                self.write(chunk)
+                yield chunk
+        self.close()
+
+    def drain(self, chunks):
+        """Consume the rest of ``chunks`` (for example after a failed upload) and close."""
+        for chunk in chunks:
+            self.write(chunk)
+        self.close()
+        return self
+
+    def close(self):
+        if self._closed:
+            return self
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        else:
+            # The only copy: the chunk list becomes one immutable bytes object
+            self._data = b"".join(self._chunks)
+        self._chunks = []
+        self._closed = True
+        return self
+
+    def view(self):
+        """Zero-copy ``memoryview`` over in-memory audio (``None`` once spilled)."""
+        if not self._closed:
+            raise ValueError("AudioBuffer is still being written")
+        return memoryview(self._data) if self._data is not None else None
+
+    def getvalue(self):
+        """The audio as ``bytes``; shared, not copied, when held in memory."""
+        if not self._closed:
+            raise ValueError("AudioBuffer is still being written")
+        if self._data is not None:
+            return self._data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def iter_chunks(self, chunk_size=64 * 1024):
+        """Iterate the finished audio in slices without copying the in-memory buffer."""
+        if self._data is not None:
+            view = memoryview(self._data)
+            for start in range(0, len(view), chunk_size):
+                yield view[start:start + chunk_size]
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def discard(self):
+        """Drop what was written and delete the spill file, for a stream that failed part way."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+        self._chunks = []
+        self._data = None
+        self.size = 0
+        self._closed = True
+        return self
+
+    def move_to(self, path):
+        """Adopt ``path`` as the spill file location (used when the cache takes ownership)."""
+        if self.path is not None and self.path != path:
+            shutil.move(self.path, path)
+            self.path = path
+        return self.path
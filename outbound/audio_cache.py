@@ -0,0 +1,212 @@
+"""Persistent, content-addressed cache for synthesized audio.
+
+Audio files live in one directory, named by a SHA-256 of everything that
+affects the synthesized bytes (text, voice, model, output format and voice
+settings). A small SQLite index records sizes and last access times so the
+cache can enforce a size budget with LRU eviction across process restarts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "outbound-agent", "audio")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_PARTIAL_SUFFIX = ".partial"
+# Partial files older than this are leftovers from a crashed write
+_PARTIAL_MAX_AGE = 15 * 60
+
+
+def audio_cache_key(text, voice_id, model_id, output_format, voice_settings=None, variant=None):
+    """Stable hash of every input that changes the synthesized audio.
+
+    ``variant`` describes local processing of the provider's output (call format,
+    loudness), so each transcoded variant is cached under its own key.
+    """
+    fields = {
+        "text": text,
+        "voice_id": voice_id,
+        "model_id": model_id,
+        "output_format": output_format,
+        "voice_settings": voice_settings or {},
+    }
+    if variant is not None:
+        fields["variant"] = variant
+    payload = json.dumps(
+        fields,
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " filename TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._db.commit()
+        self.cleanup_orphans()
+
+    def path_for(self, key, extension):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key):
+        """Return the cached file path for ``key`` or ``None``."""
+        with self._lock:
+            row = self._db.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                path = os.path.join(self.directory, row[0])
+                if os.path.exists(path):
+                    self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self.hits += 1
+                    return path
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+            self.misses += 1
+            return None
+
+    def contains(self, key):
+        """Whether ``key`` is cached, without counting a lookup or refreshing its last access."""
+        with self._lock:
+            row = self._db.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+        return row is not None and os.path.exists(os.path.join(self.directory, row[0]))
+
+    def put(self, key, data, extension="mp3"):
+        """Store ``data`` (bytes or an iterable of byte chunks) and return its path."""
+        path = self.path_for(key, extension)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}{_PARTIAL_SUFFIX}"
+        try:
+            with open(partial, "wb") as f:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    f.write(data)
+                else:
+                    for chunk in data:
+                        if chunk:
+                            f.write(chunk)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        return self._index(key, path)
+
+    def put_buffer(self, key, buffer, extension="mp3"):
+        """Store a closed ``AudioBuffer``; spilled audio is moved in rather than copied."""
+        if buffer.spilled:
+            return self._index(key, buffer.move_to(self.path_for(key, extension)))
+        return self.put(key, buffer.view(), extension)
+
+    def _index(self, key, path):
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, filename, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, os.path.basename(path), size, now, now),
+            )
+            self._db.commit()
+            self._evict_locked(keep=key)
+        return path
+
+    def _evict_locked(self, keep=None):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, filename, size FROM entries ORDER BY last_access").fetchall()
+        for key, filename, size in rows:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+        self._db.commit()
+
+    def cleanup_orphans(self):
+        """Drop index rows without files, files without index rows and stale partial writes."""
+        removed = 0
+        with self._lock:
+            known = {}
+            for key, filename in self._db.execute("SELECT key, filename FROM entries").fetchall():
+                if os.path.exists(os.path.join(self.directory, filename)):
+                    known[filename] = key
+                else:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    removed += 1
+            self._db.commit()
+
+            now = time.time()
+            for name in os.listdir(self.directory):
+                if name.startswith("index.sqlite3") or name in known:
+                    continue
+                path = os.path.join(self.directory, name)
+                if name.endswith(_PARTIAL_SUFFIX) and now - os.path.getmtime(path) < _PARTIAL_MAX_AGE:
+                    continue  # another writer may still be filling it
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            self._evict_locked()
+        return removed
+
+    def stats(self):
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_audio_cache(directory=None, max_bytes=None):
+    """Process-wide ``AudioCache`` for ``directory``."""
+    directory = os.path.abspath(directory or DEFAULT_CACHE_DIR)
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = AudioCache(directory, max_bytes or DEFAULT_MAX_BYTES)
+            _caches[directory] = cache
+        elif max_bytes:
+            cache.max_bytes = int(max_bytes)
+        return cache
+
+
+def cache_stats():
+    """Hit, miss and eviction counts summed over the caches opened in this process."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {name: sum(getattr(cache, name) for cache in caches) for name in ("hits", "misses", "evictions")}
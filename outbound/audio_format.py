@@ -0,0 +1,293 @@
+"""Call audio formats and local transcoding.
+
+Twilio plays 8 kHz μ-law WAV without decoding or resampling it first, so a
+call can start sooner and fetch less than it would with MP3. When such a
+format is configured, ElevenLabs synthesizes raw 16-bit PCM once; that
+audio is loudness-normalized, resampled and encoded here into the call
+format, and the result is cached as its own variant. Previews are decoded
+back to linear PCM WAV, which every browser plays.
+
+Everything uses the standard library. ``audioop`` is used for the sample
+loops while it exists (it was removed in Python 3.13); the pure-Python
+fallbacks give the same results, only slower.
+"""
+import math
+import struct
+import sys
+import warnings
+from array import array
+from dataclasses import dataclass
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop as _audioop
+except ImportError:
+    _audioop = None
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    extension: str
+    content_type: str
+    sample_rate: int = None  # None: the provider's compressed output, played as synthesized
+    encoding: str = None  # "ulaw" or "pcm16" samples in a WAV container
+
+    @property
+    def transcoded(self):
+        return self.encoding is not None
+
+
+FORMATS = {
+    "mp3": AudioFormat("mp3", "mp3", "audio/mpeg"),
+    "wav_ulaw_8000": AudioFormat("wav_ulaw_8000", "wav", "audio/wav", 8000, "ulaw"),
+    "wav_pcm_8000": AudioFormat("wav_pcm_8000", "wav", "audio/wav", 8000, "pcm16"),
+    "wav_pcm_16000": AudioFormat("wav_pcm_16000", "wav", "audio/wav", 16000, "pcm16"),
+}
+
+# Peak ceiling applied by loudness normalization, so quiet voices are not boosted into clipping
+PEAK_DBFS = -1.0
+
+_FULL_SCALE = 32767
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_MULAW = 7
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 32635
+_ulaw_encode_table = None
+_ulaw_decode_table = None
+
+
+def get_format(name):
+    """The ``AudioFormat`` called ``name``; ``ValueError`` for unknown names."""
+    try:
+        return FORMATS[name]
+    except KeyError:
+        raise ValueError(f"unknown audio format {name!r} (expected one of {', '.join(FORMATS)})") from None
+
+
+def pcm_sample_rate(output_format):
+    """Sample rate of an ElevenLabs raw PCM output format such as ``pcm_16000``."""
+    kind, _, rate = output_format.partition("_")
+    if kind != "pcm" or not rate.isdigit():
+        raise ValueError(f"{output_format!r} is not a raw PCM output format")
+    return int(rate)
+
+
+# Sample conversion
+
+def _samples(pcm):
+    samples = array("h")
+    samples.frombytes(bytes(pcm[:len(pcm) - len(pcm) % 2]))
+    if sys.byteorder == "big":
+        samples.byteswap()  # PCM is little-endian
+    return samples
+
+
+def _pcm(samples):
+    if sys.byteorder == "big":
+        samples = array("h", samples)
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def _ulaw_encode_sample(sample):
+    sign = 0
+    if sample < 0:
+        sign = 0x80
+        sample = -(sample >> 2) << 2  # G.711 works on 14 bits; the shift rounds negatives away from zero
+    sample = min(sample, _ULAW_CLIP) + _ULAW_BIAS
+    exponent = sample.bit_length() - 8
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def _ulaw_decode_sample(code):
+    code = ~code & 0xFF
+    exponent = (code >> 4) & 0x07
+    sample = ((((code & 0x0F) << 3) + _ULAW_BIAS) << exponent) - _ULAW_BIAS
+    return -sample if code & 0x80 else sample
+
+
+def lin2ulaw(pcm):
+    """G.711 μ-law bytes for 16-bit little-endian PCM."""
+    if _audioop is not None:
+        return _audioop.lin2ulaw(pcm, 2)
+    global _ulaw_encode_table
+    if _ulaw_encode_table is None:
+        _ulaw_encode_table = bytes(_ulaw_encode_sample(value - 65536 if value > 32767 else value)
+                                   for value in range(65536))
+    table = _ulaw_encode_table
+    return bytes(table[sample & 0xFFFF] for sample in _samples(pcm))
+
+
+def ulaw2lin(data):
+    """16-bit little-endian PCM for G.711 μ-law bytes."""
+    if _audioop is not None:
+        return _audioop.ulaw2lin(data, 2)
+    global _ulaw_decode_table
+    if _ulaw_decode_table is None:
+        _ulaw_decode_table = array("h", (_ulaw_decode_sample(code) for code in range(256)))
+    table = _ulaw_decode_table
+    return _pcm(array("h", (table[code] for code in bytes(data))))
+
+
+def resample(pcm, from_rate, to_rate):
+    """Resample 16-bit PCM. Whole-number ratios average each group of samples (a simple
+    low-pass that also keeps telephony downsampling from aliasing); others interpolate."""
+    if from_rate == to_rate:
+        return bytes(pcm)
+    samples = _samples(pcm)
+    if from_rate % to_rate == 0:
+        factor = from_rate // to_rate
+        count = len(samples) // factor
+        phases = [samples[phase:count * factor:factor] for phase in range(factor)]
+        if _audioop is not None:
+            mixed = None
+            for phase in phases:
+                scaled = _audioop.mul(_pcm(phase), 2, 1.0 / factor)
+                mixed = scaled if mixed is None else _audioop.add(mixed, scaled, 2)
+            return mixed or b""
+        return _pcm(array("h", (sum(group) // factor for group in zip(*phases))))
+    if _audioop is not None:
+        return _audioop.ratecv(_pcm(samples), 2, 1, from_rate, to_rate, None)[0]
+    count = len(samples) * to_rate // from_rate
+    step = from_rate / to_rate
+    last = len(samples) - 1
+    out = array("h")
+    for index in range(count):
+        position = index * step
+        left = int(position)
+        right = min(left + 1, last)
+        fraction = position - left
+        out.append(int(samples[left] + (samples[right] - samples[left]) * fraction))
+    return _pcm(out)
+
+
+def loudness_dbfs(pcm):
+    """RMS level of 16-bit PCM in dB relative to full scale (``-inf`` for silence)."""
+    rms = _rms(pcm)
+    return 20 * math.log10(rms / _FULL_SCALE) if rms else float("-inf")
+
+
+def _rms(pcm):
+    if _audioop is not None:
+        return _audioop.rms(pcm, 2)
+    samples = _samples(pcm)
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples)) if samples else 0.0
+
+
+def _peak(pcm):
+    if _audioop is not None:
+        return _audioop.max(pcm, 2)
+    return max(map(abs, _samples(pcm)), default=0)
+
+
+def normalize_loudness(pcm, target_dbfs, peak_dbfs=PEAK_DBFS):
+    """Scale 16-bit PCM to an RMS level of ``target_dbfs``, without letting peaks exceed
+    ``peak_dbfs``. Silence is returned unchanged."""
+    rms = _rms(pcm)
+    peak = _peak(pcm)
+    if rms < 1 or not peak:
+        return bytes(pcm)
+    gain = min(
+        _FULL_SCALE * 10 ** (target_dbfs / 20) / rms,
+        _FULL_SCALE * 10 ** (peak_dbfs / 20) / peak,
+    )
+    if abs(gain - 1) < 0.01:
+        return bytes(pcm)
+    if _audioop is not None:
+        return _audioop.mul(pcm, 2, gain)
+    return _pcm(array("h", (max(-32768, min(32767, int(sample * gain))) for sample in _samples(pcm))))
+
+
+# WAV container
+
+def wav_bytes(frames, sample_rate, encoding="pcm16"):
+    """A mono WAV file around ``frames`` (16-bit PCM or μ-law bytes)."""
+    frames = bytes(frames)
+    if encoding == "ulaw":
+        # Non-PCM formats carry cbSize and a fact chunk with the sample count
+        fmt = struct.pack("<HHIIHHH", _WAVE_FORMAT_MULAW, 1, sample_rate, sample_rate, 1, 8, 0)
+        extra = b"fact" + struct.pack("<II", 4, len(frames))
+    elif encoding == "pcm16":
+        fmt = struct.pack("<HHIIHH", _WAVE_FORMAT_PCM, 1, sample_rate, sample_rate * 2, 2, 16)
+        extra = b""
+    else:
+        raise ValueError(f"unsupported WAV encoding {encoding!r}")
+    padding = b"\x00" if len(frames) % 2 else b""
+    body = (
+        b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + extra
+        + b"data" + struct.pack("<I", len(frames)) + frames + padding
+    )
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def read_wav(data):
+    """``(frames, sample_rate, encoding)`` of a mono WAV written by ``wav_bytes`` (or any
+    16-bit PCM / μ-law WAV)."""
+    data = memoryview(data)
+    if bytes(data[:4]) != b"RIFF" or bytes(data[8:12]) != b"WAVE":
+        raise ValueError("not a WAV file")
+    position = 12
+    encoding = sample_rate = None
+    while position + 8 <= len(data):
+        chunk_id = bytes(data[position:position + 4])
+        size = struct.unpack_from("<I", data, position + 4)[0]
+        start = position + 8
+        if chunk_id == b"fmt ":
+            tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", data, start)
+            if channels != 1:
+                raise ValueError("only mono WAV audio is supported")
+            if tag == _WAVE_FORMAT_MULAW:
+                encoding = "ulaw"
+            elif tag == _WAVE_FORMAT_PCM and bits == 16:
+                encoding = "pcm16"
+            else:
+                raise ValueError(f"unsupported WAV format {tag} ({bits} bit)")
+        elif chunk_id == b"data":
+            if encoding is None:
+                raise ValueError("WAV data before its format")
+            return bytes(data[start:start + size]), sample_rate, encoding
+        position = start + size + size % 2
+    raise ValueError("WAV file has no data")
+
+
+def join_wav(files):
+    """Join WAV files of one format into one (used to stitch clips)."""
+    frames = []
+    sample_rate = encoding = None
+    for data in files:
+        clip, rate, clip_encoding = read_wav(data)
+        if sample_rate is None:
+            sample_rate, encoding = rate, clip_encoding
+        elif (rate, clip_encoding) != (sample_rate, encoding):
+            raise ValueError("cannot join WAV clips of different formats")
+        frames.append(clip)
+    if sample_rate is None:
+        raise ValueError("no WAV clips to join")
+    return wav_bytes(b"".join(frames), sample_rate, encoding)
+
+
+# Pipeline
+
+def transcode_pcm(pcm, source_rate, audio_format, loudness_target=None):
+    """Turn raw 16-bit PCM from the provider into ``audio_format`` (a transcoded WAV format),
+    normalizing its loudness first when ``loudness_target`` (dBFS) is given."""
+    if not audio_format.transcoded:
+        raise ValueError(f"{audio_format.name} audio comes from the provider as-is")
+    if loudness_target is not None:
+        pcm = normalize_loudness(pcm, loudness_target)
+    pcm = resample(pcm, source_rate, audio_format.sample_rate)
+    frames = lin2ulaw(pcm) if audio_format.encoding == "ulaw" else pcm
+    return wav_bytes(frames, audio_format.sample_rate, audio_format.encoding)
+
+
+def preview_wav(data):
+    """Browser-playable 16-bit PCM WAV for WAV call audio (browsers differ on μ-law)."""
+    frames, sample_rate, encoding = read_wav(data)
+    if encoding == "pcm16":
+        return bytes(data)
+    return wav_bytes(ulaw2lin(frames), sample_rate, "pcm16")
@@ -0,0 +1,268 @@
+"""Call outcomes from Twilio status callbacks, with a batched fallback.
+
+``calls.create`` only tells us Twilio accepted the request (status
+``queued``). The real outcome arrives later: Twilio POSTs ``StatusCallback``
+events to ``/twilio/status`` on the media server, and they are written to a
+SQLite store keyed by call SID. When callbacks cannot reach us (no public
+URL) or some were missed, ``reconcile_calls`` pages through Twilio's call list
+for the campaign's time window instead of fetching every call on its own.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import parse_qsl
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "outbound-agent", "calls.sqlite3")
+STATUS_CALLBACK_PATH = "/twilio/status"
+STATUS_CALLBACK_EVENTS = ["initiated", "ringing", "answered", "completed"]
+
+# Callbacks can arrive out of order; a status never replaces a later one
+STATUS_RANK = {
+    "queued": 0,
+    "initiated": 1,
+    "ringing": 2,
+    "in-progress": 3,
+    "completed": 4,
+    "busy": 4,
+    "no-answer": 4,
+    "failed": 4,
+    "canceled": 4,
+}
+TERMINAL_STATUSES = frozenset(status for status, rank in STATUS_RANK.items() if rank == 4)
+
+# Summary buckets shown in the UI and CLI
+OUTCOMES = {
+    "answered": ("in-progress", "completed"),
+    "busy": ("busy",),
+    "no-answer": ("no-answer",),
+    "failed": ("failed", "canceled", "rejected"),
+    "pending": ("queued", "initiated", "ringing"),
+}
+
+
+def new_campaign_id():
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def twilio_signature(auth_token, url, params):
+    """``X-Twilio-Signature`` for a form POST to ``url`` with ``params``."""
+    payload = url + "".join(f"{name}{params[name]}" for name in sorted(params))
+    digest = hmac.new(auth_token.encode(), payload.encode("utf-8"), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+
+class CallStatusStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS calls ("
+            " sid TEXT PRIMARY KEY,"
+            " campaign TEXT,"
+            " number TEXT,"
+            " language TEXT,"
+            " status TEXT NOT NULL,"
+            " rank INTEGER NOT NULL,"
+            " duration INTEGER,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS calls_campaign_status ON calls (campaign, status)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS campaigns ("
+            " id TEXT PRIMARY KEY,"
+            " started REAL NOT NULL,"
+            " from_number TEXT)"
+        )
+        self._db.commit()
+
+    def start_campaign(self, campaign_id, from_number=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO campaigns (id, started, from_number) VALUES (?, ?, ?)",
+                (campaign_id, time.time(), from_number),
+            )
+            self._db.commit()
+
+    def campaign(self, campaign_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT started, from_number FROM campaigns WHERE id = ?", (campaign_id,)
+            ).fetchone()
+        return {"id": campaign_id, "started": row[0], "from_number": row[1]} if row else None
+
+    def record_calls(self, campaign_id, calls):
+        """Register placed calls: ``(sid, number, language, status)`` tuples.
+
+        A callback can beat the registration; its status is kept.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO calls (sid, campaign, number, language, status, rank, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (sid) DO UPDATE SET"
+                " campaign = excluded.campaign, number = excluded.number, language = excluded.language",
+                [
+                    (sid, campaign_id, number, language, status, STATUS_RANK.get(status, 0), now, now)
+                    for sid, number, language, status in calls
+                ],
+            )
+            self._db.commit()
+
+    def apply_events(self, events):
+        """Apply ``(sid, status, duration)`` updates in one transaction; stale ones are ignored."""
+        now = time.time()
+        rows = [
+            (status, STATUS_RANK.get(status, 4), duration, now, sid, STATUS_RANK.get(status, 4))
+            for sid, status, duration in events
+            if sid and status
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO calls (sid, status, rank, created, updated) VALUES (?5, ?1, ?2, ?4, ?4)"
+                " ON CONFLICT (sid) DO UPDATE SET"
+                " status = excluded.status, rank = excluded.rank,"
+                " duration = COALESCE(?3, duration), updated = excluded.updated"
+                " WHERE calls.rank <= ?6",
+                rows,
+            )
+            self._db.commit()
+        return len(rows)
+
+    def pending_sids(self, campaign_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sid FROM calls WHERE campaign = ? AND rank < 4", (campaign_id,)
+            ).fetchall()
+        return {sid for (sid,) in rows}
+
+    def call_statuses(self, campaign_id):
+        """``{sid: status}`` for every call of the campaign."""
+        with self._lock:
+            rows = self._db.execute("SELECT sid, status FROM calls WHERE campaign = ?", (campaign_id,)).fetchall()
+        return dict(rows)
+
+    def placed_numbers(self, campaign_id):
+        """``{number: sid}`` for every call of the campaign Twilio accepted."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT number, sid FROM calls WHERE campaign = ? AND number IS NOT NULL", (campaign_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def status_counts(self, campaign_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM calls WHERE campaign = ? GROUP BY status", (campaign_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def outcome_counts(self, campaign_id):
+        """Counts per summary bucket (answered, busy, no-answer, failed, pending) plus the total."""
+        by_status = self.status_counts(campaign_id)
+        counts = {
+            outcome: sum(by_status.get(status, 0) for status in statuses)
+            for outcome, statuses in OUTCOMES.items()
+        }
+        counts["total"] = sum(by_status.values())
+        return counts
+
+
+def parse_status_callback(body):
+    """Form-decode a status callback body into a dict."""
+    return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+
+
+def status_event(params):
+    """``(sid, status, duration)`` from status callback parameters."""
+    duration = params.get("CallDuration")
+    return params.get("CallSid"), params.get("CallStatus"), int(duration) if duration else None
+
+
+def make_status_handler(store, public_base_url, auth_token=None):
+    """Media server route handler that records Twilio status callbacks.
+
+    Requests are checked against ``X-Twilio-Signature`` when an auth token is
+    given. The SQLite write runs off the event loop.
+    """
+    import asyncio
+
+    callback_url = public_base_url.rstrip("/") + STATUS_CALLBACK_PATH
+
+    async def handle(headers, body):
+        params = parse_status_callback(body)
+        if auth_token:
+            expected = twilio_signature(auth_token, callback_url, params)
+            if not hmac.compare_digest(headers.get("x-twilio-signature", ""), expected):
+                return 403, {}, b""
+        event = status_event(params)
+        if not event[0] or not event[1]:
+            return 400, {}, b""
+        await asyncio.get_running_loop().run_in_executor(None, store.apply_events, [event])
+        return 204, {}, b""
+
+    return handle
+
+
+def reconcile_calls(store, campaign_id, client, page_size=1000):
+    """Catch up on pending calls by paging through Twilio's call list.
+
+    Lists every call placed from the campaign's numbers (comma separated when
+    it used a caller-ID pool) since it started, a page at a time, and stops
+    early once no pending SID is left. Returns the number of calls updated.
+    """
+    pending = store.pending_sids(campaign_id)
+    campaign = store.campaign(campaign_id)
+    if not pending or campaign is None:
+        return 0
+    from datetime import datetime, timedelta, timezone
+
+    filters = {"start_time_after": datetime.fromtimestamp(campaign["started"], timezone.utc) - timedelta(minutes=1)}
+    from_numbers = campaign["from_number"].split(",") if campaign["from_number"] else [None]
+
+    updated = 0
+    events = []
+    for from_number in from_numbers:
+        if from_number:
+            filters["from_"] = from_number
+        # stream() fetches one page per request; each page is written in one transaction
+        for call in client.calls.stream(page_size=page_size, **filters):
+            if call.sid in pending:
+                pending.discard(call.sid)
+                events.append((call.sid, call.status, int(call.duration) if call.duration else None))
+            if len(events) >= page_size or (events and not pending):
+                updated += store.apply_events(events)
+                events = []
+            if not pending:
+                break
+        if not pending:
+            break
+    if events:
+        updated += store.apply_events(events)
+    return updated
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_call_status_store(path=None):
+    """Process-wide ``CallStatusStore`` for ``path``."""
+    path = os.path.abspath(path or DEFAULT_STORE_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = CallStatusStore(path)
+            _stores[path] = store
+        return store
@@ -0,0 +1,209 @@
+"""Caller-ID pool: spreads outgoing calls over several Twilio numbers.
+
+Twilio limits how fast each number can place calls, so one sender number
+caps the campaign. With a pool, every call borrows a number for the
+duration of its ``calls.create`` request:
+
+- each number has its own token bucket of ``calls_per_second``, and a call
+  takes the least-loaded number whose bucket has a token (so throughput
+  grows with the number of healthy numbers);
+- numbers that keep getting throttled or rejected as caller ID are rested
+  for a cool-down, like a circuit breaker, and then tried again;
+- with ``affinity`` a recipient is always called from the same number
+  (rendezvous hashing, so adding a number only moves the recipients it
+  takes over), unless that number is resting.
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from .dispatch import token_bucket
+
+# Twilio errors that mean the sender number itself is the problem: its own rate limit,
+# an unverified or invalid caller ID (errors about the dialed number do not count)
+_SENDER_ERROR_CODES = {20429, 21210, 21212}
+
+
+def parse_numbers(raw):
+    """Sender numbers from a comma or whitespace separated setting, without duplicates."""
+    if not raw:
+        return ()
+    if isinstance(raw, str):
+        raw = raw.replace(",", " ").split()
+    return tuple(dict.fromkeys(number.strip() for number in raw if number and number.strip()))
+
+
+def _sender_fault(error):
+    if getattr(error, "code", None) in _SENDER_ERROR_CODES:
+        return True
+    for candidate in (error, getattr(error, "response", None)):
+        if getattr(candidate, "status_code", None) == 429 or getattr(candidate, "status", None) == 429:
+            return True
+    return False
+
+
+class _Sender:
+    __slots__ = ("number", "bucket", "in_flight", "calls", "failures", "consecutive_failures", "resting_until")
+
+    def __init__(self, number, calls_per_second, shared_path=None):
+        self.number = number
+        self.bucket = token_bucket(calls_per_second, f"caller-id:{number}", shared_path)
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.resting_until = 0.0
+
+
+class CallerIdPool:
+    """Lends sender numbers to concurrent calls, at most ``calls_per_second`` each (0: unlimited).
+
+    A number is rested for ``cooldown`` seconds after ``failure_threshold``
+    consecutive calls failed because of it. When every number is resting the
+    one that has rested longest is used, so a campaign slows down instead of
+    failing. With ``shared_path`` the per-number rates are kept in that SQLite
+    file and shared with every process using it (see ``SharedTokenBucket``).
+    """
+
+    def __init__(self, numbers, calls_per_second=1.0, affinity=False, failure_threshold=5, cooldown=30.0,
+                 shared_path=None):
+        numbers = parse_numbers(numbers)
+        if not numbers:
+            raise ValueError("no Twilio sender number configured (TWILIO_PHONE_NUMBERS or TWILIO_PHONE_NUMBER)")
+        self.calls_per_second = float(calls_per_second or 0)
+        self.affinity = affinity
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._senders = {number: _Sender(number, calls_per_second, shared_path) for number in numbers}
+        self._lock = threading.Lock()
+
+    @property
+    def numbers(self):
+        return tuple(self._senders)
+
+    @property
+    def total_calls_per_second(self):
+        return self.calls_per_second * len(self._senders)
+
+    def preferred(self, to_number):
+        """The number ``to_number`` is always called from when affinity is on."""
+        return max(
+            self._senders,
+            key=lambda number: hashlib.sha1(f"{number}|{to_number}".encode()).digest()
+        )
+
+    def _candidates(self, to_number, now):
+        healthy = [sender for sender in self._senders.values() if sender.resting_until <= now]
+        if not healthy:
+            return [min(self._senders.values(), key=lambda sender: sender.resting_until)]
+        if self.affinity and to_number:
+            sender = self._senders[self.preferred(to_number)]
+            if sender.resting_until <= now:
+                return [sender]
+        return healthy
+
+    def acquire(self, to_number=None):
+        """Borrow a sender number for a call to ``to_number``, waiting for a free token.
+        Hand it back with ``release``."""
+        while True:
+            with self._lock:
+                candidates = [
+                    (sender, sender.in_flight, sender.calls)
+                    for sender in self._candidates(to_number, time.monotonic())
+                ]
+            # Least loaded first: a token now, then fewest calls in flight, then fewest calls so far.
+            # Buckets are asked outside the lock, since a shared bucket is a SQLite transaction per call
+            sender, _, _ = min(candidates, key=lambda candidate: (
+                candidate[0].bucket.wait_time() if candidate[0].bucket else 0.0, candidate[1], candidate[2]
+            ))
+            wait = sender.bucket.try_acquire() if sender.bucket else 0.0
+            if wait <= 0:
+                with self._lock:
+                    sender.in_flight += 1
+                    sender.calls += 1
+                return sender.number
+            time.sleep(wait)
+
+    def release(self, number, error=None):
+        """Return a borrowed number; ``error`` is the call's exception, if it failed."""
+        with self._lock:
+            sender = self._senders[number]
+            sender.in_flight -= 1
+            if error is None:
+                sender.consecutive_failures = 0
+                sender.resting_until = 0.0
+            elif _sender_fault(error):
+                sender.failures += 1
+                sender.consecutive_failures += 1
+                if sender.consecutive_failures >= self.failure_threshold:
+                    sender.resting_until = time.monotonic() + self.cooldown
+
+    @contextmanager
+    def lease(self, to_number=None):
+        """``with pool.lease(to) as number:`` borrows a number for one call."""
+        number = self.acquire(to_number)
+        try:
+            yield number
+        except BaseException as e:
+            self.release(number, e)
+            raise
+        else:
+            self.release(number)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                number: {
+                    "calls": sender.calls,
+                    "failures": sender.failures,
+                    "in_flight": sender.in_flight,
+                    "resting_for": max(0.0, sender.resting_until - now),
+                }
+                for number, sender in self._senders.items()
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def sender_numbers(settings):
+    """The configured sender numbers: ``TWILIO_PHONE_NUMBERS``, else ``TWILIO_PHONE_NUMBER``."""
+    return settings.twilio_phone_numbers or parse_numbers(settings.twilio_phone_number)
+
+
+def get_caller_id_pool(settings=None):
+    """Process-wide ``CallerIdPool`` for the current settings (shared by every campaign)."""
+    from .config import get_settings
+
+    settings = settings or get_settings()
+    key = (
+        sender_numbers(settings), settings.calls_per_second, settings.caller_id_affinity,
+        settings.breaker_failure_threshold, settings.breaker_reset_seconds, settings.rate_limit_path,
+    )
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = CallerIdPool(*key)
+            _pools[key] = pool
+        return pool
+
+
+def campaign_calls_per_second(settings=None):
+    """Dispatch rate for a campaign: the per-number rate times the number of sender numbers."""
+    from .config import get_settings
+
+    settings = settings or get_settings()
+    return settings.calls_per_second * max(1, len(sender_numbers(settings)))
+
+
+def caller_id_stats():
+    """``{number: stats}`` over the pools opened in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    stats = {}
+    for pool in pools:
+        stats.update(pool.stats())
+    return stats
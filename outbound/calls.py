@@ -0,0 +1,216 @@
+"""TwiML construction and Twilio call placement."""
+import threading
+
+from . import notices
+from .caller_id import get_caller_id_pool
+from .call_status import (
+    STATUS_CALLBACK_EVENTS,
+    STATUS_CALLBACK_PATH,
+    get_call_status_store,
+    make_status_handler,
+    reconcile_calls,
+)
+from .clients import get_twilio_client
+from .config import get_settings
+from .metrics import make_metrics_handler, record_call, record_fallback, timed
+from .resilience import call_with_resilience
+from .streaming import translate_and_synthesize
+from .text import split_sentences
+from .translation import translate_text_groq
+from .tts import configured_media_server, generate_and_publish_elevenlabs_audio, publish_buffer
+from .tts_router import get_tts_router, route_speech
+
+_status_receiver_lock = threading.Lock()
+_status_receivers = set()
+
+
+# Function to build <Play> TwiML for hosted audio
+def play_twiml(audio_url):
+    from twilio.twiml.voice_response import VoiceResponse
+
+    twiml = VoiceResponse()
+    twiml.play(audio_url)
+    return str(twiml)
+
+
+# Function to build TwiML that plays several audio clips back to back
+def play_sequence_twiml(audio_urls):
+    from twilio.twiml.voice_response import VoiceResponse
+
+    twiml = VoiceResponse()
+    for audio_url in audio_urls:
+        twiml.play(audio_url)
+    return str(twiml)
+
+
+# Function to build <Say> TwiML (Twilio Polly voice when given, default voice otherwise)
+def say_twiml(message, language_code, voice=None):
+    from twilio.twiml.voice_response import VoiceResponse
+
+    twiml = VoiceResponse()
+    if voice:
+        twiml.say(message, voice=voice, language=language_code)
+    else:
+        twiml.say(message, language=language_code)
+    return str(twiml)
+
+
+# Function to build the TwiML for a call (ElevenLabs audio or Twilio voice)
+def build_call_twiml(message, language_code="en-IN", voice="alice", provider="twilio"):
+    if provider == "elevenlabs" and route_speech([message], voice) != "elevenlabs":
+        # ElevenLabs is slow, failing or over budget: Twilio's voice keeps the campaign moving
+        return say_twiml(message, language_code)
+    if provider == "elevenlabs":
+        # Generate new audio and publish it (media server or temporary hosting)
+        audio, audio_url = generate_and_publish_elevenlabs_audio(message, voice)
+        if audio_url:
+            return play_twiml(audio_url)
+        if audio:
+            # Fallback to Twilio TTS if publishing fails
+            notices.warn("Audio upload failed. Using Twilio TTS fallback.")
+            record_fallback("publish_failed")
+        else:
+            record_fallback("synthesis_failed")
+        # Fallback to Twilio TTS
+        return say_twiml(message, language_code)
+    
+    # Use Twilio Polly voices
+    return say_twiml(message, language_code, voice)
+
+
+# Function to return the StatusCallback URL for calls, starting the receiver on the media server
+# the first time. None when no public address is configured (outcomes then come from reconciling).
+def status_callback_url():
+    settings = get_settings()
+    if not settings.status_callback_base_url:
+        return None
+    if settings.media_server_external:
+        # Sharded dispatch worker: the receiver runs with the media server in the parent process
+        return settings.status_callback_base_url.rstrip("/") + STATUS_CALLBACK_PATH
+    try:
+        server = configured_media_server()
+    except OSError as e:
+        # No receiver (the port is taken, say): outcomes come from reconciling instead
+        notices.warn(f"Call status receiver could not start: {e}")
+        return None
+    with _status_receiver_lock:
+        if id(server) not in _status_receivers:
+            server.add_route("POST", STATUS_CALLBACK_PATH, make_status_handler(
+                get_call_status_store(settings.call_status_path),
+                settings.status_callback_base_url,
+                settings.twilio_auth_token
+            ))
+            _status_receivers.add(id(server))
+    return settings.status_callback_base_url.rstrip("/") + STATUS_CALLBACK_PATH
+
+
+# Function to serve Prometheus metrics at /metrics on the media server (starting it if needed)
+def serve_metrics():
+    settings = get_settings()
+    server = configured_media_server()
+    server.add_route("GET", "/metrics", make_metrics_handler(settings.metrics_token))
+    return server
+
+
+# Function to place a single Twilio call with prebuilt TwiML (safe to run from worker threads)
+def place_twilio_call(to_number, twiml):
+    settings = get_settings()
+    try:
+        # Shared Twilio client (pooled keep-alive connections)
+        client = get_twilio_client(
+            settings.twilio_account_sid, settings.twilio_auth_token, settings.twilio_api_base_url
+        )
+        
+        # Ask Twilio to report how the call ends, not just that it was queued
+        callback = {}
+        callback_url = status_callback_url()
+        if callback_url:
+            callback = {
+                "status_callback": callback_url,
+                "status_callback_event": STATUS_CALLBACK_EVENTS,
+                "status_callback_method": "POST",
+            }
+        
+        # Every attempt borrows a sender number from the caller-ID pool (least loaded, within
+        # its own calls-per-second), so retries are rate-limited too and may use another number
+        pool = get_caller_id_pool(settings)
+        sender = {}
+        
+        def create(**kwargs):
+            with pool.lease(to_number) as from_number:
+                sender["number"] = from_number
+                return client.calls.create(from_=from_number, **kwargs)
+        
+        # Make the call. Only retried when Twilio cannot have created it (429, connect errors),
+        # so a retry never rings someone twice; an open breaker is waited out so a Twilio
+        # outage delays the campaign instead of failing its calls
+        with timed("dial"):
+            call = call_with_resilience(
+                "twilio",
+                create,
+                to=to_number,
+                twiml=twiml,
+                idempotent=False,
+                wait_if_open=True,
+                **callback
+            )
+        record_call(True)
+        
+        return {
+            "success": True, 
+            "sid": call.sid, 
+            "status": call.status,
+            "to": to_number,
+            "from": sender["number"]
+        }
+        
+    except Exception as e:
+        record_call(False)
+        return {"success": False, "error": str(e)}
+
+
+# Function to catch up on a campaign's call outcomes with paged Twilio list queries (no per-call fetches)
+def reconcile_campaign(campaign_id):
+    settings = get_settings()
+    client = get_twilio_client(
+        settings.twilio_account_sid, settings.twilio_auth_token, settings.twilio_api_base_url
+    )
+    store = get_call_status_store(settings.call_status_path)
+    return call_with_resilience("twilio", reconcile_calls, store, campaign_id, client)
+
+
+# Function to make Twilio call with multi-lingual support
+def make_twilio_call(to_number, message, language_code="en-IN", voice="alice", provider="twilio"):
+    try:
+        twiml = build_call_twiml(message, language_code, voice, provider)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    return place_twilio_call(to_number, twiml)
+
+
+# Function to prepare <Play> TwiML by synthesizing each sentence while the rest is translated.
+# None when it cannot (the caller then translates and synthesizes the whole message in turn).
+def stream_language_twiml(message, lang_obj):
+    try:
+        _, cache_key, buffer = translate_and_synthesize(message, lang_obj["code"], lang_obj["voice"])
+        audio_url = publish_buffer(cache_key, buffer)
+    except Exception as e:
+        notices.warn(f"Sentence streaming failed: {str(e)}. Preparing the whole message instead.")
+        audio_url = None
+    if not audio_url:
+        record_fallback("sentence_streaming_failed")
+        return None
+    return play_twiml(audio_url)
+
+
+# Function to prepare the TwiML for one campaign language (safe to run from worker threads)
+def prepare_language_twiml(message, lang_obj):
+    settings = get_settings()
+    with timed("prepare"):
+        if (lang_obj["provider"] == "elevenlabs" and settings.sentence_streaming and settings.elevenlabs_api_key
+                and len(split_sentences(message)) > 1 and get_tts_router().available(len(message))):
+            twiml = stream_language_twiml(message, lang_obj)
+            if twiml:
+                return twiml
+        translated = translate_text_groq(message, lang_obj["code"])
+        return build_call_twiml(translated, lang_obj["code"], lang_obj["voice"], lang_obj["provider"])
@@ -0,0 +1,170 @@
+"""Campaign preparation shared by every recipient of the same language."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def group_by_language(recipients, default_language):
+    """Map each language to the recipients who prefer it.
+
+    ``recipients`` yields ``(number, language_code_or_None)``; recipients
+    without a preference use ``default_language``.
+    """
+    groups = {}
+    for number, language in recipients:
+        groups.setdefault(language or default_language, []).append(number)
+    return groups
+
+
+def prepare_variants(keys, prepare, max_workers=4, initializer=None):
+    """Run ``prepare(key)`` once per distinct key, concurrently.
+
+    Returns ``{key: result}``. An exception from ``prepare`` is stored as the
+    result for that key so one failing language does not sink the others.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+
+    def _run(key):
+        try:
+            return prepare(key)
+        except Exception as e:
+            return e
+
+    if len(keys) == 1:
+        return {keys[0]: _run(keys[0])}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(keys))), initializer=initializer) as executor:
+        return dict(zip(keys, executor.map(_run, keys)))
+
+
+def prepare_languages(languages, message, default_language, prepared=None, initializer=None, translated=None):
+    """Translate/synthesize ``message`` once per language; returns ``{language: variant}``.
+
+    A variant is the language's TwiML, a ``PersonalizedMessage`` for templates
+    with ``{slot}`` placeholders, or the exception that prevented it.
+    ``prepared`` maps languages the caller already prepared to their variant;
+    TwiML in it is ignored for templates, which are personalized per recipient.
+    ``translated`` maps languages to a reviewed translation of ``message``, which
+    is spoken instead of translating again (its audio is published now, so its
+    URL is fresh); templates ignore it too.
+    """
+    from .calls import build_call_twiml, prepare_language_twiml
+    from .config import get_settings
+    from .languages import LANGUAGES_BY_CODE
+    from .personalize import PersonalizedMessage, template_slots
+
+    settings = get_settings()
+    # One translation/synthesis per distinct language, not per recipient. Templates with
+    # {slot} placeholders prepare the static segments here and fill slots per recipient.
+    if template_slots(message):
+        def prepare(code):
+            return PersonalizedMessage(message, LANGUAGES_BY_CODE[code], settings.personalized_playback)
+        prepared = {
+            code: variant for code, variant in (prepared or {}).items() if isinstance(variant, PersonalizedMessage)
+        }
+    else:
+        def prepare(code):
+            lang_obj = LANGUAGES_BY_CODE[code]
+            if code in (translated or {}):
+                return build_call_twiml(translated[code], code, lang_obj["voice"], lang_obj["provider"])
+            return prepare_language_twiml(message, lang_obj)
+
+    languages = {language or default_language for language in languages}
+    variants = dict(prepared or {})
+    missing = [code for code in languages if code not in variants]
+    variants.update(prepare_variants(
+        missing,
+        prepare,
+        max_workers=settings.language_prepare_workers,
+        initializer=initializer
+    ))
+    return variants
+
+
+def prepare_campaign(languages, message, default_language, prepared=None, dial_number=None, send_call=None,
+                     initializer=None, campaign_id=None, translated=None):
+    """Translate/synthesize once per language and return ``send(recipient)``.
+
+    ``languages`` are the recipients' preferred language codes (``None`` for
+    the default). ``prepared`` maps languages whose TwiML the caller already
+    built to that TwiML, and ``translated`` maps languages to a reviewed
+    translation; see ``prepare_languages``. ``dial_number(recipient)`` picks the number to dial and
+    ``send_call(dial_number, twiml)`` places the call (``place_twilio_call``
+    by default). With a ``campaign_id`` every placed call is registered in the
+    call status store as it goes out, so outcomes can be counted per campaign
+    while it runs.
+    """
+    from .call_status import get_call_status_store
+    from .caller_id import sender_numbers
+    from .calls import place_twilio_call
+    from .config import get_settings
+    from .personalize import PersonalizedMessage
+
+    settings = get_settings()
+    dial_number = dial_number or (lambda recipient: recipient.number)
+    send_call = send_call or place_twilio_call
+    store = None
+    if campaign_id:
+        store = get_call_status_store(settings.call_status_path)
+        store.start_campaign(campaign_id, ",".join(sender_numbers(settings)) or None)
+
+    twiml_by_language = prepare_languages(languages, message, default_language, prepared, initializer, translated)
+    lock = threading.Lock()
+
+    def variant(language):
+        twiml = twiml_by_language.get(language)
+        if twiml is None:
+            # A language none of ``languages`` had (a recipient queued again since): prepared once, on first use
+            with lock:
+                if language not in twiml_by_language:
+                    twiml_by_language.update(prepare_languages(
+                        [language], message, default_language, prepared, initializer, translated
+                    ))
+                twiml = twiml_by_language[language]
+        return twiml
+
+    def send(recipient):
+        language = recipient.language or default_language
+        twiml = variant(language)
+        if isinstance(twiml, Exception):
+            return {"success": False, "error": str(twiml)}
+        if isinstance(twiml, PersonalizedMessage):
+            twiml = twiml.twiml_for(recipient)
+        result = send_call(dial_number(recipient), twiml)
+        if store is not None and result.get("sid"):
+            store.record_calls(campaign_id, [(
+                result["sid"], recipient.number, language, result.get("status") or "queued"
+            )])
+        return result
+
+    return send
+
+
+def run_campaign(recipients, message, default_language, prepared=None, dial_number=None, send_call=None,
+                 on_progress=None, initializer=None, campaign_id=None):
+    """Prepare every language once (see ``prepare_campaign``), then dispatch every call.
+
+    ``recipients`` are ``Recipient`` records (a ``CallingList`` works).
+    Returns ``[{"number": ..., "language": ..., "result": {...}}]`` in recipient order.
+    """
+    from .caller_id import campaign_calls_per_second
+    from .config import get_settings
+    from .dispatch import dispatch_calls
+
+    settings = get_settings()
+    recipients = list(recipients)
+    send = prepare_campaign(
+        (r.language for r in recipients), message, default_language, prepared=prepared,
+        dial_number=dial_number, send_call=send_call, initializer=initializer, campaign_id=campaign_id
+    )
+    results = dispatch_calls(
+        [(recipient.number, recipient) for recipient in recipients],
+        send,
+        calls_per_second=campaign_calls_per_second(settings),
+        max_workers=settings.dispatch_max_workers,
+        on_progress=on_progress
+    )
+    for recipient, result in zip(recipients, results):
+        result["language"] = recipient.language or default_language
+    return results
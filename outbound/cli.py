@@ -0,0 +1,396 @@
+"""Headless campaign runner.
+
+    python -m outbound run recipients.csv --message-file reminder.txt --out results.csv
+
+Reads the same settings as the Streamlit app from the environment (and
+``.env`` when python-dotenv is installed). Provider SDKs are only imported
+when a call, translation or synthesis actually needs them.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+RESULT_FIELDS = ["number", "language", "success", "sid", "status", "error"]
+
+
+def _load_dotenv():
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _dry_run_call(to_number, twiml):
+    return {"success": True, "sid": None, "status": "dry-run", "to": to_number}
+
+
+def write_results(path, results):
+    """Write campaign results as .csv, .json or .jsonl (by extension; ``-`` for stdout JSON lines)."""
+    rows = [
+        {
+            "number": r["number"],
+            "language": r.get("language"),
+            "success": r["result"].get("success"),
+            "sid": r["result"].get("sid"),
+            "status": r["result"].get("status"),
+            "error": r["result"].get("error"),
+        }
+        for r in results
+    ]
+    if path == "-":
+        for row in rows:
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        elif path.endswith(".json"):
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def format_outcomes(counts):
+    return (
+        f"answered {counts['answered']}, busy {counts['busy']}, no-answer {counts['no-answer']}, "
+        f"failed {counts['failed']}, pending {counts['pending']} (of {counts['total']})"
+    )
+
+
+def follow_outcomes(campaign_id, timeout, interval=5.0, reconcile_every=30.0, quiet=False):
+    """Print live outcome counts until no call is pending or ``timeout`` seconds pass.
+
+    Status callbacks update the store as they arrive; a paged reconcile with
+    Twilio runs every ``reconcile_every`` seconds to catch anything missed
+    (every poll when no callback URL is configured).
+    """
+    from .call_status import get_call_status_store
+    from .calls import reconcile_campaign
+    from .config import get_settings
+
+    settings = get_settings()
+    store = get_call_status_store(settings.call_status_path)
+    if not settings.status_callback_base_url:
+        reconcile_every = interval
+    deadline = time.monotonic() + timeout
+    last_reconcile = time.monotonic()
+    while True:
+        counts = store.outcome_counts(campaign_id)
+        if not quiet:
+            print(format_outcomes(counts), file=sys.stderr)
+        if not counts["pending"] or time.monotonic() >= deadline:
+            return counts
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        if time.monotonic() - last_reconcile >= reconcile_every:
+            try:
+                reconcile_campaign(campaign_id)
+            except Exception as e:
+                print(f"Reconcile failed: {e}", file=sys.stderr)
+            last_reconcile = time.monotonic()
+
+
+def run_job_foreground(job_id, send_call=None, quiet=False):
+    """Run a job on a worker thread until it finishes; Ctrl-C pauses it after the calls in flight."""
+    import threading
+
+    from .calls import serve_metrics
+    from .config import get_settings
+    from .jobs import get_job_store, run_job
+
+    settings = get_settings()
+    if settings.metrics_enabled:
+        serve_metrics()
+    store = get_job_store(settings.job_store_path)
+    stop = threading.Event()
+    outcome = {}
+
+    def on_progress(done, total):
+        if not quiet:
+            print(f"Called {done}/{total}", file=sys.stderr)
+
+    def target():
+        try:
+            outcome["state"] = run_job(store, job_id, send_call=send_call, batch_size=settings.job_batch_size,
+                                       stop=stop, on_progress=on_progress)
+        except Exception as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=target, name="campaign-job")
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        print("Pausing after the calls in flight...", file=sys.stderr)
+        stop.set()
+        worker.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    state = outcome.get("state")
+    if state != "done":
+        print(f"Job {job_id} is {state}; continue with: python -m outbound resume {job_id}", file=sys.stderr)
+    return store, state
+
+
+def run_job_sharded(job_id, processes, send_call=None, quiet=False):
+    """Run a job on ``processes`` worker processes (see ``outbound.sharding``); Ctrl-C pauses it."""
+    from .config import get_settings
+    from .jobs import get_job_store
+    from .sharding import run_sharded
+
+    def on_progress(done, total):
+        if not quiet:
+            print(f"Called {done}/{total}", file=sys.stderr)
+
+    try:
+        state = run_sharded(job_id, processes, send_call=send_call, on_progress=on_progress)
+    except KeyboardInterrupt:
+        state = None
+    store = get_job_store(get_settings().job_store_path)
+    state = state or store.get_job(job_id)["state"]
+    if state != "done":
+        print(f"Job {job_id} is {state}; continue with: python -m outbound resume {job_id}", file=sys.stderr)
+    return store, state
+
+
+def finish_job(args, job_id, store, started, first_call):
+    """Follow outcomes if asked, write results and print the summary; returns the exit code."""
+    from .call_status import get_call_status_store
+    from .config import get_settings
+
+    if args.wait and not getattr(args, "dry_run", False):
+        follow_outcomes(job_id, args.wait, quiet=args.quiet)
+    results = store.results(job_id)
+    statuses = get_call_status_store(get_settings().call_status_path).call_statuses(job_id)
+    for r in results:
+        sid = r["result"].get("sid")
+        if sid in statuses:
+            r["result"]["status"] = statuses[sid]
+    write_results(args.out, results)
+
+    successful = sum(1 for r in results if r["result"].get("success"))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Initiated {successful}/{len(results)} calls in {elapsed:.2f}s"
+        + (f" (first call after {first_call[0]:.3f}s)" if first_call else ""),
+        file=sys.stderr,
+    )
+    return 0 if successful == len(results) else 1
+
+
+def timed_send_call(send_call, started, first_call):
+    """Wrap ``send_call`` to record the time to the first call."""
+    def send(to_number, twiml):
+        if not first_call:
+            first_call.append(time.perf_counter() - started)
+        return send_call(to_number, twiml)
+    return send
+
+
+def cmd_run(args):
+    from .calls import place_twilio_call
+    from .config import configure, get_settings, load_settings
+    from .importer import import_recipients
+    from .jobs import get_job_store
+    from .languages import LANGUAGE_ALIASES, LANGUAGES_BY_CODE
+    from .recipients import CallingList
+
+    overrides = {}
+    if args.cps:
+        overrides["calls_per_second"] = args.cps
+    if args.workers:
+        overrides["dispatch_max_workers"] = args.workers
+    if args.processes:
+        overrides["dispatch_processes"] = args.processes
+    configure(load_settings(), **overrides)
+
+    if args.language not in LANGUAGES_BY_CODE:
+        print(f"Unknown language {args.language!r}.", file=sys.stderr)
+        return 2
+    if args.message_file:
+        with open(args.message_file, encoding="utf-8") as f:
+            message = f.read().strip()
+    else:
+        message = args.message
+    if not message:
+        print("A message is required (--message or --message-file).", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    calling_list = CallingList()
+    with open(args.input, "rb") as f:
+        report = import_recipients(f, args.input, calling_list, args.country_code, LANGUAGE_ALIASES)
+    print(
+        f"Loaded {report.added} recipients ({report.duplicates} duplicates, {report.invalid} invalid).",
+        file=sys.stderr,
+    )
+    for row_number, error in report.errors:
+        print(f"  row {row_number}: {error}", file=sys.stderr)
+
+    job_id = get_job_store(get_settings().job_store_path).create_job(
+        calling_list, message, args.language, job_id=args.campaign_id
+    )
+    print(f"Campaign {job_id}", file=sys.stderr)
+    first_call = []
+    if get_settings().dispatch_processes > 1:
+        # Workers in other processes: the time to the first call is not measured
+        send_call = _dry_run_call if args.dry_run else None
+        store, _ = run_job_sharded(job_id, get_settings().dispatch_processes, send_call, quiet=args.quiet)
+        return finish_job(args, job_id, store, started, first_call)
+    send_call = timed_send_call(_dry_run_call if args.dry_run else place_twilio_call, started, first_call)
+    store, _ = run_job_foreground(job_id, send_call, quiet=args.quiet)
+    return finish_job(args, job_id, store, started, first_call)
+
+
+def cmd_resume(args):
+    from .calls import place_twilio_call
+    from .config import configure, get_settings, load_settings
+    from .jobs import DONE, PAUSED, QUEUED, RUNNING, get_job_store
+
+    configure(load_settings(), **({"dispatch_processes": args.processes} if args.processes else {}))
+    store = get_job_store(get_settings().job_store_path)
+    job = store.get_job(args.job_id)
+    if job is None:
+        print(f"No job {args.job_id!r}.", file=sys.stderr)
+        return 2
+    if args.retry_failed:
+        print(f"Retrying {store.retry_failed(args.job_id)} failed recipients.", file=sys.stderr)
+        store.set_state(args.job_id, QUEUED, only_from=(DONE,))
+    # A RUNNING job here was left behind by a process that died; its in-flight calls are settled first
+    store.set_state(args.job_id, QUEUED, only_from=(PAUSED, RUNNING))
+    started = time.perf_counter()
+    first_call = []
+    if get_settings().dispatch_processes > 1:
+        store, _ = run_job_sharded(args.job_id, get_settings().dispatch_processes, quiet=args.quiet)
+    else:
+        store, _ = run_job_foreground(args.job_id, timed_send_call(place_twilio_call, started, first_call), args.quiet)
+    return finish_job(args, args.job_id, store, started, first_call)
+
+
+def cmd_worker(args):
+    from .config import configure, load_settings
+    from .jobs import get_job_store
+    from .sharding import shared_settings
+
+    # Rate limits shared with the other workers through the job store (or RATE_LIMIT_DB_PATH)
+    settings = configure(shared_settings(load_settings()))
+    if get_job_store(settings.job_store_path).get_job(args.job_id) is None:
+        print(f"No job {args.job_id!r}.", file=sys.stderr)
+        return 2
+    _, state = run_job_foreground(args.job_id, quiet=args.quiet)
+    return 0 if state == "done" else 1
+
+
+def cmd_pause(args):
+    from .config import configure, get_settings, load_settings
+    from .jobs import PAUSED, RUNNABLE_STATES, get_job_store
+
+    configure(load_settings())
+    if not get_job_store(get_settings().job_store_path).set_state(args.job_id, PAUSED, only_from=RUNNABLE_STATES):
+        print(f"Job {args.job_id!r} is not queued or running.", file=sys.stderr)
+        return 1
+    # The worker running it stops after its current batch
+    print(f"Paused {args.job_id}.", file=sys.stderr)
+    return 0
+
+
+def cmd_jobs(args):
+    from .config import configure, get_settings, load_settings
+    from .jobs import FAILED, IN_FLIGHT, PENDING, SENT, get_job_store
+
+    configure(load_settings())
+    store = get_job_store(get_settings().job_store_path)
+    for job in store.list_jobs(args.limit):
+        counts = store.counts(job["id"])
+        print(
+            f"{job['id']}  {job['state']:<9}  {counts[SENT]} placed, {counts[FAILED]} failed, "
+            f"{counts[PENDING] + counts[IN_FLIGHT]} to go (of {job['total']})"
+        )
+    return 0
+
+
+def cmd_status(args):
+    from .call_status import get_call_status_store
+    from .calls import reconcile_campaign
+    from .config import configure, get_settings, load_settings
+
+    configure(load_settings())
+    if args.follow:
+        follow_outcomes(args.campaign_id, args.follow)
+        return 0
+    if args.reconcile:
+        updated = reconcile_campaign(args.campaign_id)
+        print(f"Reconciled {updated} calls.", file=sys.stderr)
+    counts = get_call_status_store(get_settings().call_status_path).outcome_counts(args.campaign_id)
+    if not counts["total"]:
+        print(f"No calls recorded for campaign {args.campaign_id!r}.", file=sys.stderr)
+        return 1
+    print(format_outcomes(counts))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m outbound", description="Outbound reminder campaigns without the UI.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run = subcommands.add_parser("run", help="Call every recipient in a CSV/TSV/Excel file.")
+    run.add_argument("input", help="Recipients file (columns: phone, optional country_code, language, name, amount, due_date, account).")
+    message = run.add_mutually_exclusive_group(required=True)
+    message.add_argument("--message", help="Reminder message (English source text).")
+    message.add_argument("--message-file", help="File containing the reminder message.")
+    run.add_argument("--language", default="en-IN", help="Campaign language for recipients without one (default: en-IN).")
+    run.add_argument("--country-code", default="+91", help="Country code for numbers without one (default: +91).")
+    run.add_argument("--out", default="-", help="Results file (.csv, .json or .jsonl; default: JSON lines on stdout).")
+    run.add_argument("--cps", type=float, help="Calls per second per sender number (overrides TWILIO_CALLS_PER_SECOND).")
+    run.add_argument("--workers", type=int, help="Max calls in flight (overrides DISPATCH_MAX_WORKERS).")
+    run.add_argument("--processes", type=int, help="Worker processes dialing shards of the campaign (overrides DISPATCH_PROCESSES).")
+    run.add_argument("--dry-run", action="store_true", help="Prepare TwiML for every language but do not place calls.")
+    run.add_argument("--quiet", action="store_true", help="Only print the summary.")
+    run.add_argument("--campaign-id", help="Job id to record the campaign under (default: generated and printed).")
+    run.add_argument("--wait", type=float, default=0,
+                     help="Follow call outcomes for up to this many seconds before writing results.")
+    run.set_defaults(handler=cmd_run)
+
+    resume = subcommands.add_parser("resume", help="Continue a paused or interrupted campaign job.")
+    resume.add_argument("job_id")
+    resume.add_argument("--retry-failed", action="store_true", help="Also call recipients whose call failed again.")
+    resume.add_argument("--out", default="-", help="Results file (.csv, .json or .jsonl; default: JSON lines on stdout).")
+    resume.add_argument("--wait", type=float, default=0,
+                        help="Follow call outcomes for up to this many seconds before writing results.")
+    resume.add_argument("--quiet", action="store_true", help="Only print the summary.")
+    resume.add_argument("--processes", type=int, help="Worker processes dialing shards of the campaign (overrides DISPATCH_PROCESSES).")
+    resume.set_defaults(handler=cmd_resume)
+
+    worker = subcommands.add_parser("worker", help="Help dial a running campaign job from this process or host.")
+    worker.add_argument("job_id")
+    worker.add_argument("--quiet", action="store_true", help="Do not print progress.")
+    worker.set_defaults(handler=cmd_worker)
+
+    pause = subcommands.add_parser("pause", help="Pause a campaign job after its current batch.")
+    pause.add_argument("job_id")
+    pause.set_defaults(handler=cmd_pause)
+
+    jobs = subcommands.add_parser("jobs", help="List recent campaign jobs and their progress.")
+    jobs.add_argument("--limit", type=int, default=20)
+    jobs.set_defaults(handler=cmd_jobs)
+
+    status = subcommands.add_parser("status", help="Show answered/busy/no-answer/failed counts for a campaign.")
+    status.add_argument("campaign_id")
+    status.add_argument("--reconcile", action="store_true",
+                        help="Fetch outcomes of pending calls from Twilio (paged list queries) first.")
+    status.add_argument("--follow", type=float, metavar="SECONDS",
+                        help="Keep printing counts until no call is pending or this many seconds pass.")
+    status.set_defaults(handler=cmd_status)
+    return parser
+
+
+def main(argv=None):
+    _load_dotenv()
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
@@ -0,0 +1,153 @@
+"""Process-wide registry of pooled provider clients.
+
+Clients are created once per set of credentials and reused across calls,
+Streamlit reruns and sessions, so the hot path keeps its keep-alive
+connections instead of paying a TLS handshake per request. Provider SDKs are
+imported only when their client is first requested.
+"""
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+
+
+@dataclass
+class PoolConfig:
+    pool_connections: int = 10   # number of distinct hosts kept in the pool
+    pool_maxsize: int = 32       # keep-alive connections per host
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    keepalive_expiry: float = 60.0
+
+
+_config = PoolConfig()
+_clients = {}
+_closers = []
+_lock = threading.Lock()
+
+
+def configure_clients(**overrides):
+    """Update the pool settings. Clients already created keep their old settings
+    until ``close_clients()`` is called."""
+    global _config
+    with _lock:
+        values = {**_config.__dict__, **{k: v for k, v in overrides.items() if v is not None}}
+        _config = PoolConfig(**values)
+    return _config
+
+
+def get_pool_config():
+    return _config
+
+
+def _get_or_create(key, factory):
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory(_config)
+            _clients[key] = client
+        return client
+
+
+def _requests_session(config):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    _closers.append(session.close)
+    adapter = HTTPAdapter(pool_connections=config.pool_connections, pool_maxsize=config.pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _httpx_client(config):
+    import httpx
+
+    client = httpx.Client(
+        timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+        limits=httpx.Limits(
+            max_connections=config.pool_maxsize,
+            max_keepalive_connections=config.pool_maxsize,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+    )
+    _closers.append(client.close)
+    return client
+
+
+def get_http_session():
+    """Shared ``requests.Session`` for plain HTTP calls such as the audio upload."""
+    return _get_or_create(("http",), _requests_session)
+
+
+def get_request_timeout():
+    return (_config.connect_timeout, _config.read_timeout)
+
+
+def _rebase_url(url, base_url):
+    """Point ``url`` at ``base_url`` (scheme and host), keeping its path and query."""
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + parts.path, parts.query, parts.fragment))
+
+
+# The base URLs below are normally None (the providers' own endpoints); the offline
+# benchmarks point them at local stand-ins.
+
+def get_twilio_client(account_sid, auth_token, base_url=None):
+    def factory(config):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        class RebasedTwilioHttpClient(TwilioHttpClient):
+            def request(self, method, url, *args, **kwargs):
+                return super().request(method, _rebase_url(url, base_url), *args, **kwargs)
+
+        http_client_class = RebasedTwilioHttpClient if base_url else TwilioHttpClient
+        http_client = http_client_class(pool_connections=True, timeout=config.read_timeout)
+        # TwilioHttpClient makes its own requests.Session (it takes none): swap it for one whose pool
+        # is sized for concurrent dispatch
+        http_client.session.close()
+        http_client.session = _requests_session(config)
+        return Client(account_sid, auth_token, http_client=http_client)
+
+    return _get_or_create(("twilio", account_sid, auth_token, base_url), factory)
+
+
+def get_groq_client(api_key, base_url=None):
+    def factory(config):
+        from groq import Groq
+
+        # Retries are handled by outbound.resilience, not on top of it
+        options = {"base_url": base_url} if base_url else {}
+        return Groq(api_key=api_key, http_client=_httpx_client(config), max_retries=0, **options)
+
+    return _get_or_create(("groq", api_key, base_url), factory)
+
+
+def get_elevenlabs_client(api_key, base_url=None):
+    def factory(config):
+        from elevenlabs.client import ElevenLabs
+
+        options = {"base_url": base_url} if base_url else {}
+        return ElevenLabs(
+            api_key=api_key, timeout=config.read_timeout, httpx_client=_httpx_client(config), **options
+        )
+
+    return _get_or_create(("elevenlabs", api_key, base_url), factory)
+
+
+def close_clients():
+    """Close every pooled connection and forget the clients."""
+    with _lock:
+        closers = list(_closers)
+        _closers.clear()
+        _clients.clear()
+    for close in closers:
+        try:
+            close()
+        except Exception:
+            pass
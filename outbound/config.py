@@ -0,0 +1,247 @@
+"""Runtime settings shared by the Streamlit app and the headless runner.
+
+``load_settings`` reads the same keys the app always used (``.env``,
+environment or Streamlit secrets through a custom getter). ``configure``
+installs the settings process-wide so provider code can call
+``get_settings()`` instead of threading them through every function.
+"""
+import os
+import threading
+from dataclasses import dataclass, field, replace
+
+
+def _default_voice_settings():
+    return {
+        "stability": 0.5,
+        "similarity_boost": 0.75,
+        "style": 0.0,
+        "use_speaker_boost": True,
+    }
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Twilio
+    twilio_account_sid: str = None
+    twilio_auth_token: str = None
+    twilio_phone_number: str = None
+    # Caller-ID pool: calls are spread over these numbers (TWILIO_PHONE_NUMBER alone when empty);
+    # with affinity each recipient is always called from the same number
+    twilio_phone_numbers: tuple = ()
+    caller_id_affinity: bool = False
+
+    # Groq translation (model and prompt version are part of the translation cache key)
+    groq_api_key: str = None
+    groq_model: str = "llama-3.3-70b-versatile"
+    translation_prompt_version: str = "3"
+    translation_cache_path: str = None
+    translation_cache_max_entries: int = 50000
+    translation_cache_ttl: float = 30 * 24 * 60 * 60
+
+    # ElevenLabs synthesis (all of these are part of the audio cache key)
+    elevenlabs_api_key: str = None
+    elevenlabs_model_id: str = "eleven_multilingual_v2"
+    elevenlabs_output_format: str = "mp3_22050_32"
+    elevenlabs_voice_settings: dict = field(default_factory=_default_voice_settings)
+    # Raw PCM requested instead of elevenlabs_output_format when call audio is transcoded locally
+    elevenlabs_pcm_format: str = "pcm_16000"
+
+    # Call audio: "mp3" plays the provider's MP3; "wav_ulaw_8000" (telephony-native) and the
+    # other outbound.audio_format.FORMATS are transcoded locally, loudness-normalized to this RMS level
+    call_audio_format: str = "mp3"
+    call_audio_loudness_dbfs: float = -20.0
+
+    # Multi-sentence messages: synthesize each sentence as its translation streams in, this many at once
+    sentence_streaming: bool = True
+    sentence_synthesis_workers: int = 4
+
+    # Audio cache and buffering
+    audio_cache_dir: str = None
+    audio_cache_max_bytes: int = 512 * 1024 * 1024
+    audio_spill_threshold: int = 16 * 1024 * 1024
+
+    # Process-wide memory caches in front of the disk caches (concurrent identical requests share one call)
+    shared_translation_cache_bytes: int = 8 * 1024 * 1024
+    shared_audio_cache_bytes: int = 64 * 1024 * 1024
+
+    # Built-in media server (used instead of the tmpfiles.org upload when a public URL is set)
+    media_public_base_url: str = None
+    media_server_host: str = "0.0.0.0"
+    media_server_port: int = 8765
+    media_url_secret: str = None
+    media_url_ttl: float = 6 * 60 * 60
+    # Set for sharded dispatch workers: another process on this host runs the media server (with
+    # the same secret and audio cache), so audio is left in the cache and its URLs are only signed
+    media_server_external: bool = False
+
+    # Call outcomes: Twilio status callbacks arrive on the media server's public address
+    # (or STATUS_CALLBACK_BASE_URL when the webhook is exposed elsewhere)
+    call_status_path: str = None
+    status_callback_base_url: str = None
+
+    # Prometheus metrics at /metrics on the media server (optionally behind a bearer token)
+    metrics_enabled: bool = False
+    metrics_token: str = None
+
+    # Durable campaign jobs (recipients claimed and checkpointed this many at a time)
+    job_store_path: str = None
+    job_batch_size: int = 100
+
+    # Personalized templates: "sequence" plays clips as several <Play> verbs, "stitched" as one file
+    personalized_playback: str = "sequence"
+
+    # Speech in ElevenLabs languages: "adaptive" switches to Twilio <Say> while ElevenLabs is slower
+    # than tts_max_latency seconds, fails more than tts_max_error_rate of requests or would exceed
+    # tts_hourly_budget (same unit as the cost); "fixed" always uses ElevenLabs, "twilio" never does
+    tts_routing: str = "adaptive"
+    tts_max_latency: float = 10.0
+    tts_max_error_rate: float = 0.5
+    tts_route_hysteresis: float = 0.25
+    tts_route_hold: float = 30.0
+    tts_cost_per_1k_characters: float = 0.30
+    tts_hourly_budget: float = None
+
+    # App: translate and synthesize the message in the background once edits pause this long
+    prewarm_enabled: bool = True
+    prewarm_debounce: float = 1.0
+
+    # Dispatch (calls_per_second is per sender number)
+    calls_per_second: float = 1.0
+    dispatch_max_workers: int = 8
+    language_prepare_workers: int = 4
+    # Sharded dispatch: worker processes per campaign; rate limits kept in this SQLite file are
+    # shared by every process using it (sharded runs use the job store when it is unset)
+    dispatch_processes: int = 1
+    rate_limit_path: str = None
+
+    # Provider resilience: retries with backoff, circuit breakers, adaptive concurrency
+    retry_max_attempts: int = 4
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 20.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30.0
+
+    # Provider endpoints (None = the providers' own; the offline benchmarks use local stand-ins)
+    twilio_api_base_url: str = None
+    groq_base_url: str = None
+    elevenlabs_base_url: str = None
+    audio_upload_url: str = "https://tmpfiles.org/api/v1/upload"
+
+    # HTTP connection pools
+    http_pool_maxsize: int = 32
+    http_connect_timeout: float = 5.0
+    http_read_timeout: float = 30.0
+
+
+def load_settings(get=os.getenv):
+    """Build ``Settings`` from a ``get(key)`` lookup (environment variables by default)."""
+    from .caller_id import parse_numbers
+
+    def value(key, convert=str, default=None):
+        raw = get(key)
+        if raw is None or raw == "":
+            return default
+        return convert(raw)
+
+    defaults = Settings()
+    dispatch_max_workers = value("DISPATCH_MAX_WORKERS", int, defaults.dispatch_max_workers)
+    return Settings(
+        twilio_account_sid=value("TWILIO_ACCOUNT_SID"),
+        twilio_auth_token=value("TWILIO_AUTH_TOKEN"),
+        twilio_phone_number=value("TWILIO_PHONE_NUMBER"),
+        twilio_phone_numbers=value("TWILIO_PHONE_NUMBERS", parse_numbers, ()),
+        caller_id_affinity=value("CALLER_ID_AFFINITY", lambda raw: str(raw).lower() in ("1", "true", "yes"), False),
+        groq_api_key=value("GROQ_API_KEY"),
+        translation_cache_path=value("TRANSLATION_CACHE_PATH"),
+        translation_cache_max_entries=value("TRANSLATION_CACHE_MAX_ENTRIES", int, defaults.translation_cache_max_entries),
+        translation_cache_ttl=value("TRANSLATION_CACHE_TTL_DAYS", float, 30) * 24 * 60 * 60,
+        elevenlabs_api_key=value("ELEVENLABS_API_KEY"),
+        elevenlabs_pcm_format=value("ELEVENLABS_PCM_FORMAT", str, defaults.elevenlabs_pcm_format),
+        call_audio_format=value("CALL_AUDIO_FORMAT", str, defaults.call_audio_format),
+        call_audio_loudness_dbfs=value(
+            "CALL_AUDIO_LOUDNESS_DBFS",
+            lambda raw: None if str(raw).lower() == "off" else float(raw),
+            defaults.call_audio_loudness_dbfs,
+        ),
+        sentence_streaming=value("SENTENCE_STREAMING", lambda raw: str(raw).lower() in ("1", "true", "yes"), True),
+        sentence_synthesis_workers=value(
+            "SENTENCE_SYNTHESIS_WORKERS", int, defaults.sentence_synthesis_workers
+        ),
+        audio_cache_dir=value("AUDIO_CACHE_DIR"),
+        audio_cache_max_bytes=int(value("AUDIO_CACHE_MAX_MB", float, 512) * 1024 * 1024),
+        audio_spill_threshold=int(value("AUDIO_SPILL_THRESHOLD_MB", float, 16) * 1024 * 1024),
+        shared_translation_cache_bytes=int(value("SHARED_TRANSLATION_CACHE_MB", float, 8) * 1024 * 1024),
+        shared_audio_cache_bytes=int(value("SHARED_AUDIO_CACHE_MB", float, 64) * 1024 * 1024),
+        media_public_base_url=value("MEDIA_PUBLIC_BASE_URL"),
+        media_server_host=value("MEDIA_SERVER_HOST", str, defaults.media_server_host),
+        media_server_port=value("MEDIA_SERVER_PORT", int, defaults.media_server_port),
+        media_url_secret=value("MEDIA_URL_SECRET"),
+        media_url_ttl=value("MEDIA_URL_TTL_HOURS", float, 6) * 60 * 60,
+        call_status_path=value("CALL_STATUS_DB_PATH"),
+        status_callback_base_url=value("STATUS_CALLBACK_BASE_URL") or value("MEDIA_PUBLIC_BASE_URL"),
+        metrics_enabled=value("METRICS_ENABLED", lambda raw: str(raw).lower() in ("1", "true", "yes"), False),
+        metrics_token=value("METRICS_TOKEN"),
+        job_store_path=value("JOB_STORE_PATH"),
+        job_batch_size=value("JOB_BATCH_SIZE", int, defaults.job_batch_size),
+        personalized_playback=value("PERSONALIZED_PLAYBACK", str, defaults.personalized_playback),
+        tts_routing=value("TTS_ROUTING", lambda raw: str(raw).lower(), defaults.tts_routing),
+        tts_max_latency=value("TTS_MAX_LATENCY_SECONDS", float, defaults.tts_max_latency),
+        tts_max_error_rate=value("TTS_MAX_ERROR_RATE", float, defaults.tts_max_error_rate),
+        tts_route_hysteresis=value("TTS_ROUTE_HYSTERESIS", float, defaults.tts_route_hysteresis),
+        tts_route_hold=value("TTS_ROUTE_HOLD_SECONDS", float, defaults.tts_route_hold),
+        tts_cost_per_1k_characters=value(
+            "TTS_COST_PER_1K_CHARACTERS", float, defaults.tts_cost_per_1k_characters
+        ),
+        tts_hourly_budget=value("TTS_HOURLY_BUDGET", float),
+        prewarm_enabled=value("PREWARM_ENABLED", lambda raw: str(raw).lower() in ("1", "true", "yes"), True),
+        prewarm_debounce=value("PREWARM_DEBOUNCE_SECONDS", float, defaults.prewarm_debounce),
+        calls_per_second=value("TWILIO_CALLS_PER_SECOND", float, defaults.calls_per_second),
+        dispatch_max_workers=dispatch_max_workers,
+        language_prepare_workers=value("LANGUAGE_PREPARE_WORKERS", int, defaults.language_prepare_workers),
+        dispatch_processes=value("DISPATCH_PROCESSES", int, defaults.dispatch_processes),
+        rate_limit_path=value("RATE_LIMIT_DB_PATH"),
+        retry_max_attempts=value("RETRY_MAX_ATTEMPTS", int, defaults.retry_max_attempts),
+        retry_base_delay=value("RETRY_BASE_DELAY", float, defaults.retry_base_delay),
+        retry_max_delay=value("RETRY_MAX_DELAY", float, defaults.retry_max_delay),
+        breaker_failure_threshold=value("BREAKER_FAILURE_THRESHOLD", int, defaults.breaker_failure_threshold),
+        breaker_reset_seconds=value("BREAKER_RESET_SECONDS", float, defaults.breaker_reset_seconds),
+        twilio_api_base_url=value("TWILIO_API_BASE_URL"),
+        groq_base_url=value("GROQ_BASE_URL"),
+        elevenlabs_base_url=value("ELEVENLABS_BASE_URL"),
+        audio_upload_url=value("AUDIO_UPLOAD_URL", str, defaults.audio_upload_url),
+        http_pool_maxsize=value("HTTP_POOL_MAXSIZE", int, max(32, dispatch_max_workers)),
+        http_connect_timeout=value("HTTP_CONNECT_TIMEOUT", float, defaults.http_connect_timeout),
+        http_read_timeout=value("HTTP_READ_TIMEOUT", float, defaults.http_read_timeout),
+    )
+
+
+_settings = Settings()
+_lock = threading.Lock()
+
+
+def configure(settings=None, **overrides):
+    """Install ``settings`` (with optional field overrides) for this process, size the client
+    pools and set up the provider retry/breaker/concurrency limits."""
+    global _settings
+    from .clients import configure_clients
+    from .resilience import RetryPolicy, configure_resilience
+
+    with _lock:
+        _settings = replace(settings or _settings, **overrides)
+        configure_clients(
+            pool_maxsize=_settings.http_pool_maxsize,
+            connect_timeout=_settings.http_connect_timeout,
+            read_timeout=_settings.http_read_timeout,
+        )
+        configure_resilience(
+            policy=RetryPolicy(_settings.retry_max_attempts, _settings.retry_base_delay, _settings.retry_max_delay),
+            failure_threshold=_settings.breaker_failure_threshold,
+            reset_timeout=_settings.breaker_reset_seconds,
+            max_concurrency=_settings.http_pool_maxsize,
+            provider_max_concurrency={"twilio": _settings.dispatch_max_workers},
+        )
+        return _settings
+
+
+def get_settings():
+    return _settings
@@ -0,0 +1,179 @@
+"""Concurrent, rate-limited call dispatch."""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to respect the Twilio calls-per-second limit."""
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens=1.0):
+        """Take tokens without waiting. Returns the seconds to wait if none are available."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def wait_time(self, tokens=1.0):
+        """Seconds until ``tokens`` are available, without taking them."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def acquire(self, tokens=1.0):
+        """Block until ``tokens`` are available."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    """Token bucket kept in a SQLite file, so every process using the file shares one rate.
+
+    Each acquisition is one short write transaction. Refills use wall-clock
+    time, so processes on other hosts sharing the file need synchronized clocks.
+    """
+
+    def __init__(self, path, name, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.path = path
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            " name TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+
+    def _level(self, now):
+        row = self._db.execute("SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)).fetchone()
+        if row is None:
+            return self.capacity
+        return min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+
+    def try_acquire(self, tokens=1.0):
+        """Take tokens without waiting. Returns the seconds to wait if none are available."""
+        with self._lock:
+            # The write lock is taken up front so two processes cannot both see the same tokens
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                level = self._level(now)
+                wait = (tokens - level) / self.rate if level < tokens else 0.0
+                if not wait:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                        (self.name, level - tokens, now),
+                    )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return wait
+
+    def wait_time(self, tokens=1.0):
+        """Seconds until ``tokens`` are available, without taking them."""
+        with self._lock:
+            return max(0.0, (tokens - self._level(time.time())) / self.rate)
+
+    def acquire(self, tokens=1.0):
+        """Block until ``tokens`` are available."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+def token_bucket(rate, name, shared_path=None):
+    """A ``TokenBucket`` for ``rate`` (``None`` when it is 0), shared between processes through
+    the SQLite file ``shared_path`` under ``name`` when one is given."""
+    if not rate:
+        return None
+    if shared_path:
+        return SharedTokenBucket(shared_path, name, rate)
+    return TokenBucket(rate)
+
+
+def dispatch_calls(recipients, send_call, calls_per_second=1.0, max_workers=8, on_progress=None, stop=None,
+                   bucket=None):
+    """Send calls to ``recipients`` concurrently.
+
+    ``recipients`` is a list of ``(number, target)`` pairs and
+    ``send_call(target)`` returns the result dict of ``make_twilio_call``.
+    Calls are started no faster than ``calls_per_second`` and at most
+    ``max_workers`` are in flight. ``on_progress(done, total, number)`` runs on
+    the calling thread, so it is safe to update Streamlit elements from it.
+    Once the ``stop`` event is set, calls that have not started yet are
+    skipped with ``{"success": False, "skipped": True}``. A ``bucket`` (such
+    as a ``SharedTokenBucket`` spanning several processes) replaces the rate
+    limit of ``calls_per_second``.
+
+    Returns ``[{"number": ..., "result": ...}]`` in the order of ``recipients``.
+    """
+    recipients = list(recipients)
+    total = len(recipients)
+    results = [None] * total
+    if total == 0:
+        return []
+
+    if bucket is None and calls_per_second:
+        bucket = TokenBucket(calls_per_second)
+
+    def _send(target):
+        if stop is not None and stop.is_set():
+            return {"success": False, "skipped": True, "error": "stopped before dialing"}
+        if bucket is not None:
+            bucket.acquire()
+        if stop is not None and stop.is_set():
+            return {"success": False, "skipped": True, "error": "stopped before dialing"}
+        try:
+            return send_call(target)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as executor:
+        futures = {
+            executor.submit(_send, target): i
+            for i, (_, target) in enumerate(recipients)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            number = recipients[i][0]
+            results[i] = {"number": number, "result": future.result()}
+            if on_progress:
+                on_progress(done, total, number)
+
+    return results
@@ -0,0 +1,151 @@
+"""Streaming CSV/TSV/Excel recipient import."""
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+
+from .phone_numbers import country_code_of, normalize_numbers
+from .recipients import Recipient
+
+# Accepted header spellings for each recipient field (compared lowercased, without spaces/underscores)
+COLUMN_ALIASES = {
+    "number": ("phone", "phonenumber", "number", "mobile", "mobilenumber", "msisdn", "to"),
+    "country_code": ("countrycode", "country", "dialcode"),
+    "language": ("language", "lang", "preferredlanguage", "languagecode"),
+    "name": ("name", "customer", "customername", "fullname"),
+    "amount": ("amount", "emi", "emiamount", "dueamount"),
+    "due_date": ("duedate", "due", "date", "paymentdate"),
+    "account": ("account", "accountnumber", "accountno", "loanaccount", "loanaccountnumber"),
+}
+
+_MAX_ERROR_SAMPLES = 20
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    added: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)  # first few (row number, message) pairs
+
+    def reject(self, row_number, message):
+        self.invalid += 1
+        if len(self.errors) < _MAX_ERROR_SAMPLES:
+            self.errors.append((row_number, message))
+
+
+def _header_key(header):
+    return re.sub(r"[\s_\-]", "", str(header or "")).lower()
+
+
+def map_columns(headers):
+    """Map recipient fields to column indexes from a header row."""
+    keys = [_header_key(h) for h in headers]
+    mapping = {}
+    for field_name, aliases in COLUMN_ALIASES.items():
+        for i, key in enumerate(keys):
+            if key in aliases:
+                mapping[field_name] = i
+                break
+    if "number" not in mapping:
+        raise ValueError("No phone number column found (expected a header such as 'phone' or 'number').")
+    return mapping
+
+
+def iter_rows(file, filename):
+    """Yield rows (lists of cell values) from a CSV, TSV or Excel upload without loading it whole."""
+    name = (filename or "").lower()
+    if name.endswith((".xlsx", ".xlsm")):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Excel import needs openpyxl (pip install openpyxl).")
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield ["" if value is None else value for value in row]
+        finally:
+            workbook.close()
+        return
+
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="") if not isinstance(file, io.TextIOBase) else file
+    delimiter = "\t" if name.endswith((".tsv", ".tab")) else None
+    if delimiter is None:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+        except csv.Error:
+            delimiter = ","
+    yield from csv.reader(text, delimiter=delimiter)
+
+
+def parse_recipients(rows, report, default_country_code="+91", language_aliases=None, chunk_size=5000):
+    """Validate and normalize rows in chunks of ``chunk_size`` rows, yielding lists of ``Recipient``."""
+    rows = iter(rows)
+    headers = next(rows, None)
+    if headers is None:
+        return
+    columns = map_columns(headers)
+    language_aliases = language_aliases or {}
+    number_col = columns["number"]
+    country_col = columns.get("country_code")
+    optional = [(name, columns.get(name)) for name in ("name", "amount", "due_date", "account")]
+    language_col = columns.get("language")
+
+    def recipients(pending):
+        # The whole chunk's number column is normalized in one pass
+        raw_numbers = [row[number_col] if number_col < len(row) else "" for _, row in pending]
+        country_codes = None
+        if country_col is not None:
+            country_codes = [country_code_of(row[country_col]) if country_col < len(row) else None for _, row in pending]
+        numbers = normalize_numbers(raw_numbers, default_country_code, country_codes)
+
+        chunk = []
+        for (row_number, row), raw_number, number in zip(pending, raw_numbers, numbers):
+            if number is None:
+                report.reject(row_number, f"invalid phone number {raw_number!r}")
+                continue
+
+            language = None
+            if language_col is not None and language_col < len(row):
+                raw_language = str(row[language_col]).strip()
+                if raw_language:
+                    language = language_aliases.get(raw_language.lower())
+                    if language is None:
+                        report.reject(row_number, f"unknown language {raw_language!r}")
+                        continue
+
+            values = {
+                name: (str(row[col]).strip() or None) if col is not None and col < len(row) else None
+                for name, col in optional
+            }
+            chunk.append(Recipient(number, language, **values))
+        return chunk
+
+    pending = []
+    for row_number, row in enumerate(rows, start=2):
+        if not any(str(cell).strip() for cell in row):
+            continue
+        report.rows += 1
+        pending.append((row_number, row))
+        if len(pending) >= chunk_size:
+            yield recipients(pending)
+            pending = []
+    if pending:
+        yield recipients(pending)
+
+
+def import_recipients(file, filename, calling_list, default_country_code="+91", language_aliases=None,
+                      chunk_size=5000, on_progress=None):
+    """Stream ``file`` into ``calling_list``. Returns an ``ImportReport``."""
+    report = ImportReport()
+    chunks = parse_recipients(iter_rows(file, filename), report, default_country_code, language_aliases, chunk_size)
+    for chunk in chunks:
+        added, duplicates = calling_list.extend(chunk)
+        report.added += added
+        report.duplicates += duplicates
+        if on_progress:
+            on_progress(report)
+    return report
@@ -0,0 +1,539 @@
+"""Durable campaign jobs.
+
+A campaign is stored as a job with one row per recipient (pending,
+in-flight, done or failed) in SQLite, so closing the tab, a Streamlit rerun
+or a crash never loses progress. The worker claims recipients a batch at a
+time, marking them in-flight in one write, and checkpoints the batch's
+outcomes in one write when it finishes. Recipients left in-flight by a crash
+are settled from the call status store: numbers Twilio accepted count as
+done and are not dialed again; the rest go back to pending.
+
+Several workers, in one process or many (see ``outbound.sharding``), can run
+the same job: claims are atomic, each worker heart-beats while it runs, and
+only the in-flight recipients of workers that stopped beating are settled.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from .call_status import new_campaign_id
+from .caller_id import campaign_calls_per_second
+from .dispatch import token_bucket
+from .recipients import Recipient
+
+DEFAULT_JOB_STORE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "outbound-agent", "jobs.sqlite3")
+
+# Job states; "running" jobs are picked up again when a worker starts
+QUEUED, RUNNING, PAUSED, DONE, CANCELLED = "queued", "running", "paused", "done", "cancelled"
+RUNNABLE_STATES = (QUEUED, RUNNING)
+
+# Recipient states
+PENDING, IN_FLIGHT, SENT, FAILED = "pending", "in-flight", "done", "failed"
+RECIPIENT_STATES = (PENDING, IN_FLIGHT, SENT, FAILED)
+
+_RECIPIENT_COLUMNS = "position, number, dial, language, name, amount, due_date, account"
+
+# A worker that has not beaten for WORKER_LEASE seconds is presumed dead
+WORKER_LEASE = 60.0
+_HEARTBEAT_INTERVAL = 10.0
+# How often a worker with nothing left to claim checks on the calls its peers have in flight
+_PEER_POLL_INTERVAL = 1.0
+# Prepared TwiML is rebuilt once it is this old, because the audio URLs in it expire
+# (tmpfiles.org links after about an hour; signed media URLs after MEDIA_URL_TTL_HOURS)
+PREPARED_MAX_AGE = 30 * 60
+
+
+def new_worker_id():
+    """``host:pid:random``; the host and pid let a worker on the same host spot a dead peer at once."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _process_alive(pid):
+    if os.name != "posix":
+        return True  # os.kill(pid, 0) would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    def __init__(self, path=DEFAULT_JOB_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " message TEXT NOT NULL,"
+            " default_language TEXT NOT NULL,"
+            " translated TEXT,"
+            " total INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_recipients ("
+            " job TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " number TEXT NOT NULL,"
+            " dial TEXT NOT NULL,"
+            " language TEXT,"
+            " name TEXT,"
+            " amount TEXT,"
+            " due_date TEXT,"
+            " account TEXT,"
+            " state TEXT NOT NULL,"
+            " sid TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " PRIMARY KEY (job, position))"
+        )
+        # Stores created before reviewed translations were kept. Their TwiML (the old "prepared"
+        # column) is left unused: the audio URLs in it expire, so those jobs translate again
+        if "translated" not in {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN translated TEXT")
+        # Stores created before workers were recorded
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(job_recipients)")}
+        if "worker" not in columns:
+            self._db.execute("ALTER TABLE job_recipients ADD COLUMN worker TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS job_recipients_state ON job_recipients (job, state, position)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_workers ("
+            " id TEXT PRIMARY KEY,"
+            " job TEXT NOT NULL,"
+            " host TEXT NOT NULL,"
+            " pid INTEGER NOT NULL,"
+            " heartbeat REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def create_job(self, recipients, message, default_language, translated=None, dial_number=None, job_id=None):
+        """Persist a campaign. ``dial_number(recipient)`` is applied now, so the
+        job can be resumed by a process that does not have it. ``translated``
+        maps languages to the reviewed translation of ``message``; only the text
+        is kept, and its audio is published when the job runs (URLs expire)."""
+        job_id = job_id or new_campaign_id()
+        now = time.time()
+        rows = (
+            (job_id, position, r.number, dial_number(r) if dial_number else r.number, r.language,
+             r.name, r.amount, r.due_date, r.account, PENDING)
+            for position, r in enumerate(recipients)
+        )
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, state, message, default_language, translated, total, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                (job_id, QUEUED, message, default_language, json.dumps(translated or {}), now, now),
+            )
+            cur = self._db.executemany(
+                "INSERT INTO job_recipients (job, " + _RECIPIENT_COLUMNS + ", state)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.execute("UPDATE jobs SET total = ? WHERE id = ?", (cur.rowcount, job_id))
+            self._db.commit()
+        return job_id
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, state, message, default_language, translated, total, created, updated FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0], "state": row[1], "message": row[2], "default_language": row[3],
+            "translated": json.loads(row[4] or "{}"), "total": row[5], "created": row[6], "updated": row[7],
+        }
+
+    def list_jobs(self, limit=20):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self.get_job(job_id) for (job_id,) in rows]
+
+    def set_state(self, job_id, state, only_from=None):
+        """Change a job's state (optionally only from one of ``only_from``); returns whether it changed."""
+        query = "UPDATE jobs SET state = ?, updated = ? WHERE id = ?"
+        params = [state, time.time(), job_id]
+        if only_from:
+            query += " AND state IN (%s)" % ",".join("?" * len(only_from))
+            params.extend(only_from)
+        with self._lock:
+            changed = self._db.execute(query, params).rowcount
+            self._db.commit()
+        return bool(changed)
+
+    def next_runnable(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE state IN (?, ?) ORDER BY created LIMIT 1", RUNNABLE_STATES
+            ).fetchone()
+        return row[0] if row else None
+
+    def languages(self, job_id):
+        """Languages of the recipients still to dial: pending, and in flight (which go back to
+        pending if their worker dies)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT language FROM job_recipients WHERE job = ? AND state IN (?, ?)",
+                (job_id, PENDING, IN_FLIGHT),
+            ).fetchall()
+        return [language for (language,) in rows]
+
+    def claim(self, job_id, limit, worker_id=None):
+        """Mark up to ``limit`` pending recipients in-flight for ``worker_id``; returns
+        ``[(position, dial, Recipient)]``. Workers in other processes never get the same rows."""
+        with self._lock:
+            # Take the write lock before reading, so two processes cannot claim the same rows
+            self._db.execute("BEGIN IMMEDIATE")
+            rows = self._db.execute(
+                "SELECT " + _RECIPIENT_COLUMNS + " FROM job_recipients"
+                " WHERE job = ? AND state = ? ORDER BY position LIMIT ?",
+                (job_id, PENDING, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE job_recipients SET state = ?, worker = ?, attempts = attempts + 1"
+                " WHERE job = ? AND position = ?",
+                [(IN_FLIGHT, worker_id, job_id, row[0]) for row in rows],
+            )
+            self._db.commit()
+        return [(row[0], row[2], Recipient(row[1], *row[3:])) for row in rows]
+
+    def register_worker(self, worker_id, job_id):
+        host, pid = worker_id.split(":")[:2]
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO job_workers (id, job, host, pid, heartbeat) VALUES (?, ?, ?, ?, ?)",
+                (worker_id, job_id, host, int(pid), time.time()),
+            )
+            self._db.commit()
+
+    def heartbeat(self, worker_id):
+        with self._lock:
+            self._db.execute("UPDATE job_workers SET heartbeat = ? WHERE id = ?", (time.time(), worker_id))
+            self._db.commit()
+
+    def unregister_worker(self, worker_id):
+        with self._lock:
+            self._db.execute("DELETE FROM job_workers WHERE id = ?", (worker_id,))
+            self._db.commit()
+
+    def live_workers(self, job_id, lease=WORKER_LEASE):
+        """Ids of the workers running ``job_id`` that beat within ``lease`` seconds (and, on this
+        host, whose process still exists)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, host, pid FROM job_workers WHERE job = ? AND heartbeat >= ?",
+                (job_id, time.time() - lease),
+            ).fetchall()
+        host = socket.gethostname()
+        return {worker_id for worker_id, worker_host, pid in rows if worker_host != host or _process_alive(pid)}
+
+    def checkpoint(self, job_id, outcomes):
+        """Record ``(position, state, sid, error)`` outcomes in one transaction."""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE job_recipients SET state = ?, sid = ?, error = ? WHERE job = ? AND position = ?",
+                [(state, sid, error, job_id, position) for position, state, sid, error in outcomes],
+            )
+            self._db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time(), job_id))
+            self._db.commit()
+
+    def recover(self, job_id, placed_numbers):
+        """Settle recipients a dead worker left in-flight (those of live workers are left alone).
+
+        ``placed_numbers`` maps numbers Twilio accepted to their call SID;
+        those are done, everything else in-flight goes back to pending.
+        Returns ``(done, requeued)``.
+        """
+        live = self.live_workers(job_id)
+        with self._lock:
+            rows = [
+                (position, number)
+                for position, number, worker_id in self._db.execute(
+                    "SELECT position, number, worker FROM job_recipients WHERE job = ? AND state = ?",
+                    (job_id, IN_FLIGHT),
+                )
+                if worker_id not in live
+            ]
+            done = [(SENT, placed_numbers[number], job_id, position) for position, number in rows if number in placed_numbers]
+            requeued = [(PENDING, None, job_id, position) for position, number in rows if number not in placed_numbers]
+            self._db.executemany(
+                "UPDATE job_recipients SET state = ?, sid = ? WHERE job = ? AND position = ?", done + requeued
+            )
+            self._db.commit()
+        return len(done), len(requeued)
+
+    def retry_failed(self, job_id):
+        """Put failed recipients back in the queue; returns how many."""
+        with self._lock:
+            changed = self._db.execute(
+                "UPDATE job_recipients SET state = ?, error = NULL WHERE job = ? AND state = ?",
+                (PENDING, job_id, FAILED),
+            ).rowcount
+            self._db.commit()
+        return changed
+
+    def counts(self, job_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT state, COUNT(*) FROM job_recipients WHERE job = ? GROUP BY state", (job_id,)
+            ).fetchall()
+        counts = dict.fromkeys(RECIPIENT_STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def results(self, job_id):
+        """``[{"number", "language", "result"}]`` in recipient order, shaped like ``run_campaign``'s."""
+        job = self.get_job(job_id)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT number, language, state, sid, error FROM job_recipients WHERE job = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        return [
+            {
+                "number": number,
+                "language": language or job["default_language"],
+                "result": {"success": state == SENT, "sid": sid, "status": state, "error": error},
+            }
+            for number, language, state, sid, error in rows
+        ]
+
+
+def _beat(store, worker_id, finished):
+    while not finished.wait(_HEARTBEAT_INTERVAL):
+        try:
+            store.heartbeat(worker_id)
+        except sqlite3.Error:
+            pass  # a busy store delays one beat; the lease allows for several
+
+
+def run_job(store, job_id, send_call=None, batch_size=100, stop=None, on_progress=None, initializer=None,
+            prepared=None, worker_id=None, max_age=PREPARED_MAX_AGE):
+    """Dispatch a job's pending recipients until none are left or ``stop`` is set.
+
+    Each batch is claimed in one write and checkpointed in one write. Calls
+    that were skipped because of ``stop`` go back to pending.
+    ``on_progress(done, total)`` runs after every checkpoint. ``prepared``
+    maps languages the caller prepared (TwiML, or ``PersonalizedMessage`` for
+    templates); the others are built now, from the job's reviewed translations
+    or its message. Everything is prepared again, between batches, once it is
+    more than ``max_age`` seconds old, so long runs never dial expired audio
+    URLs. Other workers may run the same job at the
+    same time; the job is done once nothing is pending or in flight. Returns
+    the job's final state.
+    """
+    from .config import get_settings
+
+    settings = get_settings()
+    job = store.get_job(job_id)
+    if job is None:
+        raise KeyError(job_id)
+    worker_id = worker_id or new_worker_id()
+    store.register_worker(worker_id, job_id)
+    finished = threading.Event()
+    threading.Thread(target=_beat, args=(store, worker_id, finished), name="job-heartbeat", daemon=True).start()
+    try:
+        if not store.set_state(job_id, RUNNING, only_from=RUNNABLE_STATES):
+            return job["state"]
+        return _run_claimed_batches(
+            store, job, settings, worker_id, send_call, batch_size, stop, on_progress, initializer, prepared,
+            max_age
+        )
+    finally:
+        finished.set()
+        store.unregister_worker(worker_id)
+
+
+def _run_claimed_batches(store, job, settings, worker_id, send_call, batch_size, stop, on_progress, initializer,
+                         prepared, max_age):
+    from .call_status import get_call_status_store
+    from .campaign import prepare_campaign
+    from .dispatch import dispatch_calls
+
+    job_id = job["id"]
+    call_status = get_call_status_store(settings.call_status_path)
+    store.recover(job_id, call_status.placed_numbers(job_id))
+
+    dials = {}
+
+    def prepare(prepared):
+        return prepare_campaign(
+            store.languages(job_id), job["message"], job["default_language"],
+            prepared=prepared, translated=job["translated"],
+            dial_number=lambda recipient: dials[recipient.number], send_call=send_call,
+            initializer=initializer, campaign_id=job_id
+        )
+
+    send = prepare(prepared)
+    prepared_at = time.monotonic()
+    # One limiter for the whole run; with RATE_LIMIT_DB_PATH it is shared by every process dialing
+    rate_limit = token_bucket(campaign_calls_per_second(settings), "dispatch", settings.rate_limit_path)
+    while not (stop is not None and stop.is_set()):
+        # Another process (the CLI, another session) may have paused or cancelled the job
+        if store.get_job(job_id)["state"] != RUNNING:
+            break
+        batch = store.claim(job_id, batch_size, worker_id)
+        if not batch:
+            # Nothing left to claim: settle what dead workers left behind, then wait for live peers
+            store.recover(job_id, call_status.placed_numbers(job_id))
+            counts = store.counts(job_id)
+            if counts[PENDING]:
+                continue
+            if not counts[IN_FLIGHT]:
+                break
+            if stop is not None:
+                stop.wait(_PEER_POLL_INTERVAL)
+            else:
+                time.sleep(_PEER_POLL_INTERVAL)
+            continue
+        if time.monotonic() - prepared_at > max_age:
+            # The caller's variants are at least as old; everything is built again from the job
+            send = prepare(None)
+            prepared_at = time.monotonic()
+        dials.clear()
+        dials.update((recipient.number, dial) for _, dial, recipient in batch)
+        results = dispatch_calls(
+            [(recipient.number, recipient) for _, _, recipient in batch],
+            send,
+            calls_per_second=None,
+            max_workers=settings.dispatch_max_workers,
+            stop=stop,
+            bucket=rate_limit,
+        )
+        outcomes = []
+        for (position, _, _), entry in zip(batch, results):
+            result = entry["result"]
+            if result.get("skipped"):
+                outcomes.append((position, PENDING, None, None))
+            elif result.get("success"):
+                outcomes.append((position, SENT, result.get("sid"), None))
+            else:
+                outcomes.append((position, FAILED, None, result.get("error")))
+        store.checkpoint(job_id, outcomes)
+        if on_progress:
+            counts = store.counts(job_id)
+            on_progress(counts[SENT] + counts[FAILED], job["total"])
+
+    if stop is not None and stop.is_set():
+        store.set_state(job_id, PAUSED, only_from=(RUNNING,))
+    else:
+        store.set_state(job_id, DONE, only_from=(RUNNING,))
+    return store.get_job(job_id)["state"]
+
+
+class CampaignWorker:
+    """Background thread that runs queued jobs one at a time, outside any Streamlit rerun."""
+
+    def __init__(self, store, batch_size=100, initializer=None):
+        self.store = store
+        self.batch_size = batch_size
+        self.initializer = initializer
+        self.current_job = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="campaign-worker", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, *args, **kwargs):
+        """``JobStore.create_job`` and wake the worker; returns the job id."""
+        job_id = self.store.create_job(*args, **kwargs)
+        self._wake.set()
+        return job_id
+
+    def pause(self, job_id):
+        self.store.set_state(job_id, PAUSED, only_from=RUNNABLE_STATES)
+        if self.current_job == job_id:
+            self._stop.set()
+
+    def resume(self, job_id):
+        if self.store.set_state(job_id, QUEUED, only_from=(PAUSED,)):
+            self._wake.set()
+
+    def retry_failed(self, job_id):
+        """Queue a job's failed recipients again; returns how many."""
+        count = self.store.retry_failed(job_id)
+        if count and self.store.set_state(job_id, QUEUED, only_from=(DONE, PAUSED)):
+            self._wake.set()
+        return count
+
+    def cancel(self, job_id):
+        self.store.set_state(job_id, CANCELLED, only_from=(QUEUED, RUNNING, PAUSED))
+        if self.current_job == job_id:
+            self._stop.set()
+
+    def _run(self):
+        while True:
+            job_id = self.store.next_runnable()
+            if job_id is None:
+                self._wake.wait(timeout=5)
+                self._wake.clear()
+                continue
+            self.current_job = job_id
+            self._stop.clear()
+            try:
+                run_job(self.store, job_id, batch_size=self.batch_size, stop=self._stop,
+                        initializer=self.initializer)
+            except Exception as e:
+                # Leave the job paused so a bad job cannot spin the worker
+                self.last_error = (job_id, str(e))
+                self.store.set_state(job_id, PAUSED, only_from=(RUNNING,))
+            finally:
+                self.current_job = None
+
+
+_stores = {}
+_workers = {}
+_lock = threading.Lock()
+
+
+def get_job_store(path=None):
+    """Process-wide ``JobStore`` for ``path``."""
+    path = os.path.abspath(path or DEFAULT_JOB_STORE_PATH)
+    with _lock:
+        store = _stores.get(path)
+        if store is None:
+            store = JobStore(path)
+            _stores[path] = store
+        return store
+
+
+def get_campaign_worker(path=None, batch_size=100, initializer=None):
+    """Start (once per process and job store) and return the background ``CampaignWorker``.
+
+    Jobs a previous process left running are resumed as soon as it starts.
+    """
+    store = get_job_store(path)
+    with _lock:
+        worker = _workers.get(store.path)
+        if worker is None:
+            worker = CampaignWorker(store, batch_size, initializer)
+            _workers[store.path] = worker
+    return worker.start()
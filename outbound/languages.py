@@ -0,0 +1,60 @@
+"""Supported call languages and their TTS providers."""
+
+# Languages with TTS provider info
+LANGUAGES = [
+    # Indian Languages (ElevenLabs - Multi-lingual support)
+    {"code": "en-IN", "name": "English (India)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam
+    {"code": "hi-IN", "name": "Hindi (हिंदी)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    {"code": "ta-IN", "name": "Tamil (தமிழ்)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    {"code": "te-IN", "name": "Telugu (తెలుగు)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    {"code": "bn-IN", "name": "Bengali (বাংলা)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    {"code": "mr-IN", "name": "Marathi (मराठी)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    {"code": "gu-IN", "name": "Gujarati (ગુજરાતી)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    {"code": "kn-IN", "name": "Kannada (ಕನ್ನಡ)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    {"code": "ml-IN", "name": "Malayalam (മലയാളം)", "flag": "🇮🇳", "voice": "pNInz6obpgDQGcFmaJgB", "provider": "elevenlabs"},  # Adam (multi-lingual)
+    
+    # International Languages (Twilio Polly)
+    {"code": "en-US", "name": "English (US)", "flag": "🇺🇸", "voice": "alice", "provider": "twilio"},
+    {"code": "en-GB", "name": "English (UK)", "flag": "🇬🇧", "voice": "Polly.Amy", "provider": "twilio"},
+    {"code": "es-ES", "name": "Spanish (Español)", "flag": "🇪🇸", "voice": "Polly.Conchita", "provider": "twilio"},
+    {"code": "fr-FR", "name": "French (Français)", "flag": "🇫🇷", "voice": "Polly.Celine", "provider": "twilio"},
+    {"code": "de-DE", "name": "German (Deutsch)", "flag": "🇩🇪", "voice": "Polly.Marlene", "provider": "twilio"},
+    {"code": "pt-BR", "name": "Portuguese (Brazil)", "flag": "🇧🇷", "voice": "Polly.Vitoria", "provider": "twilio"}
+]
+LANGUAGES_BY_CODE = {lang["code"]: lang for lang in LANGUAGES}
+# Labels shown in the app ("🇮🇳 English (India)"), by code
+LANGUAGE_LABELS = {lang["code"]: f"{lang['flag']} {lang['name']}" for lang in LANGUAGES}
+
+# Language mapping for better translation prompts
+TRANSLATION_LANGUAGE_NAMES = {
+    "en-IN": "English",
+    "hi-IN": "Hindi",
+    "ta-IN": "Tamil",
+    "te-IN": "Telugu",
+    "bn-IN": "Bengali",
+    "mr-IN": "Marathi",
+    "gu-IN": "Gujarati",
+    "kn-IN": "Kannada",
+    "ml-IN": "Malayalam",
+    "en-US": "English",
+    "en-GB": "English",
+    "es-ES": "Spanish",
+    "fr-FR": "French",
+    "de-DE": "German",
+    "pt-BR": "Portuguese"
+}
+
+
+# Spellings accepted in an imported "language" column: "hi-IN", "Hindi", "हिंदी", "Hindi (हिंदी)"
+def build_language_aliases():
+    aliases = {}
+    for lang in reversed(LANGUAGES):  # earlier entries win, so "English" maps to en-IN
+        base_name, _, qualifier = lang["name"].partition(" (")
+        native_name = qualifier.rstrip(")") if not qualifier.isascii() else ""
+        for alias in (lang["code"], lang["name"], base_name, native_name):
+            if alias:
+                aliases[alias.lower()] = lang["code"]
+    return aliases
+
+
+LANGUAGE_ALIASES = build_language_aliases()
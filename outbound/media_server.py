@@ -0,0 +1,401 @@
+"""Lightweight asyncio HTTP server for call audio.
+
+Twilio fetches ``<Play>`` audio from here instead of a third-party upload
+host. Audio is served from memory (published buffers) or from memory-mapped
+files in the audio cache directory, with keep-alive, single ``Range``
+requests, ``ETag``/``Cache-Control`` and HMAC-signed expiring URLs.
+"""
+import asyncio
+import hashlib
+import hmac
+import mmap
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from urllib.parse import parse_qs, urlsplit
+
+CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "ulaw": "audio/basic",
+}
+
+_REASONS = {
+    200: "OK",
+    204: "No Content",
+    206: "Partial Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    416: "Range Not Satisfiable",
+    500: "Internal Server Error",
+}
+
+_WRITE_CHUNK = 64 * 1024
+
+
+def sign_media_path(secret, media_id, expires):
+    message = f"{media_id}:{int(expires)}".encode()
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def signed_media_url(public_base_url, secret, key, ttl=6 * 3600):
+    """Expiring URL for ``key`` on the media server at ``public_base_url`` (signed with ``secret``)."""
+    secret = secret.encode() if isinstance(secret, str) else secret
+    expires = int(time.time() + ttl)
+    return f"{public_base_url.rstrip('/')}/media/{key}?exp={expires}&sig={sign_media_path(secret, key, expires)}"
+
+
+def parse_range(header, size):
+    """Parse a single ``bytes=`` range. Returns ``(start, end)`` inclusive,
+    ``None`` for no/ignored range, or ``False`` when unsatisfiable."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[6:].strip().partition("-")
+    try:
+        if start_text == "":
+            length = int(end_text)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class MediaServer:
+    def __init__(
+        self,
+        host="0.0.0.0",
+        port=8765,
+        public_base_url=None,
+        secret=None,
+        fallback_dir=None,
+        max_memory_bytes=256 * 1024 * 1024,
+        max_age=3600,
+        keepalive_timeout=15.0,
+        max_open_maps=256,
+        max_paths=65536,
+        max_body_bytes=1024 * 1024,
+    ):
+        self.host = host
+        self.port = port
+        self.public_base_url = (public_base_url or f"http://127.0.0.1:{port}").rstrip("/")
+        self.secret = secret.encode() if isinstance(secret, str) else (secret or secrets.token_bytes(32))
+        self.fallback_dir = fallback_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_age = max_age
+        self.keepalive_timeout = keepalive_timeout
+        self.max_open_maps = max_open_maps
+        self.max_paths = max_paths
+        self.max_body_bytes = max_body_bytes
+        self.requests_served = 0
+        self._memory = OrderedDict()  # key -> (data, content_type)
+        self._memory_bytes = 0
+        # key -> published path, least recently served first; forgotten paths in fallback_dir are still served
+        self._paths = OrderedDict()
+        self._maps = OrderedDict()  # key -> (path, mtime, mmap), least recently served first
+        self._lock = threading.Lock()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._startup_error = None
+        self._routes = {}  # (method, path) -> async handler(headers, body) -> (status, headers, body)
+
+    # Publishing
+
+    def publish(self, media_id, data=None, path=None, extension="mp3"):
+        """Make audio available under ``media_id``. ``data`` is kept in memory
+        (LRU-bounded); ``path`` is served through mmap."""
+        content_type = CONTENT_TYPES.get(extension, "application/octet-stream")
+        key = f"{media_id}.{extension}"
+        with self._lock:
+            if data is not None:
+                data = data if isinstance(data, (bytes, memoryview)) else bytes(data)
+                previous = self._memory.pop(key, None)
+                if previous is not None:
+                    self._memory_bytes -= len(previous[0])
+                self._memory[key] = (data, content_type)
+                self._memory_bytes += len(data)
+                while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                    _, (evicted, _) = self._memory.popitem(last=False)
+                    self._memory_bytes -= len(evicted)
+            elif path is not None:
+                self._memory.pop(key, None)
+                self._close_map(key)
+                self._paths[key] = path
+                self._paths.move_to_end(key)
+                while len(self._paths) > self.max_paths:
+                    self._paths.popitem(last=False)
+        return key
+
+    def signed_url(self, key, ttl=6 * 3600):
+        return signed_media_url(self.public_base_url, self.secret, key, ttl)
+
+    def _resolve(self, key):
+        """Return ``(body, content_type)`` for ``key`` or ``None``."""
+        extension = key.rsplit(".", 1)[-1]
+        content_type = CONTENT_TYPES.get(extension, "application/octet-stream")
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return memoryview(entry[0]), entry[1]
+
+            mapped = self._maps.get(key)
+            path = self._paths.get(key)
+            if path is not None:
+                self._paths.move_to_end(key)
+            elif mapped:
+                path = mapped[0]
+            if path is None and self.fallback_dir:
+                candidate = os.path.join(self.fallback_dir, key)
+                if os.path.basename(candidate) == key and os.path.exists(candidate):
+                    path = candidate
+            if path is None:
+                return None
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                self._close_map(key)
+                return None
+            if mapped and mapped[0] == path and mapped[1] == mtime:
+                self._maps.move_to_end(key)
+                return memoryview(mapped[2]), content_type
+            # The file was replaced (or is new): its old map is stale
+            self._close_map(key)
+            if os.path.getsize(path) == 0:
+                return memoryview(b""), content_type
+            with open(path, "rb") as f:
+                mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[key] = (path, mtime, mapped_file)
+            while len(self._maps) > self.max_open_maps:
+                self._close_map(next(iter(self._maps)))
+            return memoryview(mapped_file), content_type
+
+    def _close_map(self, key):
+        mapped = self._maps.pop(key, None)
+        if mapped is None:
+            return
+        try:
+            mapped[2].close()
+        except BufferError:
+            pass  # still being sent; unmapped (and its descriptor closed) once the response is done
+
+    def add_route(self, method, path, handler):
+        """Serve ``method path`` with ``handler``, a coroutine function taking
+        ``(headers, body)`` and returning ``(status, headers, body)``. Used for
+        webhooks that share the media server's public address."""
+        with self._lock:
+            self._routes[(method, path)] = handler
+
+    # Lifecycle
+
+    def start(self):
+        """Run the server on a daemon thread. Safe to call more than once. Raises what
+        kept it from starting (the port is taken, for example), so callers can fall back."""
+        if self._thread is not None:
+            return self
+        self._startup_error = None
+        self._thread = threading.Thread(target=self._run, name="media-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=10)
+        if self._startup_error is not None:
+            self._thread.join()
+            self._thread = None
+            self._ready.clear()
+            raise self._startup_error
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, self.host, self.port)
+            )
+        except Exception as e:
+            self._startup_error = e
+            self._loop.close()
+            self._loop = None
+            self._ready.set()
+            return
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.public_base_url.endswith(":0"):
+            self.public_base_url = f"{self.public_base_url[:-2]}:{self.port}"
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            # Close idle keep-alive connections before the loop goes away
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+            with self._lock:
+                for key in list(self._maps):
+                    self._close_map(key)
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self._ready.clear()
+
+    # HTTP
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                keep_alive = await self._handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, head, reader, writer):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            await self._send(writer, 400, {}, b"", False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        # Read any request body so the connection stays usable; a body that cannot be read
+        # (or is too large to) ends the connection
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self._send(writer, 400, {}, b"", False)
+            return False
+        if length > self.max_body_bytes:
+            await self._send(writer, 413, {}, b"", False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        self.requests_served += 1
+
+        url = urlsplit(target)
+        handler = self._routes.get((method, url.path))
+        if handler is not None:
+            try:
+                status, response_headers, response_body = await handler(headers, body)
+            except Exception:
+                status, response_headers, response_body = 500, {}, b""
+            await self._send(writer, status, response_headers, response_body, keep_alive)
+            return keep_alive
+
+        if method not in ("GET", "HEAD"):
+            await self._send(writer, 405, {"Allow": "GET, HEAD"}, b"", keep_alive)
+            return keep_alive
+
+        if not url.path.startswith("/media/"):
+            await self._send(writer, 404, {}, b"", keep_alive)
+            return keep_alive
+        key = url.path[len("/media/"):]
+        query = parse_qs(url.query)
+        try:
+            expires = int(query["exp"][0])
+            signature = query["sig"][0]
+        except (KeyError, ValueError):
+            await self._send(writer, 403, {}, b"", keep_alive)
+            return keep_alive
+        expected = sign_media_path(self.secret, key, expires)
+        if expires < time.time() or not hmac.compare_digest(signature, expected):
+            await self._send(writer, 403, {}, b"", keep_alive)
+            return keep_alive
+
+        resolved = self._resolve(key)
+        if resolved is None:
+            await self._send(writer, 404, {}, b"", keep_alive)
+            return keep_alive
+        body, content_type = resolved
+        size = len(body)
+
+        # Media ids are content hashes, so they double as strong ETags
+        etag = f'"{key}"'
+        response_headers = {
+            "Content-Type": content_type,
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self.max_age}, immutable",
+        }
+        if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            await self._send(writer, 304, response_headers, b"", keep_alive)
+            return keep_alive
+
+        byte_range = None
+        if headers.get("if-range", etag) == etag:
+            byte_range = parse_range(headers.get("range"), size)
+        if byte_range is False:
+            response_headers["Content-Range"] = f"bytes */{size}"
+            await self._send(writer, 416, response_headers, b"", keep_alive)
+            return keep_alive
+        if byte_range is not None:
+            start, end = byte_range
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            await self._send(writer, 206, response_headers, body[start:end + 1], keep_alive, method == "HEAD")
+        else:
+            await self._send(writer, 200, response_headers, body, keep_alive, method == "HEAD")
+        return keep_alive
+
+    async def _send(self, writer, status, headers, body, keep_alive, head_only=False):
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+        headers = {
+            "Date": formatdate(usegmt=True),
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **headers,
+        }
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if not head_only and status not in (204, 304):
+            for start in range(0, len(body), _WRITE_CHUNK):
+                writer.write(body[start:start + _WRITE_CHUNK])
+                await writer.drain()
+        await writer.drain()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_media_server(**options):
+    """Start (once per process) and return the shared ``MediaServer``."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = MediaServer(**options).start()
+        return _server
@@ -0,0 +1,372 @@
+"""Latency, throughput and in-flight metrics for each campaign stage.
+
+A small in-process registry (no client library needed) of counters,
+gauges and histograms, rendered in the Prometheus text exposition format on
+the media server's ``/metrics`` route and summarized in the app.
+
+Stages timed with ``timed(stage)``: ``translate``, ``synthesize``,
+``transcode``, ``upload``, ``prepare`` and ``dial``. Provider requests are also timed per
+attempt by the resilience layer, and cache hit/miss counts are read from the
+caches when metrics are collected.
+"""
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds; covers cache hits (ms) up to slow synthesis of long messages
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels):
+        """``(bucket counts, sum, count)`` for one label set."""
+        with self._lock:
+            state = self._values.get(_label_key(labels))
+            return (list(state[0]), state[1], state[2]) if state else ([0] * (len(self.buckets) + 1), 0.0, 0)
+
+    def label_sets(self):
+        with self._lock:
+            return [dict(key) for key in self._values]
+
+    def quantile(self, q, **labels):
+        """Estimate a quantile by linear interpolation inside the bucket it falls in."""
+        counts, _, total = self.snapshot(**labels)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            if seen + count >= rank and count:
+                if bound == math.inf:
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total_sum, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, total_sum))
+            samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+class RateMeter:
+    """Events per second over a sliding window (one-second buckets)."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def mark(self, count=1):
+        now = int(time.monotonic())
+        with self._lock:
+            if self._events and self._events[-1][0] == now:
+                self._events[-1][1] += count
+            else:
+                self._events.append([now, count])
+            self._trim(now)
+
+    def rate(self):
+        now = int(time.monotonic())
+        with self._lock:
+            self._trim(now)
+            if not self._events:
+                return 0.0
+            span = max(1, min(self.window, now - self._events[0][0] + 1))
+            return sum(count for _, count in self._events) / span
+
+    def _trim(self, now):
+        while self._events and self._events[0][0] <= now - self.window:
+            self._events.popleft()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """``collect()`` runs on every scrape and returns metrics with fresh values (e.g. cache stats)."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def collect(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        for collect in collectors:
+            try:
+                metrics.extend(collect())
+            except Exception:
+                pass
+        return metrics
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.collect():
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.extend(metric.header())
+            for name, key, value in samples:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "outbound_stage_seconds", "Time spent per campaign stage, including retries."))
+STAGE_IN_FLIGHT = REGISTRY.register(Gauge(
+    "outbound_stage_in_flight", "Operations currently running per stage."))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "outbound_stage_errors_total", "Stage operations that raised."))
+PROVIDER_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "outbound_provider_request_seconds", "Latency of single provider requests (each attempt)."))
+PROVIDER_REQUESTS = REGISTRY.register(Counter(
+    "outbound_provider_requests_total", "Provider requests by outcome (ok, retried, failed, throttled)."))
+CALLS = REGISTRY.register(Counter(
+    "outbound_calls_total", "Calls by result (placed, failed)."))
+FALLBACKS = REGISTRY.register(Counter(
+    "outbound_fallbacks_total", "Fallbacks to Twilio <Say> by reason."))
+TTS_ROUTES = REGISTRY.register(Counter(
+    "outbound_tts_routes_total", "Speech in ElevenLabs languages routed to each provider, by reason."))
+
+CALL_RATE = RateMeter()
+
+
+@contextmanager
+def timed(stage):
+    """Time a stage: latency histogram, in-flight gauge and error counter."""
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+
+
+def record_call(success):
+    CALLS.inc(result="placed" if success else "failed")
+    if success:
+        CALL_RATE.mark()
+
+
+def record_fallback(reason):
+    FALLBACKS.inc(reason=reason)
+
+
+def _collect_runtime():
+    """Cache and provider-guard gauges read at scrape time."""
+    from .audio_cache import cache_stats as audio_cache_stats
+    from .caller_id import caller_id_stats
+    from .resilience import resilience_stats
+    from .shared_cache import shared_cache_stats
+    from .translation_cache import cache_stats as translation_cache_stats
+    from .tts_router import tts_router_stats
+
+    cache_requests = Counter("outbound_cache_requests_total", "Cache lookups by cache and result.")
+    cache_evictions = Counter("outbound_cache_evictions_total", "Entries evicted from each cache.")
+    for cache, stats in (("audio", audio_cache_stats()), ("translation", translation_cache_stats())):
+        cache_requests.inc(stats["hits"], cache=cache, result="hit")
+        cache_requests.inc(stats["misses"], cache=cache, result="miss")
+        cache_evictions.inc(stats["evictions"], cache=cache)
+
+    shared_requests = Counter(
+        "outbound_shared_cache_requests_total",
+        "Shared memory cache lookups by result; coalesced requests waited for an identical call in flight.",
+    )
+    shared_bytes = Gauge("outbound_shared_cache_bytes", "Bytes held by each shared memory cache.")
+    for cache, stats in shared_cache_stats().items():
+        shared_requests.inc(stats["hits"], cache=cache, result="hit")
+        shared_requests.inc(stats["misses"], cache=cache, result="miss")
+        shared_requests.inc(stats["coalesced"], cache=cache, result="coalesced")
+        shared_bytes.set(stats["bytes"], cache=cache)
+
+    limit = Gauge("outbound_provider_concurrency_limit", "Current adaptive cap on requests in flight.")
+    in_flight = Gauge("outbound_provider_in_flight", "Provider requests in flight.")
+    breaker_open = Gauge("outbound_provider_breaker_open", "1 while the provider's circuit breaker is not closed.")
+    for provider, stats in resilience_stats().items():
+        limit.set(stats["concurrency_limit"], provider=provider)
+        in_flight.set(stats["in_flight"], provider=provider)
+        breaker_open.set(0 if stats["breaker"] == "closed" else 1, provider=provider)
+
+    sender_calls = Counter("outbound_caller_id_calls_total", "Call attempts per sender number.")
+    sender_failures = Counter(
+        "outbound_caller_id_failures_total", "Attempts throttled or rejected because of the sender number."
+    )
+    sender_resting = Gauge("outbound_caller_id_resting", "1 while a sender number is rested after failures.")
+    for number, stats in caller_id_stats().items():
+        sender_calls.inc(stats["calls"], number=number)
+        sender_failures.inc(stats["failures"], number=number)
+        sender_resting.set(1 if stats["resting_for"] else 0, number=number)
+
+    routing = tts_router_stats()
+    tts_latency = Gauge("outbound_tts_elevenlabs_latency_seconds", "Smoothed ElevenLabs synthesis latency.")
+    tts_error_rate = Gauge("outbound_tts_elevenlabs_error_rate", "Smoothed share of failed ElevenLabs requests.")
+    tts_avoided = Gauge("outbound_tts_elevenlabs_avoided", "1 while speech is routed to Twilio <Say> instead.")
+    tts_spend = Gauge("outbound_tts_spend_last_hour", "ElevenLabs characters synthesized in the last hour, priced.")
+    if routing["latency"] is not None:
+        tts_latency.set(routing["latency"])
+    tts_error_rate.set(routing["error_rate"])
+    tts_avoided.set(1 if routing["degraded"] else 0)
+    tts_spend.set(routing["spent_last_hour"])
+
+    call_rate = Gauge("outbound_calls_per_second", "Calls placed per second over the last minute.")
+    call_rate.set(CALL_RATE.rate())
+    return [
+        cache_requests, cache_evictions, shared_requests, shared_bytes, limit, in_flight, breaker_open,
+        sender_calls, sender_failures, sender_resting, tts_latency, tts_error_rate, tts_avoided, tts_spend,
+        call_rate,
+    ]
+
+
+REGISTRY.add_collector(_collect_runtime)
+
+
+def render_metrics():
+    return REGISTRY.render()
+
+
+def stage_summary():
+    """Per-stage rows for the app: count, errors, mean/p50/p95 seconds and in-flight."""
+    rows = []
+    for labels in sorted(STAGE_SECONDS.label_sets(), key=lambda labels: labels["stage"]):
+        _, total, count = STAGE_SECONDS.snapshot(**labels)
+        rows.append({
+            "stage": labels["stage"],
+            "count": count,
+            "errors": STAGE_ERRORS.value(**labels),
+            "mean_s": total / count if count else None,
+            "p50_s": STAGE_SECONDS.quantile(0.5, **labels),
+            "p95_s": STAGE_SECONDS.quantile(0.95, **labels),
+            "in_flight": STAGE_IN_FLIGHT.value(**labels),
+        })
+    return rows
+
+
+def make_metrics_handler(token=None):
+    """Media server route handler serving ``render_metrics()``; requires ``Bearer token`` when given."""
+    import hmac
+
+    async def handle(headers, body):
+        if token and not hmac.compare_digest(headers.get("authorization", ""), f"Bearer {token}"):
+            return 403, {}, b""
+        return 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}, render_metrics().encode()
+
+    return handle
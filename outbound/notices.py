@@ -0,0 +1,32 @@
+"""User-facing warnings from provider code.
+
+Provider functions report recoverable problems (a failed translation, a
+fallback to Twilio ``<Say>``) through ``warn``/``error``. They go to the
+``logging`` module by default; the Streamlit app routes the ones raised on
+its script threads to ``st.warning``/``st.error`` with ``set_handlers``.
+Handlers belong to the thread that sets them: notices from background
+threads (the campaign worker, the pre-warmer, worker pools) have no page
+to show in and are logged.
+"""
+import logging
+import threading
+
+logger = logging.getLogger("outbound")
+
+_local = threading.local()
+
+
+def set_handlers(warning=None, error=None):
+    """Route the calling thread's notices to ``warning``/``error``."""
+    if warning is not None:
+        _local.warning = warning
+    if error is not None:
+        _local.error = error
+
+
+def warn(message):
+    getattr(_local, "warning", logger.warning)(message)
+
+
+def error(message):
+    getattr(_local, "error", logger.error)(message)
@@ -0,0 +1,218 @@
+"""Personalized reminders from message templates.
+
+A template is ordinary message text with ``{slot}`` placeholders filled
+from each recipient (``{name}``, ``{amount}``, ``{due_date}``,
+``{account}``). The template is translated once per language with the
+placeholders kept in place and split into static segments and slots.
+Static segments are synthesized once per language; only the short slot
+values are synthesized per distinct value, and every clip goes through the
+audio cache. Slot values are spoken as given (names are never translated),
+except the month and weekday names in due dates, which are translated once
+per language. A call then plays the clips as a ``<Play>`` sequence, or as one
+locally stitched file.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from . import notices
+from .calls import play_sequence_twiml, play_twiml, say_twiml
+from .metrics import record_fallback
+from .translation import translate_text_groq
+from .tts import PUBLISHED_URL_TTL, call_audio_key, generate_elevenlabs_tts, publish_buffer, stitch_audio
+from .tts_router import route_speech
+
+SLOT_PATTERN = re.compile(r"\{(\w+)\}")
+SLOT_FIELDS = ("name", "amount", "due_date", "account")
+_SPEAKABLE = re.compile(r"\w")
+# Month and weekday names (and their usual abbreviations) in due dates, by lowercase spelling
+CALENDAR_WORDS = {
+    spelling: word
+    for word in (
+        "January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+        "November", "December", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday",
+    )
+    for spelling in (word.lower(), word[:3].lower())
+}
+CALENDAR_WORDS["sept"] = "September"
+_CALENDAR_PATTERN = re.compile(r"\b(%s)\b" % "|".join(sorted(CALENDAR_WORDS, key=len, reverse=True)), re.IGNORECASE)
+# Clip URLs remembered per language; the audio itself stays in the disk cache
+_MAX_MEMO_CLIPS = 10000
+
+
+def template_slots(text):
+    """Names of the recipient fields used as ``{slot}`` placeholders in ``text``."""
+    return [name for name in SLOT_PATTERN.findall(text or "") if name in SLOT_FIELDS]
+
+
+def split_template(text):
+    """Split ``text`` into ``("text", str)`` and ``("slot", name)`` segments."""
+    segments = []
+    position = 0
+    for match in SLOT_PATTERN.finditer(text):
+        if match.group(1) not in SLOT_FIELDS:
+            continue
+        if match.start() > position:
+            segments.append(("text", text[position:match.start()]))
+        segments.append(("slot", match.group(1)))
+        position = match.end()
+    if position < len(text):
+        segments.append(("text", text[position:]))
+    return segments
+
+
+def speakable_value(slot, value):
+    """Format a slot value for speech; account numbers are read character by character."""
+    value = str(value or "").strip()
+    if slot == "account":
+        return " ".join(value)
+    return value
+
+
+class PersonalizedMessage:
+    """One language's translated template, with its static audio prepared up front."""
+
+    def __init__(self, template, lang_obj, playback="sequence"):
+        self.lang_obj = lang_obj
+        self.playback = playback
+        translated = translate_text_groq(template, lang_obj["code"])
+        if sorted(template_slots(translated)) != sorted(template_slots(template)):
+            notices.warn(
+                f"Translation to {lang_obj['name']} dropped a placeholder; using the original template."
+            )
+            translated = template
+        self.template = translated
+        self.segments = split_template(translated)
+        self._clips = OrderedDict()  # text -> (cache_key, url, published), LRU-bounded
+        self._calendar = {}  # English month/weekday name -> its translation
+        self._lock = threading.Lock()
+        self.uses_audio = lang_obj["provider"] == "elevenlabs"
+        static = [value.strip() for kind, value in self.segments if kind == "text" and _SPEAKABLE.search(value)]
+        # While speech is routed to Twilio the static clips are synthesized later, by the first call that plays them
+        if self.uses_audio and route_speech(static, lang_obj["voice"]) == "elevenlabs":
+            try:
+                for text in static:
+                    self._clip(text)
+            except Exception as e:
+                # Not fatal: calls synthesize the missing clips, or use Twilio's voice while ElevenLabs fails
+                notices.warn(f"Template audio could not be prepared yet: {e}")
+
+    def __getstate__(self):
+        # Picklable (without its lock) so sharded dispatch can hand prepared templates to workers
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _clip(self, text):
+        """``(cache_key, url)`` for ``text``, memoized per process on top of the disk cache.
+
+        URLs are published again once they are ``PUBLISHED_URL_TTL`` old, before they expire.
+        """
+        text = text.strip()
+        with self._lock:
+            clip = self._clips.get(text)
+            if self._fresh(clip):
+                self._clips.move_to_end(text)
+                return clip[:2]
+        buffer = generate_elevenlabs_tts(text, self.lang_obj["voice"])
+        if buffer is None:
+            raise RuntimeError(f"could not synthesize {text!r}")
+        cache_key = call_audio_key(text, self.lang_obj["voice"])
+        url = None
+        if self.playback == "sequence":
+            url = publish_buffer(cache_key, buffer)
+            if not url:
+                raise RuntimeError(f"could not publish audio for {text!r}")
+        with self._lock:
+            self._clips[text] = (cache_key, url, time.time())
+            self._clips.move_to_end(text)
+            if len(self._clips) > _MAX_MEMO_CLIPS:
+                self._clips.popitem(last=False)
+        return cache_key, url
+
+    @staticmethod
+    def _fresh(clip):
+        # Stitched playback keeps no URL; wall-clock time, because prepared templates are pickled to workers
+        return clip is not None and (clip[1] is None or time.time() - clip[2] < PUBLISHED_URL_TTL)
+
+    def _slot_text(self, slot, recipient):
+        value = speakable_value(slot, getattr(recipient, slot, None))
+        if slot == "due_date" and value:
+            # Month and weekday names follow the call language; the rest (digits, ordinals) is kept
+            value = _CALENDAR_PATTERN.sub(lambda match: self._calendar_word(match.group(1)), value)
+        return value
+
+    def _calendar_word(self, spelling):
+        """The call language's name for a month or weekday, translated once per language."""
+        word = CALENDAR_WORDS[spelling.lower()]
+        with self._lock:
+            translated = self._calendar.get(word)
+        if translated is None:
+            translated = translate_text_groq(word, self.lang_obj["code"]).strip()
+            with self._lock:
+                self._calendar[word] = translated
+        return translated
+
+    def text_for(self, recipient):
+        """The full personalized message for ``recipient`` in this language."""
+        return "".join(
+            value if kind == "text" else self._slot_text(value, recipient)
+            for kind, value in self.segments
+        )
+
+    def texts_for(self, recipient):
+        """The spoken pieces for ``recipient``, in order (punctuation-only pieces dropped)."""
+        texts = []
+        for kind, value in self.segments:
+            text = value if kind == "text" else self._slot_text(value, recipient)
+            if _SPEAKABLE.search(text or ""):
+                texts.append(text)
+        return texts
+
+    def twiml_for(self, recipient):
+        code = self.lang_obj["code"]
+        if not self.uses_audio:
+            # Use Twilio Polly voices
+            return say_twiml(self.text_for(recipient), code, self.lang_obj["voice"])
+        texts = self.texts_for(recipient)
+        with self._lock:
+            uncached = [text for text in texts if not self._fresh(self._clips.get(text.strip()))]
+        if route_speech(uncached, self.lang_obj["voice"]) != "elevenlabs":
+            return say_twiml(self.text_for(recipient), code)
+        try:
+            if self.playback == "sequence":
+                return play_sequence_twiml([self._clip(text)[1] for text in texts])
+            return play_twiml(self._stitch([self._clip_audio(text) for text in texts]))
+        except Exception as e:
+            notices.warn(f"Personalized audio failed: {e}. Using Twilio TTS fallback.")
+            record_fallback("personalized_audio_failed")
+            return say_twiml(self.text_for(recipient), code)
+
+    def audio_for(self, recipient):
+        """One stitched ``AudioBuffer`` for ``recipient`` (used for previews)."""
+        return self._stitched_buffer([self._clip_audio(text) for text in self.texts_for(recipient)])[1]
+
+    def _clip_audio(self, text):
+        """``(cache_key, AudioBuffer)`` for ``text``, from memory or the audio cache, synthesized again once evicted."""
+        text = text.strip()
+        self._clip(text)
+        buffer = generate_elevenlabs_tts(text, self.lang_obj["voice"])
+        if buffer is None:
+            raise RuntimeError(f"could not synthesize {text!r}")
+        return call_audio_key(text, self.lang_obj["voice"]), buffer
+
+    def _stitch(self, clips):
+        key, buffer = self._stitched_buffer(clips)
+        url = publish_buffer(key, buffer)
+        if not url:
+            raise RuntimeError("could not publish stitched audio")
+        return url
+
+    def _stitched_buffer(self, clips):
+        """Join ``(cache_key, AudioBuffer)`` clips into one cached file; returns ``(cache_key, AudioBuffer)``."""
+        return stitch_audio(clips)
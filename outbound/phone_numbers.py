@@ -0,0 +1,192 @@
+"""E.164 phone number normalization.
+
+Numbers are cleaned with ``str.translate`` (no regular expressions), their
+country calling code is found with a prefix trie built once at import, and
+the national number is checked against the country's length rules.
+``normalize_numbers`` does a whole column in one pass.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CountryRule:
+    country: str
+    min_length: int  # national significant number, without trunk prefix
+    max_length: int
+    trunk_prefix: str = "0"  # dialled before national numbers inside the country, if any
+
+
+# Calling code -> rule. Countries not listed here are accepted by the general E.164 limits.
+COUNTRY_RULES = {
+    "1": CountryRule("USA/Canada", 10, 10, "1"),
+    "7": CountryRule("Russia/Kazakhstan", 10, 10, "8"),
+    "20": CountryRule("Egypt", 8, 10),
+    "27": CountryRule("South Africa", 9, 9),
+    "30": CountryRule("Greece", 10, 10, None),
+    "31": CountryRule("Netherlands", 9, 9),
+    "32": CountryRule("Belgium", 8, 9),
+    "33": CountryRule("France", 9, 9),
+    "34": CountryRule("Spain", 9, 9, None),
+    "39": CountryRule("Italy", 6, 11, None),
+    "41": CountryRule("Switzerland", 9, 9),
+    "43": CountryRule("Austria", 4, 13),
+    "44": CountryRule("UK", 9, 10),
+    "45": CountryRule("Denmark", 8, 8, None),
+    "46": CountryRule("Sweden", 7, 13),
+    "47": CountryRule("Norway", 8, 8, None),
+    "48": CountryRule("Poland", 9, 9, None),
+    "49": CountryRule("Germany", 6, 13),
+    "52": CountryRule("Mexico", 10, 10, None),
+    "55": CountryRule("Brazil", 10, 11),
+    "60": CountryRule("Malaysia", 8, 10),
+    "61": CountryRule("Australia", 9, 9),
+    "62": CountryRule("Indonesia", 8, 12),
+    "63": CountryRule("Philippines", 8, 10),
+    "64": CountryRule("New Zealand", 8, 10),
+    "65": CountryRule("Singapore", 8, 8, None),
+    "66": CountryRule("Thailand", 8, 9),
+    "81": CountryRule("Japan", 9, 10),
+    "82": CountryRule("South Korea", 8, 10),
+    "84": CountryRule("Vietnam", 9, 10),
+    "86": CountryRule("China", 10, 11),
+    "90": CountryRule("Turkey", 10, 10),
+    "91": CountryRule("India", 10, 10),
+    "92": CountryRule("Pakistan", 9, 10),
+    "94": CountryRule("Sri Lanka", 9, 9),
+    "234": CountryRule("Nigeria", 8, 10),
+    "254": CountryRule("Kenya", 9, 9),
+    "351": CountryRule("Portugal", 9, 9, None),
+    "353": CountryRule("Ireland", 7, 9),
+    "880": CountryRule("Bangladesh", 10, 10),
+    "965": CountryRule("Kuwait", 8, 8, None),
+    "966": CountryRule("Saudi Arabia", 9, 9),
+    "968": CountryRule("Oman", 8, 8, None),
+    "971": CountryRule("UAE", 8, 9),
+    "972": CountryRule("Israel", 8, 9),
+    "973": CountryRule("Bahrain", 8, 8, None),
+    "974": CountryRule("Qatar", 8, 8, None),
+    "977": CountryRule("Nepal", 8, 10),
+}
+
+# E.164: at most 15 digits after the '+'; shorter than 8 is never a dialable mobile/landline
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+
+# Separators people and spreadsheets put in numbers
+_SEPARATORS = str.maketrans("", "", " -.()/\t\u00a0\u2010\u2011\u2012\u2013\u2212")
+
+
+class PrefixTrie:
+    """Longest-prefix lookup over digit strings."""
+
+    def __init__(self, items=()):
+        self._root = {}
+        for prefix, value in items:
+            self.insert(prefix, value)
+
+    def insert(self, prefix, value):
+        node = self._root
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+        node[""] = value
+
+    def longest_match(self, digits):
+        """``(prefix, value)`` for the longest stored prefix of ``digits``, else ``None``."""
+        node = self._root
+        found = None
+        for end, digit in enumerate(digits, start=1):
+            node = node.get(digit)
+            if node is None:
+                break
+            if "" in node:
+                found = (digits[:end], node[""])
+        return found
+
+
+_CALLING_CODES = PrefixTrie(COUNTRY_RULES.items())
+
+
+def _clean(raw):
+    """Digits of ``raw`` and whether it was written with a leading '+', or ``(None, False)``."""
+    if isinstance(raw, float) and raw.is_integer():
+        raw = int(raw)  # spreadsheets store numbers as floats: 9876543210.0
+    text = str(raw).strip()
+    if text.endswith(".0"):
+        text = text[:-2]  # ... and CSV exports of those sheets write them as "9876543210.0"
+    plus = text.startswith("+")
+    digits = text.translate(_SEPARATORS).lstrip("+")
+    if not (digits.isdigit() and digits.isascii()):
+        return None, False
+    return digits, plus
+
+
+def _fits(rule, length):
+    return rule.min_length <= length <= rule.max_length
+
+
+def _international(digits):
+    """Validate country code + national number digits; returns E.164 or ``None``."""
+    match = _CALLING_CODES.longest_match(digits)
+    if match is None:
+        # Countries without a rule: general E.164 limits only
+        return "+" + digits if MIN_DIGITS <= len(digits) <= MAX_DIGITS and digits[0] != "0" else None
+    code, rule = match
+    national = digits[len(code):]
+    # "+44 (0)20 ..." keeps the trunk prefix after the country code
+    if rule.trunk_prefix and not _fits(rule, len(national)) and national.startswith(rule.trunk_prefix):
+        national = national[len(rule.trunk_prefix):]
+    if not _fits(rule, len(national)):
+        return None
+    return "+" + code + national
+
+
+def normalize_number(raw, default_country_code="+91"):
+    """Return the E.164 form of ``raw``, or ``None`` when it is not a valid number.
+
+    Numbers written with '+' or an international '00' prefix keep their
+    country code; others are national numbers of ``default_country_code``
+    (a trunk prefix such as the leading 0 is dropped, and a national number
+    that already starts with the country code is recognized).
+    """
+    if raw is None:
+        return None
+    digits, plus = _clean(raw)
+    if not digits:
+        return None
+    if plus:
+        return _international(digits)
+    if digits.startswith("00"):
+        return _international(digits[2:])
+
+    code = default_country_code.lstrip("+")
+    rule = COUNTRY_RULES.get(code)
+    if rule is None:
+        return _international(code + digits.lstrip("0"))
+    length = len(digits)
+    if rule.trunk_prefix and digits.startswith(rule.trunk_prefix) and _fits(rule, length - len(rule.trunk_prefix)):
+        return "+" + code + digits[len(rule.trunk_prefix):]
+    if _fits(rule, length):
+        return "+" + code + digits
+    if digits.startswith(code) and _fits(rule, length - len(code)):
+        return "+" + digits
+    return None
+
+
+def normalize_numbers(raws, default_country_code="+91", country_codes=None):
+    """Normalize a column of numbers in one pass; ``None`` marks invalid entries.
+
+    ``country_codes`` optionally gives a per-number default country code
+    (falsy entries use ``default_country_code``).
+    """
+    normalize = normalize_number
+    if country_codes is None:
+        return [normalize(raw, default_country_code) for raw in raws]
+    return [normalize(raw, code or default_country_code) for raw, code in zip(raws, country_codes)]
+
+
+def country_code_of(raw):
+    """``"+<digits>"`` from a country code cell such as ``91``, ``+91`` or ``"IN +91"``; ``None`` if blank."""
+    if isinstance(raw, float) and raw.is_integer():
+        raw = int(raw)
+    digits = "".join(char for char in str(raw) if char.isdigit())
+    return "+" + digits if digits else None
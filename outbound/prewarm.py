@@ -0,0 +1,175 @@
+"""Speculative preparation of the campaign message while it is being edited.
+
+The app asks for the current message and language on every rerun, for its
+session. A background thread waits until a request has stayed the same for
+a short quiet period, then translates it and synthesizes and publishes its
+audio, so the translation and audio caches are warm and the campaign
+language's TwiML is ready when the campaign is sent. A session's newer
+request supersedes its older one: once no session wants a request any
+more, it stops at its next step, and anything it already produced stays in
+the caches. Sessions asking for the same message share its preparation.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from .calls import play_twiml, say_twiml
+from .personalize import PersonalizedMessage, template_slots
+from .translation import translate_text_groq
+from .tts import generate_and_publish_elevenlabs_audio
+
+WAITING = "waiting"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+# Recent results kept for switching back and forth between messages or languages (for all sessions)
+_MAX_RESULTS = 64
+# Sessions whose latest request is remembered; the least recently active are forgotten first
+_MAX_SESSIONS = 256
+
+PrewarmStatus = namedtuple("PrewarmStatus", "state twiml error finished")
+
+
+class Superseded(Exception):
+    """Every session that asked for the request moved on before it was prepared."""
+
+
+class Prewarmer:
+    """Background thread that prepares the latest requested message after ``debounce`` quiet seconds.
+
+    Results older than ``max_age`` seconds are prepared again, because the
+    audio URL in their TwiML expires.
+    """
+
+    def __init__(self, debounce=1.0, max_age=30 * 60, playback="sequence"):
+        self.debounce = debounce
+        self.max_age = max_age
+        self.playback = playback
+        self._results = OrderedDict()  # key -> PrewarmStatus
+        self._pending = OrderedDict()  # key -> (message, text, lang_obj, requested_at), oldest first
+        self._wanted = OrderedDict()  # session -> key of its latest request
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @staticmethod
+    def key(message, text, lang_obj):
+        return (message, text, lang_obj["code"], lang_obj["voice"], lang_obj["provider"])
+
+    def request(self, message, text, lang_obj, session=None):
+        """Ask for ``message`` (the source) to be prepared in ``lang_obj``'s language, with
+        ``text`` being what the campaign language will speak, on behalf of ``session``
+        (replacing its previous request). Returns the request's key."""
+        key = self.key(message, text, lang_obj)
+        with self._condition:
+            self._wanted[session] = key
+            self._wanted.move_to_end(session)
+            while len(self._wanted) > _MAX_SESSIONS:
+                self._wanted.popitem(last=False)
+            # Waiting requests no session wants any more are dropped before they start
+            wanted = set(self._wanted.values())
+            for stale in [pending for pending in self._pending if pending not in wanted]:
+                del self._pending[stale]
+                self._results.pop(stale, None)
+            status = self._results.get(key)
+            if status is not None and status.state != FAILED and not self._expired(status):
+                self._results.move_to_end(key)
+                return key
+            if key not in self._pending:
+                self._pending[key] = (message, text, lang_obj, time.monotonic())
+                self._set(key, PrewarmStatus(WAITING, None, None, None))
+                self._condition.notify()
+        self.start()
+        return key
+
+    def status(self, key):
+        """``PrewarmStatus`` of a request, or ``None`` if it was never requested (or was superseded or expired)."""
+        with self._condition:
+            status = self._results.get(key)
+        if status is not None and self._expired(status):
+            return None
+        return status
+
+    def twiml(self, key):
+        """The prepared TwiML for ``key`` when it is ready (``None`` for templates, which are
+        personalized per recipient, and for requests that are not ready)."""
+        status = self.status(key)
+        return status.twiml if status is not None and status.state == READY else None
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+                self._thread.start()
+        return self
+
+    def _expired(self, status):
+        return status.finished is not None and time.monotonic() - status.finished > self.max_age
+
+    def _set(self, key, status):
+        self._results[key] = status
+        self._results.move_to_end(key)
+        while len(self._results) > _MAX_RESULTS:
+            self._results.popitem(last=False)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                key, (message, text, lang_obj, requested_at) = next(iter(self._pending.items()))
+                # Debounce: start only once the request has stopped changing
+                remaining = requested_at + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                del self._pending[key]
+                self._set(key, PrewarmStatus(WARMING, None, None, None))
+            try:
+                twiml = self._prepare(key, message, text, lang_obj)
+                status = PrewarmStatus(READY, twiml, None, time.monotonic())
+            except Superseded:
+                with self._condition:
+                    self._results.pop(key, None)
+                continue
+            except Exception as e:
+                status = PrewarmStatus(FAILED, None, str(e), time.monotonic())
+            with self._condition:
+                self._set(key, status)
+
+    def _check(self, key):
+        with self._condition:
+            if key not in self._wanted.values():
+                raise Superseded()
+
+    def _prepare(self, key, message, text, lang_obj):
+        self._check(key)
+        # The translation the Translate button and the campaign's other steps will look up
+        translate_text_groq(message, lang_obj["code"])
+        self._check(key)
+        if template_slots(message):
+            # Static segments go into the audio cache; slots are filled per recipient
+            if lang_obj["provider"] == "elevenlabs":
+                PersonalizedMessage(message, lang_obj, self.playback)
+            return None
+        if lang_obj["provider"] != "elevenlabs":
+            return say_twiml(text, lang_obj["code"], lang_obj["voice"])
+        audio, audio_url = generate_and_publish_elevenlabs_audio(text, lang_obj["voice"])
+        if not audio_url:
+            raise RuntimeError("audio could not be generated" if audio is None else "audio could not be published")
+        return play_twiml(audio_url)
+
+
+_prewarmers = {}
+_lock = threading.Lock()
+
+
+def get_prewarmer(debounce=1.0, playback="sequence"):
+    """Process-wide ``Prewarmer`` for the given settings (shared by every app session; each passes
+    its own ``session`` to ``request``)."""
+    with _lock:
+        prewarmer = _prewarmers.get((debounce, playback))
+        if prewarmer is None:
+            prewarmer = Prewarmer(debounce, playback=playback)
+            _prewarmers[(debounce, playback)] = prewarmer
+        return prewarmer
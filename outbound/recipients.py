@@ -0,0 +1,92 @@
+"""Indexed, deduplicated calling list."""
+from collections import namedtuple
+from itertools import islice
+
+# Compact per-recipient record; everything except the number is optional
+Recipient = namedtuple(
+    "Recipient",
+    ["number", "language", "name", "amount", "due_date", "account"],
+    defaults=(None, None, None, None, None),
+)
+
+
+class CallingList:
+    """Recipients keyed by E.164 number.
+
+    Backed by an insertion-ordered dict, so membership, dedupe and delete are
+    O(1) and iteration keeps the order numbers were added in. ``version``
+    changes on every edit, so views derived from the list (search results,
+    pages) can be cached until it changes.
+    """
+
+    def __init__(self, recipients=()):
+        self._by_number = {}
+        self.version = 0
+        self.extend(recipients)
+
+    def __len__(self):
+        return len(self._by_number)
+
+    def __iter__(self):
+        return iter(self._by_number.values())
+
+    def __contains__(self, number):
+        return number in self._by_number
+
+    def __bool__(self):
+        return bool(self._by_number)
+
+    def get(self, number):
+        return self._by_number.get(number)
+
+    def add(self, recipient):
+        """Add ``recipient``; returns ``False`` if its number is already listed."""
+        if recipient.number in self._by_number:
+            return False
+        self._by_number[recipient.number] = recipient
+        self.version += 1
+        return True
+
+    def extend(self, recipients):
+        """Add many recipients; returns ``(added, duplicates)``."""
+        added = duplicates = 0
+        by_number = self._by_number
+        for recipient in recipients:
+            if recipient.number in by_number:
+                duplicates += 1
+            else:
+                by_number[recipient.number] = recipient
+                added += 1
+        if added:
+            self.version += 1
+        return added, duplicates
+
+    def remove(self, number):
+        return self.remove_many((number,)) == 1
+
+    def remove_many(self, numbers):
+        removed = sum(1 for number in numbers if self._by_number.pop(number, None) is not None)
+        if removed:
+            self.version += 1
+        return removed
+
+    def clear(self):
+        if self._by_number:
+            self.version += 1
+        self._by_number.clear()
+
+    def numbers(self):
+        return list(self._by_number)
+
+    def page(self, offset, limit):
+        return list(islice(self._by_number.values(), offset, offset + limit))
+
+    def search(self, query):
+        """Numbers whose number, name or account contains ``query`` (case-insensitive), in list order."""
+        query = query.strip().lower()
+        if not query:
+            return self.numbers()
+        return [
+            r.number for r in self._by_number.values()
+            if query in r.number or query in (r.name or "").lower() or query in (r.account or "").lower()
+        ]
@@ -0,0 +1,367 @@
+"""Retries, circuit breakers and adaptive concurrency for provider calls.
+
+Every provider request (Twilio, Groq, ElevenLabs, tmpfiles.org) goes through
+``call_with_resilience(provider, fn)``:
+
+- errors are classified: throttling (429) and server/network errors are
+  retried, client errors (bad number, bad key) are raised at once; requests
+  that are not idempotent (placing a call) are only retried when the
+  provider cannot have acted on them;
+- retries back off exponentially with full jitter, honouring ``Retry-After``;
+- a per-provider circuit breaker stops hammering a provider that keeps
+  failing, and lets one probe request through after a cool-down;
+- a per-provider AIMD limiter caps requests in flight: it halves on 429/5xx
+  and grows by about one slot per round of healthy-latency responses, so a
+  large campaign settles at the rate the provider accepts.
+
+Provider SDKs are never imported here; errors are classified by their
+status code and type name.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from .metrics import PROVIDER_REQUEST_SECONDS, PROVIDER_REQUESTS
+
+
+class ProviderError(Exception):
+    """An HTTP error response from a provider we call without an SDK."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit breaker is open; the request was not sent."""
+
+    def __init__(self, provider, retry_in):
+        super().__init__(f"{provider} is failing; not retrying for {retry_in:.0f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+# Type names of network-level errors across requests, httpx and the SDKs built on them
+_NETWORK_ERROR_NAMES = (
+    "ConnectionError", "ConnectError", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout",
+    "Timeout", "TimeoutException", "RemoteProtocolError", "ReadError", "WriteError",
+    "APIConnectionError", "APITimeoutError", "ChunkedEncodingError",
+)
+# Errors raised before the request reached the provider
+_CONNECT_ERROR_NAMES = ("ConnectError", "ConnectTimeout", "NewConnectionError")
+
+
+@dataclass(frozen=True)
+class Failure:
+    retryable: bool
+    throttled: bool = False
+    retry_after: float = None
+    provider_fault: bool = False  # counts against the circuit breaker
+
+
+def _status_code(exc):
+    for candidate in (exc, getattr(exc, "response", None)):
+        if candidate is None:
+            continue
+        for attribute in ("status_code", "status"):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def _retry_after(exc):
+    if getattr(exc, "retry_after", None) is not None:
+        return exc.retry_after
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _named(exc, names):
+    return any(cls.__name__ in names for cls in type(exc).__mro__)
+
+
+def classify(exc, idempotent=True):
+    """Decide whether ``exc`` is worth retrying and whether it means "slow down".
+
+    For requests that are not ``idempotent`` only throttling and errors
+    raised before the request was sent are retryable.
+    """
+    if isinstance(exc, CircuitOpenError):
+        return Failure(retryable=False)
+    status = _status_code(exc)
+    # Twilio reports its own rate limit as error code 20429
+    if status == 429 or getattr(exc, "code", None) == 20429:
+        return Failure(retryable=True, throttled=True, retry_after=_retry_after(exc), provider_fault=True)
+    if status is not None:
+        if status >= 500 or status == 408:
+            return Failure(
+                retryable=idempotent, throttled=True,
+                retry_after=_retry_after(exc), provider_fault=True
+            )
+        return Failure(retryable=False)
+    if _named(exc, _CONNECT_ERROR_NAMES):
+        return Failure(retryable=True, provider_fault=True)
+    if isinstance(exc, (ConnectionError, TimeoutError)) or _named(exc, _NETWORK_ERROR_NAMES):
+        return Failure(retryable=idempotent, provider_fault=True)
+    return Failure(retryable=False)
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+
+    def delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; after ``reset_timeout``
+    one probe request is let through (half-open) and its outcome decides."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """Seconds until a request may be tried; 0 when one may go now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self.state = self.HALF_OPEN
+                self._probing = False
+            return 0.0 if not self._probing else self.reset_timeout / 4
+
+    def allow(self):
+        if self.retry_in() > 0:
+            return False
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class AdaptiveLimiter:
+    """AIMD cap on requests in flight.
+
+    Throttling or server errors multiply the limit by ``decrease`` (at most
+    once per ``cooldown`` so one burst of 429s counts once). Responses whose
+    latency stays within ``tolerance`` times the best recent latency add
+    ``1 / limit``, i.e. about one slot per round of requests.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=32, decrease=0.5, tolerance=2.0, cooldown=1.0):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.best_latency = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self._last_decrease = now
+            elif latency is not None:
+                # The baseline drifts up slowly so one lucky fast response does not pin it
+                if self.best_latency is None or latency < self.best_latency:
+                    self.best_latency = latency
+                else:
+                    self.best_latency *= 1.01
+                if latency <= self.best_latency * self.tolerance:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        outcome = {"latency": None, "throttled": False}
+        try:
+            yield outcome
+        finally:
+            self.release(outcome["latency"], outcome["throttled"])
+
+
+@dataclass
+class ResilienceConfig:
+    policy: RetryPolicy = field(default_factory=RetryPolicy)
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    max_concurrency: int = 32
+    initial_concurrency: int = 4
+    provider_max_concurrency: dict = field(default_factory=dict)  # provider -> max in flight
+
+
+class ProviderGuard:
+    """Retry policy, circuit breaker and concurrency limiter for one provider."""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.policy = config.policy
+        self.breaker = CircuitBreaker(config.failure_threshold, config.reset_timeout)
+        max_limit = config.provider_max_concurrency.get(name, config.max_concurrency)
+        self.limiter = AdaptiveLimiter(min(config.initial_concurrency, max_limit), 1, max_limit)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled = 0
+
+    def call(self, fn, *args, retry=True, idempotent=True, wait_if_open=False, **kwargs):
+        """Run ``fn(*args, **kwargs)`` with retries (when ``retry``), the breaker and the limiter.
+
+        Set ``idempotent=False`` for requests that must not be repeated once the
+        provider may have received them (see ``classify``).
+
+        With ``wait_if_open`` an open breaker is waited out (within the retry
+        budget) instead of failing at once, which suits queued work such as
+        campaign dialing better than interactive requests.
+        """
+        attempts = self.policy.max_attempts if retry else 1
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                retry_in = self.breaker.retry_in() or self.breaker.reset_timeout / 4
+                if not wait_if_open or attempt >= attempts:
+                    raise CircuitOpenError(self.name, retry_in)
+                time.sleep(retry_in)
+                continue
+            self.calls += 1
+            with self.limiter.slot() as outcome:
+                started = time.monotonic()
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    PROVIDER_REQUEST_SECONDS.observe(time.monotonic() - started, provider=self.name)
+                    failure = classify(e, idempotent)
+                    outcome["throttled"] = failure.throttled
+                    if failure.throttled:
+                        self.throttled += 1
+                    if failure.provider_fault:
+                        self.breaker.record_failure()
+                    else:
+                        # A rejected request still means the provider is up
+                        self.breaker.record_success()
+                    if not failure.retryable or attempt >= attempts:
+                        self.failures += 1
+                        PROVIDER_REQUESTS.inc(provider=self.name, outcome="failed")
+                        raise
+                    PROVIDER_REQUESTS.inc(provider=self.name, outcome="throttled" if failure.throttled else "retried")
+                    error = failure
+                else:
+                    outcome["latency"] = time.monotonic() - started
+                    PROVIDER_REQUEST_SECONDS.observe(outcome["latency"], provider=self.name)
+                    PROVIDER_REQUESTS.inc(provider=self.name, outcome="ok")
+                    self.breaker.record_success()
+                    return result
+            self.retries += 1
+            time.sleep(self.policy.delay(attempt, error.retry_after))
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+        }
+
+
+_config = ResilienceConfig()
+_guards = {}
+_lock = threading.Lock()
+
+
+def configure_resilience(**overrides):
+    """Update the resilience settings; guards are rebuilt on next use."""
+    global _config
+    with _lock:
+        values = {**_config.__dict__, **{k: v for k, v in overrides.items() if v is not None}}
+        _config = ResilienceConfig(**values)
+        _guards.clear()
+    return _config
+
+
+def get_guard(provider):
+    guard = _guards.get(provider)
+    if guard is not None:
+        return guard
+    with _lock:
+        guard = _guards.get(provider)
+        if guard is None:
+            guard = ProviderGuard(provider, _config)
+            _guards[provider] = guard
+        return guard
+
+
+def call_with_resilience(provider, fn, *args, **kwargs):
+    """``get_guard(provider).call(fn, *args, **kwargs)``."""
+    return get_guard(provider).call(fn, *args, **kwargs)
+
+
+def resilience_stats():
+    with _lock:
+        guards = dict(_guards)
+    return {name: guard.stats() for name, guard in guards.items()}
@@ -0,0 +1,113 @@
+"""Sharded campaign dispatch over several worker processes.
+
+One process dials with one interpreter and one GIL. ``run_sharded`` prepares
+a job's languages once, in this process, and then starts worker processes
+that pull shards (``JOB_BATCH_SIZE`` recipients at a time) from the job
+store, which serves as the shared queue. Each worker dials its shards with
+its own thread pool and checkpoints the outcomes in the job's rows, so the
+job's results are the merged campaign report.
+
+Rate limits are shared through SQLite (``RATE_LIMIT_DB_PATH``, the job store
+by default): the campaign-wide rate and each sender number's rate hold
+across all workers together. This process keeps the media server and the
+status callback receiver; workers sign audio URLs with the same secret.
+
+Workers on other hosts can join a job with ``python -m outbound worker
+JOB_ID`` when the job store, call status store and rate limit files are on
+storage with working SQLite locking, and their clocks are synchronized.
+Such a worker prepares the languages itself and publishes audio like any
+single-process run (its own media server, or the temporary hosting).
+"""
+import os
+import secrets
+import signal
+import threading
+from dataclasses import replace
+
+
+def shared_settings(settings):
+    """``settings`` for processes dialing one campaign together: rate limits are kept in the
+    job store unless ``RATE_LIMIT_DB_PATH`` names another file."""
+    from .jobs import DEFAULT_JOB_STORE_PATH
+
+    if settings.rate_limit_path:
+        return settings
+    return replace(settings, rate_limit_path=os.path.abspath(settings.job_store_path or DEFAULT_JOB_STORE_PATH))
+
+
+def _worker_main(settings, job_id, prepared, send_call):
+    from .config import configure
+    from .jobs import get_job_store, run_job
+
+    configure(settings)
+    stop = threading.Event()
+    # Ctrl-C reaches every process in the group: finish the calls in flight, then stop
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    run_job(
+        get_job_store(settings.job_store_path), job_id, send_call=send_call,
+        batch_size=settings.job_batch_size, stop=stop, prepared=prepared
+    )
+
+
+def run_sharded(job_id, processes, send_call=None, on_progress=None, stop=None):
+    """Run a job on ``processes`` worker processes until it is done, paused or ``stop`` is set.
+
+    ``send_call`` must be a module-level function (it is pickled for the
+    workers); ``place_twilio_call`` by default. ``on_progress(done, total)``
+    runs here about twice a second. Returns the job's final state.
+    """
+    import multiprocessing
+
+    from .calls import status_callback_url
+    from .campaign import prepare_languages
+    from .config import configure, get_settings
+    from .jobs import FAILED, PAUSED, RUNNABLE_STATES, SENT, get_job_store
+    from .tts import configured_media_server
+
+    # Workers sign audio URLs for this process's media server, so they need its secret
+    settings = get_settings()
+    settings = configure(
+        shared_settings(settings), media_url_secret=settings.media_url_secret or secrets.token_hex(32)
+    )
+    store = get_job_store(settings.job_store_path)
+    job = store.get_job(job_id)
+    if job is None:
+        raise KeyError(job_id)
+
+    # The media server and status receiver live here, for as long as the workers dial
+    if settings.media_public_base_url:
+        configured_media_server()
+    status_callback_url()
+    # Prepared once here, so the workers neither translate nor synthesize
+    variants = prepare_languages(
+        store.languages(job_id), job["message"], job["default_language"], translated=job["translated"]
+    )
+    prepared = {code: variant for code, variant in variants.items() if not isinstance(variant, Exception)}
+
+    context = multiprocessing.get_context("spawn")
+    worker_settings = replace(settings, media_server_external=bool(settings.media_public_base_url))
+    workers = [
+        context.Process(
+            target=_worker_main, args=(worker_settings, job_id, prepared, send_call),
+            name=f"campaign-shard-{index}", daemon=True
+        )
+        for index in range(max(1, processes))
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            if stop is not None and stop.is_set():
+                # Workers stop once their current shard is dialed
+                store.set_state(job_id, PAUSED, only_from=RUNNABLE_STATES)
+            for worker in workers:
+                worker.join(0.5 / len(workers))
+            if on_progress:
+                counts = store.counts(job_id)
+                on_progress(counts[SENT] + counts[FAILED], job["total"])
+    except KeyboardInterrupt:
+        # The workers got the interrupt too and stop after their calls in flight
+        for worker in workers:
+            worker.join()
+    return store.get_job(job_id)["state"]
@@ -0,0 +1,161 @@
+"""Process-wide memory caches with single-flight request coalescing.
+
+Every app session, the campaign worker and the pre-warmer share one process.
+When several of them ask for the same translation or audio at the same
+moment, only the first request calls the provider. The others wait for
+that call and get its result, or its exception. Results are then kept in
+memory, bounded by a byte budget with LRU eviction and an optional time to
+live, in front of the on-disk caches.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def default_sizeof(value):
+    """Approximate bytes held by ``value``: text and byte lengths, summed through tuples."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (tuple, list)):
+        return sum(default_sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class _Flight:
+    """One computation in progress, waited on by the duplicate requests."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedCache:
+    """Memory LRU of at most ``max_bytes`` (per ``sizeof``) whose misses are computed once.
+
+    ``get_or_compute`` returns a cached value, waits for an identical
+    computation already running, or runs ``compute`` itself. Exceptions are
+    not cached; they reach every request that waited for them.
+    """
+
+    def __init__(self, name, max_bytes=16 * 1024 * 1024, ttl=None, sizeof=default_sizeof):
+        self.name = name
+        self.max_bytes = int(max_bytes)
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """The value for ``key``, from memory, from an identical call in flight, or from ``compute()``.
+        Results for which ``cacheable(value)`` is false are shared with waiters but not kept."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.ttl is None or time.monotonic() - entry[2] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._discard_locked(key)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            if cacheable is None or cacheable(flight.value):
+                self._store(key, flight.value)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _store(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard_locked(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard_locked(oldest)
+                self.evictions += 1
+
+    def _discard_locked(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def discard(self, key):
+        """Forget ``key`` (its value went stale); a computation in flight is not affected."""
+        with self._lock:
+            self._discard_locked(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "in_flight": len(self._flights),
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_shared_cache(name, max_bytes=None, ttl=None, sizeof=default_sizeof):
+    """Process-wide ``SharedCache`` called ``name``; later calls may resize it with ``max_bytes``."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = SharedCache(name, max_bytes or 16 * 1024 * 1024, ttl, sizeof)
+            _caches[name] = cache
+        elif max_bytes and int(max_bytes) != cache.max_bytes:
+            cache.max_bytes = int(max_bytes)
+        return cache
+
+
+def shared_cache_stats():
+    """``{name: stats}`` for the shared caches opened in this process."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
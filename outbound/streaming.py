@@ -0,0 +1,49 @@
+"""Sentence-streaming translation and synthesis of long messages.
+
+Translating a paragraph and then synthesizing it makes the call audio wait
+for the whole completion and then for the whole synthesis. Here the Groq
+completion is streamed and split at its sentence markers; each sentence is
+handed to ElevenLabs as soon as it is complete, several at a time, while
+the rest is still being translated. The sentence clips go through the audio
+cache and are stitched back together in message order.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import get_settings
+from .metrics import timed
+from .translation import stream_translation_groq
+from .tts import shared_call_audio, stitch_audio
+
+
+# Function to synthesize one translated sentence in the call audio format (retried like any synthesis)
+def _synthesize_sentence(sentence, voice_id):
+    with timed("synthesize"):
+        return shared_call_audio(sentence, voice_id)
+
+
+# Function to translate text and synthesize it sentence by sentence as the translation streams in.
+# Returns (translated_text, cache_key, AudioBuffer); errors from either provider propagate.
+def translate_and_synthesize(text, target_language, voice_id):
+    settings = get_settings()
+    translated = {}
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(1, settings.sentence_synthesis_workers),
+                            thread_name_prefix="sentence-tts") as executor:
+        try:
+            for index, sentence in stream_translation_groq(text, target_language):
+                translated[index] = sentence
+                if sentence.strip():
+                    futures[index] = executor.submit(_synthesize_sentence, sentence, voice_id)
+            # Ordered reassembly: clips join in message order, whichever finished first
+            clips = [futures[index].result() for index in sorted(futures)]
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+    if not clips:
+        raise ValueError("nothing to synthesize")
+    translated_text = " ".join(translated[index] for index in sorted(translated))
+    if len(clips) == 1:
+        return (translated_text,) + clips[0]
+    cache_key, buffer = stitch_audio(clips)
+    return translated_text, cache_key, buffer
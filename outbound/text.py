@@ -0,0 +1,19 @@
+"""Text helpers shared by translation and synthesis."""
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+# Sentence ends: Latin punctuation plus the Devanagari danda used in Hindi/Marathi
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+")
+
+
+def normalize_text(text):
+    """Collapse runs of whitespace so trivial edits do not change cache keys."""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def split_sentences(text):
+    """Split ``text`` into sentences, keeping the terminating punctuation."""
+    text = normalize_text(text)
+    if not text:
+        return []
+    return [s for s in _SENTENCE_END.split(text) if s]
@@ -0,0 +1,197 @@
+"""Groq translation backed by the translation memory."""
+import re
+
+from . import notices
+from .clients import get_groq_client
+from .config import get_settings
+from .languages import TRANSLATION_LANGUAGE_NAMES
+from .metrics import timed
+from .resilience import call_with_resilience
+from .shared_cache import get_shared_cache
+from .text import split_sentences
+from .translation_cache import get_translation_cache, translate_with_memory, translation_cache_key
+
+# Marks each sentence when several are translated in one request
+SEGMENT_MARKER = re.compile(r"<(\d+)>\s*(.*?)\s*(?=<\d+>|$)", re.DOTALL)
+_MARKER = re.compile(r"<\d+>")
+
+
+# Function to build the Groq chat messages that translate a list of sentences
+def translation_messages(segments, target_lang_name):
+    if len(segments) == 1:
+        system_prompt = f"You are a professional translator specializing in {target_lang_name}. Translate the following English text to {target_lang_name}. Keep placeholders in curly braces such as {{name}} exactly as written. Provide ONLY the {target_lang_name} translation, no explanations or English text."
+        user_prompt = f"Translate this to {target_lang_name}:\n\n{segments[0]}"
+    else:
+        system_prompt = (
+            f"You are a professional translator specializing in {target_lang_name}. "
+            f"Translate each numbered English segment to {target_lang_name}. "
+            f"Keep every marker such as <1> exactly as written, followed by its translation. "
+            f"Keep placeholders in curly braces such as {{name}} exactly as written. "
+            f"Provide ONLY the markers and {target_lang_name} translations, no explanations or English text."
+        )
+        user_prompt = f"Translate these segments to {target_lang_name}:\n\n" + "\n".join(
+            f"<{i}> {segment}" for i, segment in enumerate(segments, start=1)
+        )
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": user_prompt
+        }
+    ]
+
+
+# Function to translate a list of sentences with one Groq completion
+def translate_segments_groq(segments, target_lang_name):
+    settings = get_settings()
+    client = get_groq_client(settings.groq_api_key, settings.groq_base_url)
+    
+    # Use Groq's LLM for translation (rate limits and server errors are retried with backoff)
+    chat_completion = call_with_resilience(
+        "groq",
+        client.chat.completions.create,
+        messages=translation_messages(segments, target_lang_name),
+        model=settings.groq_model,
+        temperature=0.3,
+        max_tokens=2048
+    )
+    
+    content = chat_completion.choices[0].message.content.strip()
+    if len(segments) == 1:
+        return [content]
+    
+    # Reassemble by marker; None tells the caller the segments did not line up
+    parts = {int(n): part for n, part in SEGMENT_MARKER.findall(content)}
+    if sorted(parts) != list(range(1, len(segments) + 1)):
+        return None
+    return [parts[i] for i in range(1, len(segments) + 1)]
+
+
+# Function to translate a list of sentences with one streamed Groq completion, yielding
+# (position, translation) as soon as each numbered segment is complete. Raises ValueError
+# when the segments do not line up.
+def stream_segments_groq(segments, target_lang_name):
+    settings = get_settings()
+    client = get_groq_client(settings.groq_api_key, settings.groq_base_url)
+    
+    # Only opening the stream is retried; a stream that breaks off raises to the caller
+    stream = call_with_resilience(
+        "groq",
+        client.chat.completions.create,
+        messages=translation_messages(segments, target_lang_name),
+        model=settings.groq_model,
+        temperature=0.3,
+        max_tokens=2048,
+        stream=True
+    )
+    
+    content = ""
+    emitted = 0
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if not delta:
+            continue
+        content += delta
+        if len(segments) == 1 or ">" not in delta:
+            continue
+        # Every segment before the latest marker is complete
+        markers = list(_MARKER.finditer(content))
+        if len(markers) < 2:
+            continue
+        for number, part in SEGMENT_MARKER.findall(content[:markers[-1].start()])[emitted:]:
+            if int(number) != emitted + 1:
+                raise ValueError("translated segments did not line up")
+            yield emitted, part
+            emitted += 1
+    
+    if len(segments) == 1:
+        yield 0, content.strip()
+        return
+    parts = SEGMENT_MARKER.findall(content)[emitted:]
+    if [int(number) for number, _ in parts] != list(range(emitted + 1, len(segments) + 1)):
+        raise ValueError("translated segments did not line up")
+    for position, (_, part) in enumerate(parts, start=emitted):
+        yield position, part
+
+
+# Function to translate text sentence by sentence, yielding (index, translated sentence) as each is
+# ready: sentences in the translation memory at once, the others as Groq streams them. Errors propagate.
+def stream_translation_groq(text, target_language):
+    settings = get_settings()
+    sentences = split_sentences(text)
+    target_lang_name = TRANSLATION_LANGUAGE_NAMES.get(target_language, "English")
+    if not settings.groq_api_key or target_lang_name == "English":
+        yield from enumerate(sentences)
+        return
+    
+    cache = get_translation_cache(
+        settings.translation_cache_path,
+        settings.translation_cache_max_entries,
+        settings.translation_cache_ttl
+    )
+    def key(source):
+        return translation_cache_key(source, target_language, settings.groq_model, settings.translation_prompt_version)
+    
+    whole = cache.get(key(text))
+    if whole is not None:
+        yield from enumerate(split_sentences(whole))
+        return
+    
+    translated = [cache.get(key(sentence)) for sentence in sentences]
+    missing = [i for i, value in enumerate(translated) if value is None]
+    for i, value in enumerate(translated):
+        if value is not None:
+            yield i, value
+    if missing:
+        with timed("translate"):
+            for position, value in stream_segments_groq([sentences[i] for i in missing], target_lang_name):
+                translated[missing[position]] = value
+                yield missing[position], value
+        cache.put_many([(key(sentences[i]), translated[i]) for i in missing])
+    cache.put(key(text), " ".join(translated))
+
+
+# Function to translate text using Groq (checked against the translation memory first)
+def translate_text_groq(text, target_language):
+    settings = get_settings()
+    try:
+        if not settings.groq_api_key:
+            notices.error("❌ Groq API key not found! Translation disabled.")
+            return text  # Return original if no API key
+        
+        target_lang_name = TRANSLATION_LANGUAGE_NAMES.get(target_language, "English")
+        
+        # Skip translation if already in English
+        if target_lang_name == "English":
+            return text
+        
+        # Concurrent requests for the same translation (other sessions, the pre-warmer) share one
+        with timed("translate"):
+            translated_text = get_shared_cache("translation", settings.shared_translation_cache_bytes).get_or_compute(
+                (text, target_language, settings.groq_model, settings.translation_prompt_version),
+                lambda: translate_with_memory(
+                    text,
+                    target_language,
+                    lambda segments: translate_segments_groq(segments, target_lang_name),
+                    get_translation_cache(
+                        settings.translation_cache_path,
+                        settings.translation_cache_max_entries,
+                        settings.translation_cache_ttl
+                    ),
+                    settings.groq_model,
+                    settings.translation_prompt_version
+                )
+            )
+        
+        # Debug: Show what was returned
+        if translated_text == text or translated_text.lower() == text.lower():
+            notices.warn(f"⚠️ Translation may have failed. Groq returned same text.")
+        
+        return translated_text
+        
+    except Exception as e:
+        notices.warn(f"Translation failed: {str(e)}. Using original text.")
+        return text
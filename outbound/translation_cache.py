@@ -0,0 +1,159 @@
+"""Persistent translation memory.
+
+Entries are keyed by (normalized source text, target language, model, prompt
+version) and stored in SQLite with a TTL and an LRU cap on the number of
+entries. Whole messages and individual sentences share the same table, so
+editing one sentence of a message only re-translates that sentence.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from .text import normalize_text, split_sentences
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "outbound-agent", "translations.sqlite3")
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+
+def translation_cache_key(text, target_language, model, prompt_version):
+    payload = "\x1f".join([normalize_text(text), target_language, model, str(prompt_version)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " translation TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS translations_last_access ON translations (last_access)")
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT translation, created FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    self._db.execute("DELETE FROM translations WHERE key = ?", (key,))
+                else:
+                    self._db.execute("UPDATE translations SET last_access = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self.hits += 1
+                    return row[0]
+                self._db.commit()
+            self.misses += 1
+            return None
+
+    def put_many(self, items):
+        """Store ``(key, translation)`` pairs in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO translations (key, translation, created, last_access) VALUES (?, ?, ?, ?)",
+                [(key, translation, now, now) for key, translation in items],
+            )
+            self._evict_locked()
+            self._db.commit()
+
+    def put(self, key, translation):
+        self.put_many([(key, translation)])
+
+    def _evict_locked(self):
+        if self.ttl_seconds:
+            cur = self._db.execute("DELETE FROM translations WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self.evictions += cur.rowcount
+        count = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def stats(self):
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {"entries": count, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def translate_with_memory(text, target_language, translate_segments, cache, model, prompt_version):
+    """Translate ``text`` through ``cache``.
+
+    ``translate_segments(segments)`` translates a list of source sentences and
+    returns the translations in the same order, or ``None`` when it could not
+    keep them aligned, in which case the whole message is translated as one
+    segment and only the whole result is cached.
+    """
+    def key(source):
+        return translation_cache_key(source, target_language, model, prompt_version)
+
+    full_key = key(text)
+    cached = cache.get(full_key)
+    if cached is not None:
+        return cached
+
+    sentences = split_sentences(text)
+    translated = [cache.get(key(sentence)) for sentence in sentences]
+    missing = [i for i, value in enumerate(translated) if value is None]
+
+    if missing:
+        results = translate_segments([sentences[i] for i in missing])
+        if results is None or len(results) != len(missing):
+            whole = translate_segments([normalize_text(text)])
+            result = whole[0] if whole else text
+            cache.put(full_key, result)
+            return result
+        for i, value in zip(missing, results):
+            translated[i] = value
+        cache.put_many([(key(sentences[i]), translated[i]) for i in missing])
+
+    result = " ".join(translated)
+    cache.put(full_key, result)
+    return result
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_translation_cache(path=None, max_entries=None, ttl_seconds=None):
+    """Process-wide ``TranslationCache`` for ``path``."""
+    path = os.path.abspath(path or DEFAULT_CACHE_PATH)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = TranslationCache(
+                path,
+                max_entries or DEFAULT_MAX_ENTRIES,
+                DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds,
+            )
+            _caches[path] = cache
+        return cache
+
+
+def cache_stats():
+    """Hit, miss and eviction counts summed over the caches opened in this process."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {name: sum(getattr(cache, name) for cache in caches) for name in ("hits", "misses", "evictions")}
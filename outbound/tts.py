@@ -0,0 +1,383 @@
+"""ElevenLabs synthesis and publishing of call audio."""
+import hashlib
+import uuid
+
+from . import notices
+from .audio_buffer import AudioBuffer
+from .audio_cache import audio_cache_key, get_audio_cache
+from .audio_format import get_format, join_wav, pcm_sample_rate, preview_wav, transcode_pcm
+from .clients import get_elevenlabs_client, get_http_session, get_request_timeout
+from .config import get_settings
+from .media_server import get_media_server, signed_media_url
+from .metrics import timed
+from .resilience import ProviderError, call_with_resilience
+from .shared_cache import get_shared_cache
+from .tts_router import get_tts_router
+
+# Published audio URLs are shared for less time than tmpfiles.org and signed media URLs stay valid
+PUBLISHED_URL_TTL = 30 * 60
+
+
+# Function to open an ElevenLabs synthesis stream; cached audio comes back as a finished buffer instead
+def open_elevenlabs_stream(text, voice_id):
+    settings = get_settings()
+    audio_cache = get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes)
+    cache_key = buffer_cache_key(text, voice_id)
+    cached_path = audio_cache.get(cache_key)
+    if cached_path:
+        return cache_key, AudioBuffer.from_file(cached_path, settings.audio_spill_threshold), None, None
+    
+    # Imported here so the SDK only loads on a cache miss
+    from elevenlabs import VoiceSettings
+    
+    # Shared ElevenLabs client
+    client = get_elevenlabs_client(settings.elevenlabs_api_key, settings.elevenlabs_base_url)
+    
+    # Generate speech
+    response = client.text_to_speech.convert(
+        voice_id=voice_id,
+        optimize_streaming_latency="0",
+        output_format=synthesis_output_format(),
+        text=text,
+        model_id=settings.elevenlabs_model_id,  # Supports 29 languages including Indian languages
+        voice_settings=VoiceSettings(**settings.elevenlabs_voice_settings),
+    )
+    
+    # Long audio spills into the cache directory, where the cache adopts the finished file
+    buffer = AudioBuffer(settings.audio_spill_threshold, audio_cache.directory, f".{synthesis_extension()}")
+    
+    # Remember provider errors so a broken stream is never cached as finished audio (nor left on disk)
+    errors = []
+    def provider_chunks():
+        try:
+            yield from response
+        except Exception as e:
+            errors.append(e)
+            buffer.discard()
+            raise
+    
+    return cache_key, buffer, provider_chunks(), errors
+
+
+# Function to finish an ElevenLabs stream into its buffer and store it in the audio cache
+def finish_elevenlabs_stream(cache_key, buffer, chunks, errors):
+    settings = get_settings()
+    buffer.drain(chunks)
+    if errors:
+        raise errors[0]
+    get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes).put_buffer(
+        cache_key, buffer, synthesis_extension()
+    )
+    return buffer
+
+
+# Function to synthesize text into a finished, cached AudioBuffer (one attempt; provider errors propagate).
+# Each attempt's latency, outcome and characters feed the TTS router.
+def synthesize_elevenlabs(text, voice_id):
+    with get_tts_router().observe(len(text)) as outcome:
+        cache_key, buffer, chunks, errors = open_elevenlabs_stream(text, voice_id)
+        if chunks is None:
+            outcome["cached"] = True
+            return buffer
+        return finish_elevenlabs_stream(cache_key, buffer, chunks, errors)
+
+
+# Function to synthesize text in the call audio format; returns (cache_key, AudioBuffer).
+# Transcoded formats are cached per format, so a cached variant needs no synthesis at all,
+# and a new variant is made from the cached provider audio without synthesizing it again.
+def synthesize_call_audio(text, voice_id):
+    settings = get_settings()
+    audio_format = call_audio_format()
+    if not audio_format.transcoded:
+        return buffer_cache_key(text, voice_id), synthesize_elevenlabs(text, voice_id)
+    
+    audio_cache = get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes)
+    cache_key = call_audio_key(text, voice_id)
+    cached_path = audio_cache.get(cache_key)
+    if cached_path:
+        return cache_key, AudioBuffer.from_file(cached_path, settings.audio_spill_threshold)
+    
+    source = synthesize_elevenlabs(text, voice_id)
+    with timed("transcode"):
+        data = transcode_pcm(
+            source.getvalue(), pcm_sample_rate(settings.elevenlabs_pcm_format), audio_format,
+            settings.call_audio_loudness_dbfs
+        )
+    buffer = AudioBuffer.from_bytes(data)
+    audio_cache.put_buffer(cache_key, buffer, audio_format.extension)
+    return cache_key, buffer
+
+
+# Function to count the memory a shared audio result holds (spilled audio lives on disk)
+def _audio_size(result):
+    buffers = [item for item in result if isinstance(item, AudioBuffer)]
+    return sum(0 if buffer.spilled else buffer.size for buffer in buffers) + 256
+
+
+# Function to synthesize call audio with retries, once per process for concurrent identical
+# requests (other sessions, the pre-warmer, sentence streaming); returns (cache_key, AudioBuffer)
+def shared_call_audio(text, voice_id):
+    settings = get_settings()
+    shared = get_shared_cache("audio", settings.shared_audio_cache_bytes, sizeof=_audio_size)
+    cache_key = call_audio_key(text, voice_id)
+    # A clip the audio cache evicted (or a cache in another directory) is stale in memory too:
+    # a spilled buffer is the cache's own file
+    if not get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes).contains(cache_key):
+        shared.discard(cache_key)
+    # Rate limits and server errors are retried with backoff, each attempt into a fresh buffer
+    return shared.get_or_compute(
+        cache_key,
+        lambda: call_with_resilience("elevenlabs", synthesize_call_audio, text, voice_id)
+    )
+
+
+# Function to generate speech using ElevenLabs TTS into an in-memory AudioBuffer (in the call audio format)
+def generate_elevenlabs_tts(text, voice_id):
+    settings = get_settings()
+    try:
+        if not settings.elevenlabs_api_key:
+            return None
+        
+        with timed("synthesize"):
+            return shared_call_audio(text, voice_id)[1]
+            
+    except Exception as e:
+        notices.warn(f"ElevenLabs TTS failed: {str(e)}. Falling back to Twilio.")
+        return None
+
+
+# Function to join (cache_key, AudioBuffer) clips, in order, into one cached file; returns (cache_key, AudioBuffer).
+# Clips are read from the audio cache, or from their buffers (put back in the cache) once evicted.
+# MP3 clips share one format, so their frames can be joined as-is; WAV clips become one WAV file.
+def stitch_audio(clips):
+    settings = get_settings()
+    audio_format = call_audio_format()
+    key = hashlib.sha256("+".join(cache_key for cache_key, _ in clips).encode()).hexdigest()
+    audio_cache = get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes)
+    path = audio_cache.get(key)
+    if path:
+        return key, AudioBuffer.from_file(path, settings.audio_spill_threshold)
+    parts = []
+    for cache_key, clip in clips:
+        clip_path = audio_cache.get(cache_key)
+        if clip_path is not None:
+            with open(clip_path, "rb") as f:
+                parts.append(f.read())
+            continue
+        try:
+            data = clip.getvalue() if clip is not None else None
+        except OSError:
+            data = None  # spilled into the cache directory, and evicted with it
+        if data is None:
+            raise RuntimeError("clip was evicted from the audio cache")
+        audio_cache.put(cache_key, data, audio_format.extension)
+        parts.append(data)
+    if audio_format.transcoded:
+        buffer = AudioBuffer.from_bytes(join_wav(parts))
+    else:
+        buffer = AudioBuffer(settings.audio_spill_threshold, audio_cache.directory, f".{audio_format.extension}")
+        for part in parts:
+            buffer.write(part)
+        buffer.close()
+    audio_cache.put_buffer(key, buffer, audio_format.extension)
+    return key, buffer
+
+
+# Function to get the built-in media server, started with the configured address and secret
+def configured_media_server():
+    settings = get_settings()
+    return get_media_server(
+        host=settings.media_server_host,
+        port=settings.media_server_port,
+        public_base_url=settings.media_public_base_url,
+        secret=settings.media_url_secret,
+        fallback_dir=get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes).directory
+    )
+
+
+# Function to publish audio on the built-in media server and return a signed URL for Twilio
+def publish_audio(cache_key, buffer):
+    settings = get_settings()
+    extension = call_audio_format().extension
+    if settings.media_server_external:
+        # The media server of another process serves the audio cache directory
+        cache = get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes)
+        if cache.get(cache_key) is None:
+            cache.put_buffer(cache_key, buffer, extension)
+        return signed_media_url(
+            settings.media_public_base_url, settings.media_url_secret, f"{cache_key}.{extension}",
+            settings.media_url_ttl
+        )
+    server = configured_media_server()
+    if buffer.spilled:
+        media_key = server.publish(cache_key, path=buffer.path, extension=extension)
+    else:
+        media_key = server.publish(cache_key, data=buffer.getvalue(), extension=extension)
+    return server.signed_url(media_key, settings.media_url_ttl)
+
+
+# Function to get the configured call audio format (CALL_AUDIO_FORMAT)
+def call_audio_format():
+    return get_format(get_settings().call_audio_format)
+
+
+# Function to get the ElevenLabs output format to request: raw PCM when call audio is transcoded locally
+def synthesis_output_format():
+    settings = get_settings()
+    if call_audio_format().transcoded:
+        return settings.elevenlabs_pcm_format
+    return settings.elevenlabs_output_format
+
+
+# Function to get the file extension the provider's audio is cached under
+def synthesis_extension():
+    audio_format = call_audio_format()
+    return "pcm" if audio_format.transcoded else audio_format.extension
+
+
+# Function to get the audio cache key of text synthesized with the configured ElevenLabs settings
+def buffer_cache_key(text, voice_id, variant=None):
+    settings = get_settings()
+    return audio_cache_key(
+        text, voice_id, settings.elevenlabs_model_id, synthesis_output_format(),
+        settings.elevenlabs_voice_settings, variant
+    )
+
+
+# Function to get the audio cache key of text in the call audio format (per format and loudness)
+def call_audio_key(text, voice_id):
+    settings = get_settings()
+    audio_format = call_audio_format()
+    if not audio_format.transcoded:
+        return buffer_cache_key(text, voice_id)
+    return buffer_cache_key(
+        text, voice_id, {"format": audio_format.name, "loudness_dbfs": settings.call_audio_loudness_dbfs}
+    )
+
+
+# Function to check whether text's call audio is already cached (so playing it costs no synthesis)
+def call_audio_cached(text, voice_id):
+    settings = get_settings()
+    audio_cache = get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes)
+    return audio_cache.contains(call_audio_key(text, voice_id))
+
+
+# Function to get browser-playable preview audio for a call audio buffer; returns (data, mime type)
+def preview_audio(buffer):
+    audio_format = call_audio_format()
+    if audio_format.transcoded:
+        return preview_wav(buffer.getvalue()), "audio/wav"
+    return buffer.getvalue(), audio_format.content_type
+
+
+# Function to make a finished buffer reachable by Twilio (media server when configured, else tmpfiles upload)
+def publish_buffer(cache_key, buffer):
+    if get_settings().media_public_base_url:
+        return publish_audio(cache_key, buffer)
+    return upload_audio_to_tmpfiles(buffer)
+
+
+# Function to synthesize with ElevenLabs and make the audio reachable by Twilio: served by the
+# built-in media server when MEDIA_PUBLIC_BASE_URL is set, otherwise uploaded while it streams in.
+# Concurrent identical requests share one synthesis and upload, and the URL is reused for a while.
+# Returns (AudioBuffer, audio_url); either may be None on failure.
+def generate_and_publish_elevenlabs_audio(text, voice_id):
+    settings = get_settings()
+    if not settings.elevenlabs_api_key:
+        return None, None
+    shared = get_shared_cache("published", settings.shared_audio_cache_bytes, PUBLISHED_URL_TTL, _audio_size)
+    return shared.get_or_compute(
+        (call_audio_key(text, voice_id), settings.media_public_base_url),
+        lambda: _generate_and_publish(text, voice_id),
+        cacheable=lambda result: result[1] is not None
+    )
+
+
+# Function to synthesize and publish one message (see generate_and_publish_elevenlabs_audio)
+def _generate_and_publish(text, voice_id):
+    settings = get_settings()
+    try:
+        if settings.media_public_base_url or call_audio_format().transcoded:
+            # No streamed upload: Twilio fetches the audio straight from us, or it is
+            # transcoded into the call format once it is complete
+            with timed("synthesize"):
+                cache_key, buffer = shared_call_audio(text, voice_id)
+            return buffer, publish_buffer(cache_key, buffer)
+        
+        def stream_and_upload():
+            with get_tts_router().observe(len(text)) as outcome:
+                cache_key, buffer, chunks, errors = open_elevenlabs_stream(text, voice_id)
+                if chunks is None:
+                    outcome["cached"] = True
+                    return buffer, publish_buffer(cache_key, buffer)
+                
+                # The upload body is the provider stream itself; the buffer records it on the way through
+                audio_url = upload_audio_to_tmpfiles(buffer.tee(chunks))
+                # Raises the provider's error, if any, so the whole attempt is retried
+                finish_elevenlabs_stream(cache_key, buffer, chunks, errors)
+            if not audio_url:
+                # The streamed upload failed but the audio is complete: upload it again, with retries
+                audio_url = upload_audio_to_tmpfiles(buffer)
+            return buffer, audio_url
+        
+        with timed("synthesize"):
+            return call_with_resilience("elevenlabs", stream_and_upload)
+            
+    except Exception as e:
+        notices.warn(f"ElevenLabs TTS failed: {str(e)}. Falling back to Twilio.")
+        return None, None
+
+
+# Function to stream a multipart/form-data file body from audio chunks
+def multipart_file_stream(chunks, boundary, filename="audio.mp3", content_type="audio/mpeg"):
+    yield (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode()
+    for chunk in chunks:
+        yield bytes(chunk)
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+# Function to upload audio to tmpfiles.org (more reliable temporary hosting).
+# Accepts a finished AudioBuffer or an iterable of chunks, streamed as a chunked upload.
+# Buffers can be sent again, so only their uploads are retried.
+def upload_audio_to_tmpfiles(audio):
+    def post():
+        chunks = audio.iter_chunks() if isinstance(audio, AudioBuffer) else audio
+        boundary = uuid.uuid4().hex
+        audio_format = call_audio_format()
+        response = get_http_session().post(
+            get_settings().audio_upload_url,
+            data=multipart_file_stream(
+                chunks, boundary, f"audio.{audio_format.extension}", audio_format.content_type
+            ),
+            headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+            timeout=get_request_timeout()
+        )
+        if response.status_code == 429 or response.status_code >= 500:
+            raise ProviderError(
+                f"tmpfiles.org returned {response.status_code}",
+                response.status_code,
+                float(response.headers['Retry-After']) if response.headers.get('Retry-After', '').isdigit() else None
+            )
+        return response
+    
+    try:
+        with timed("upload"):
+            response = call_with_resilience("tmpfiles", post, retry=isinstance(audio, AudioBuffer))
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('status') == 'success':
+                # tmpfiles.org returns URL like: https://tmpfiles.org/12345
+                # We need to convert it to direct download: https://tmpfiles.org/dl/12345
+                url = data.get('data', {}).get('url', '')
+                if url:
+                    # Convert to direct download URL
+                    direct_url = url.replace('tmpfiles.org/', 'tmpfiles.org/dl/')
+                    return direct_url
+        return None
+    except Exception as e:
+        notices.warn(f"Audio upload failed: {str(e)}")
+        return None
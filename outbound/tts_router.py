@@ -0,0 +1,253 @@
+"""Adaptive choice between ElevenLabs audio and Twilio ``<Say>`` for ElevenLabs languages.
+
+Languages are mapped to a provider in ``LANGUAGES``; ElevenLabs languages
+used to fall back to Twilio's own voice only after synthesis had failed.
+The router decides before synthesis, for each message, template clip set
+or call, from what this process has observed:
+
+- audio already in the cache is always played (it is free and ready);
+- ElevenLabs is avoided while its synthesis latency (smoothed, or the age
+  of the oldest request still running) is above ``max_latency``, while its
+  error rate (429s, 5xx, network errors) is above ``max_error_rate``, or
+  while its circuit breaker is open;
+- uncached text is sent to Twilio once ElevenLabs spend over the last hour
+  would exceed ``hourly_budget``.
+
+Switching away and back has hysteresis: ElevenLabs is used again only once
+latency and error rate are ``hysteresis`` below their limits, and no sooner
+than ``hold`` seconds after the switch. Meanwhile a few probe requests
+still go to ElevenLabs, so its recovery is noticed. The policy ``fixed``
+keeps the table's provider; ``twilio`` always uses Twilio's voice.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .metrics import TTS_ROUTES
+from .resilience import classify, get_guard
+
+ELEVENLABS, TWILIO = "elevenlabs", "twilio"
+POLICIES = ("adaptive", "fixed", "twilio")
+# While ElevenLabs is avoided, this many probe requests per hold period still go to it
+_PROBES_PER_HOLD = 6
+_SPEND_WINDOW = 60 * 60
+
+
+class TtsRouter:
+    """Routes speech in ElevenLabs languages to ElevenLabs or Twilio ``<Say>`` (see module docs).
+
+    ``cost_per_character`` is what one synthesized character costs; with an
+    ``hourly_budget`` in the same unit, uncached speech that would exceed it
+    goes to Twilio. ``smoothing`` weighs each new observation in the
+    latency and error-rate averages; the error rate is trusted after
+    ``min_samples`` observations.
+    """
+
+    def __init__(self, policy="adaptive", max_latency=10.0, max_error_rate=0.5, hysteresis=0.25, hold=30.0,
+                 cost_per_character=0.0, hourly_budget=None, smoothing=0.2, min_samples=3):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown TTS routing policy {policy!r} (expected one of {', '.join(POLICIES)})")
+        self.policy = policy
+        self.max_latency = max_latency
+        self.max_error_rate = max_error_rate
+        self.hysteresis = hysteresis
+        self.hold = hold
+        self.cost_per_character = cost_per_character
+        self.hourly_budget = hourly_budget
+        self.smoothing = smoothing
+        self.min_samples = min_samples
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget what was observed and spent (requests in flight are still tracked)."""
+        with self._lock:
+            self.latency = None
+            self.error_rate = 0.0
+            self.samples = 0
+            self.degraded = None  # why ElevenLabs is avoided ("slow", "errors"), None while it is healthy
+            self.switches = 0
+            self._changed = 0.0
+            self._last_probe = 0.0
+            self._spend = deque()  # (time, cost) of synthesized characters
+            self._spent = 0.0
+
+    @contextmanager
+    def observe(self, characters):
+        """Time one ElevenLabs synthesis of ``characters`` characters.
+
+        ``with router.observe(len(text)) as outcome:`` wraps the request; set
+        ``outcome["cached"]`` when the audio came from the cache instead.
+        """
+        token = object()
+        outcome = {"cached": False}
+        with self._lock:
+            self._in_flight[token] = time.monotonic()
+        try:
+            yield outcome
+        except Exception as e:
+            self._finish(token, characters, e)
+            raise
+        except BaseException:
+            with self._lock:
+                self._in_flight.pop(token, None)
+            raise
+        else:
+            self._finish(token, None if outcome["cached"] else characters)
+
+    def _finish(self, token, characters, error=None):
+        with self._lock:
+            now = time.monotonic()
+            started = self._in_flight.pop(token, now)
+            if characters is None:
+                return
+            if error is None:
+                seconds = now - started
+                self.latency = seconds if self.latency is None else (
+                    self.latency + self.smoothing * (seconds - self.latency)
+                )
+                self.error_rate *= 1 - self.smoothing
+                cost = characters * self.cost_per_character
+                self._spend.append((now, cost))
+                self._spent += cost
+            elif classify(error).provider_fault:
+                self.error_rate += self.smoothing * (1 - self.error_rate)
+            else:
+                # A rejected request (bad voice, bad text) says nothing about the provider's health
+                return
+            self.samples += 1
+            self._update(now)
+
+    def _stuck_for(self, now):
+        """Age of the oldest synthesis still running (slowness shows before any request finishes)."""
+        oldest = min(self._in_flight.values(), default=None)
+        return now - oldest if oldest is not None else 0.0
+
+    def _update(self, now):
+        """Switch to or away from ElevenLabs, with hysteresis. Called with the lock held."""
+        if self.degraded is not None and now - self._changed < self.hold:
+            return
+        latency = max(self.latency or 0.0, self._stuck_for(now))
+        if self.degraded is None:
+            if latency > self.max_latency:
+                self.degraded = "slow"
+            elif self.samples >= self.min_samples and self.error_rate > self.max_error_rate:
+                self.degraded = "errors"
+            else:
+                return
+        else:
+            recovered = 1 - self.hysteresis
+            if latency > self.max_latency * recovered or self.error_rate > self.max_error_rate * recovered:
+                return
+            self.degraded = None
+        self._changed = now
+        self.switches += 1
+
+    def _spent_last_hour(self, now):
+        while self._spend and now - self._spend[0][0] > _SPEND_WINDOW:
+            self._spent -= self._spend.popleft()[1]
+        return max(0.0, self._spent)
+
+    def _over_budget(self, now, characters):
+        return self.hourly_budget is not None and (
+            self._spent_last_hour(now) + characters * self.cost_per_character > self.hourly_budget
+        )
+
+    def _route(self, characters):
+        """``(provider, reason)`` for speech of which ``characters`` are not cached yet."""
+        if self.policy == "fixed":
+            return ELEVENLABS, "policy"
+        if self.policy == TWILIO:
+            return TWILIO, "policy"
+        if not characters:
+            return ELEVENLABS, "cached"
+        if get_guard(ELEVENLABS).breaker.retry_in() > 0:
+            return TWILIO, "breaker"
+        with self._lock:
+            now = time.monotonic()
+            if self._over_budget(now, characters):
+                return TWILIO, "budget"
+            self._update(now)
+            if self.degraded is None:
+                return ELEVENLABS, "healthy"
+            if now - self._last_probe >= self.hold / _PROBES_PER_HOLD:
+                self._last_probe = now
+                return ELEVENLABS, "probe"
+            return TWILIO, self.degraded
+
+    def choose(self, characters):
+        """``"elevenlabs"`` or ``"twilio"`` for speech of which ``characters`` are not cached yet."""
+        provider, reason = self._route(characters)
+        TTS_ROUTES.inc(provider=provider, reason=reason)
+        return provider
+
+    def available(self, characters):
+        """Whether ElevenLabs would be chosen now, without using up a probe or counting a decision."""
+        if self.policy != "adaptive":
+            return self.policy == "fixed"
+        if get_guard(ELEVENLABS).breaker.retry_in() > 0:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if self._over_budget(now, characters):
+                return False
+            self._update(now)
+            return self.degraded is None
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "policy": self.policy,
+                "provider": TWILIO if self.policy == TWILIO or self.degraded else ELEVENLABS,
+                "degraded": self.degraded,
+                "latency": self.latency,
+                "error_rate": self.error_rate,
+                "in_flight": len(self._in_flight),
+                "switches": self.switches,
+                "spent_last_hour": self._spent_last_hour(now),
+                "hourly_budget": self.hourly_budget,
+            }
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_tts_router(settings=None):
+    """Process-wide ``TtsRouter`` for the current settings (shared by every campaign)."""
+    from .config import get_settings
+
+    settings = settings or get_settings()
+    key = (
+        settings.tts_routing, settings.tts_max_latency, settings.tts_max_error_rate,
+        settings.tts_route_hysteresis, settings.tts_route_hold,
+        settings.tts_cost_per_1k_characters / 1000, settings.tts_hourly_budget,
+    )
+    router = _routers.get(key)
+    if router is not None:
+        return router
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None:
+            router = TtsRouter(*key)
+            _routers[key] = router
+        return router
+
+
+def route_speech(texts, voice_id):
+    """``"elevenlabs"`` or ``"twilio"`` for speaking ``texts`` with the ElevenLabs voice ``voice_id``."""
+    from .tts import call_audio_cached
+
+    router = get_tts_router()
+    if router.policy != "adaptive":
+        return router.choose(0)
+    characters = sum(len(text) for text in texts if not call_audio_cached(text, voice_id))
+    return router.choose(characters)
+
+
+def tts_router_stats():
+    """Stats of the router for the current settings."""
+    return get_tts_router().stats()
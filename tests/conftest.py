@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def settings(tmp_path):
+    """Default settings with every store and cache in ``tmp_path``; restored afterwards."""
+    from outbound.config import Settings, configure, get_settings
+
+    previous = get_settings()
+    yield configure(
+        Settings(),
+        audio_cache_dir=str(tmp_path / "audio"),
+        translation_cache_path=str(tmp_path / "translations.sqlite3"),
+        job_store_path=str(tmp_path / "jobs.sqlite3"),
+        call_status_path=str(tmp_path / "calls.sqlite3"),
+    )
+    configure(previous)
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from outbound import tts
+from outbound.audio_buffer import AudioBuffer
+from outbound.config import configure
+
+
+def test_spilled_audio_goes_to_the_given_directory(tmp_path):
+    buffer = AudioBuffer(spill_threshold=4, spill_dir=str(tmp_path / "spill"))
+    buffer.write(b"abc")
+    assert not buffer.spilled
+    buffer.write(b"defg")
+    buffer.close()
+    assert buffer.spilled and os.path.dirname(buffer.path) == str(tmp_path / "spill")
+    assert buffer.getvalue() == b"abcdefg"
+
+
+def test_discard_deletes_the_spill_file(tmp_path):
+    buffer = AudioBuffer(spill_threshold=2, spill_dir=str(tmp_path))
+    buffer.write(b"abcdef")
+    path = buffer.path
+    buffer.discard()
+    assert not os.path.exists(path) and not buffer.spilled and buffer.closed
+
+
+def test_failed_stream_leaves_no_spill_file(settings, monkeypatch):
+    pytest.importorskip("elevenlabs")
+
+    def broken_stream():
+        yield b"x" * 64
+        raise ConnectionError("stream reset")
+
+    class TextToSpeech:
+        def convert(self, **kwargs):
+            return broken_stream()
+
+    class Client:
+        text_to_speech = TextToSpeech()
+
+    settings = configure(settings, audio_spill_threshold=16)
+    monkeypatch.setattr(tts, "get_elevenlabs_client", lambda api_key, base_url: Client())
+    cache_key, buffer, chunks, errors = tts.open_elevenlabs_stream("Hello", "voice")
+    with pytest.raises(ConnectionError):
+        tts.finish_elevenlabs_stream(cache_key, buffer, chunks, errors)
+    assert not buffer.spilled
+    assert [name for name in os.listdir(settings.audio_cache_dir) if not name.startswith("index.")] == []
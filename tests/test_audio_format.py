@@ -0,0 +1,84 @@
+import math
+import struct
+
+import pytest
+
+from outbound import audio_format
+from outbound.audio_format import (
+    FORMATS,
+    get_format,
+    join_wav,
+    loudness_dbfs,
+    pcm_sample_rate,
+    preview_wav,
+    read_wav,
+    transcode_pcm,
+    wav_bytes,
+)
+
+
+def tone(rate, seconds=0.1, amplitude=3000, frequency=440):
+    count = int(rate * seconds)
+    return struct.pack(
+        f"<{count}h", *(int(amplitude * math.sin(2 * math.pi * frequency * i / rate)) for i in range(count))
+    )
+
+
+@pytest.fixture(params=["audioop", "pure-python"])
+def backend(request, monkeypatch):
+    if request.param == "pure-python":
+        monkeypatch.setattr(audio_format, "_audioop", None)
+    elif audio_format._audioop is None:
+        pytest.skip("audioop is not available")
+    return request.param
+
+
+def test_format_names():
+    assert get_format("wav_ulaw_8000").sample_rate == 8000
+    assert not get_format("mp3").transcoded
+    with pytest.raises(ValueError):
+        get_format("ogg")
+    assert pcm_sample_rate("pcm_16000") == 16000
+    with pytest.raises(ValueError):
+        pcm_sample_rate("mp3_44100_128")
+
+
+def test_wav_round_trip():
+    for encoding in ("pcm16", "ulaw"):
+        data = wav_bytes(b"\x01\x02\x03", 8000, encoding)
+        assert read_wav(data) == (b"\x01\x02\x03", 8000, encoding)
+    joined = join_wav([wav_bytes(b"\x01\x02", 8000), wav_bytes(b"\x03\x04", 8000)])
+    assert read_wav(joined) == (b"\x01\x02\x03\x04", 8000, "pcm16")
+    with pytest.raises(ValueError):
+        join_wav([wav_bytes(b"\x01\x02", 8000), wav_bytes(b"\x01", 8000, "ulaw")])
+
+
+def test_fallbacks_match_audioop():
+    if audio_format._audioop is None:
+        pytest.skip("audioop is not available")
+    pcm = tone(16000) + struct.pack("<4h", 32767, -32768, 0, -1)
+    fast = {
+        "ulaw": audio_format.lin2ulaw(pcm),
+        "decoded": audio_format.ulaw2lin(audio_format.lin2ulaw(pcm)),
+    }
+    saved, audio_format._audioop = audio_format._audioop, None
+    try:
+        assert audio_format.lin2ulaw(pcm) == fast["ulaw"]
+        assert audio_format.ulaw2lin(fast["ulaw"]) == fast["decoded"]
+    finally:
+        audio_format._audioop = saved
+
+
+def test_transcode_to_telephony_ulaw(backend):
+    data = transcode_pcm(tone(16000), 16000, FORMATS["wav_ulaw_8000"], loudness_target=-20)
+    frames, rate, encoding = read_wav(data)
+    assert (rate, encoding, len(frames)) == (8000, "ulaw", 800)
+    decoded, _, _ = read_wav(preview_wav(data))
+    assert loudness_dbfs(decoded) == pytest.approx(-20, abs=0.5)
+
+
+def test_loudness_is_capped_below_full_scale(backend):
+    pcm = tone(8000, amplitude=200) + struct.pack("<h", 20000)
+    normalized = audio_format.normalize_loudness(pcm, target_dbfs=-3)
+    assert max(map(abs, struct.unpack(f"<{len(normalized) // 2}h", normalized))) <= 32767 * 10 ** (-1 / 20) + 1
+    assert audio_format.normalize_loudness(bytes(160), -20) == bytes(160)
@@ -0,0 +1,63 @@
+import asyncio
+import types
+
+from outbound.call_status import (
+    CallStatusStore,
+    make_status_handler,
+    reconcile_calls,
+    status_event,
+    twilio_signature,
+)
+
+
+def test_a_status_never_replaces_a_later_one(tmp_path):
+    store = CallStatusStore(str(tmp_path / "calls.sqlite3"))
+    store.start_campaign("c1", "+15550000000")
+    store.record_calls("c1", [("CA1", "+911", "hi-IN", "queued"), ("CA2", "+912", "hi-IN", "queued")])
+
+    store.apply_events([("CA1", "completed", 42), ("CA1", "ringing", None), ("CA2", "ringing", None)])
+    assert store.call_statuses("c1") == {"CA1": "completed", "CA2": "ringing"}
+    assert store.pending_sids("c1") == {"CA2"}
+    counts = store.outcome_counts("c1")
+    assert counts["answered"] == 1 and counts["pending"] == 1 and counts["total"] == 2
+
+
+def test_a_callback_can_beat_the_registration(tmp_path):
+    store = CallStatusStore(str(tmp_path / "calls.sqlite3"))
+    store.apply_events([("CA1", "busy", None)])
+    store.record_calls("c1", [("CA1", "+911", "hi-IN", "queued")])
+    assert store.call_statuses("c1") == {"CA1": "busy"}
+
+
+def test_status_callbacks_are_checked_against_the_twilio_signature(tmp_path):
+    store = CallStatusStore(str(tmp_path / "calls.sqlite3"))
+    store.record_calls("c1", [("CA1", "+911", "hi-IN", "queued")])
+    handle = make_status_handler(store, "https://media.example/", auth_token="secret")
+    params = {"CallSid": "CA1", "CallStatus": "no-answer"}
+    body = b"CallSid=CA1&CallStatus=no-answer"
+    signature = twilio_signature("secret", "https://media.example/twilio/status", params)
+
+    assert asyncio.run(handle({"x-twilio-signature": "forged"}, body))[0] == 403
+    assert store.call_statuses("c1") == {"CA1": "queued"}
+    assert asyncio.run(handle({"x-twilio-signature": signature}, body))[0] == 204
+    assert store.call_statuses("c1") == {"CA1": "no-answer"}
+    assert status_event({"CallSid": "CA1", "CallStatus": "completed", "CallDuration": "7"}) == ("CA1", "completed", 7)
+
+
+def test_reconcile_stops_paging_once_nothing_is_pending(tmp_path):
+    store = CallStatusStore(str(tmp_path / "calls.sqlite3"))
+    store.start_campaign("c1", "+15550000000")
+    store.record_calls("c1", [("CA1", "+911", "hi-IN", "queued"), ("CA2", "+912", "hi-IN", "queued")])
+    listed = []
+
+    def stream(page_size, **filters):
+        assert filters["from_"] == "+15550000000"
+        for sid, status in [("CA9", "completed"), ("CA2", "failed"), ("CA1", "completed"), ("CA8", "busy")]:
+            listed.append(sid)
+            yield types.SimpleNamespace(sid=sid, status=status, duration="3")
+
+    client = types.SimpleNamespace(calls=types.SimpleNamespace(stream=stream))
+    assert reconcile_calls(store, "c1", client, page_size=1) == 2
+    assert listed == ["CA9", "CA2", "CA1"]
+    assert store.call_statuses("c1") == {"CA1": "completed", "CA2": "failed"}
+    assert reconcile_calls(store, "c1", client) == 0
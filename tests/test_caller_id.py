@@ -0,0 +1,87 @@
+import pytest
+
+from outbound.caller_id import CallerIdPool, parse_numbers
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+def test_parse_numbers_splits_and_drops_duplicates():
+    assert parse_numbers("+15550000001, +15550000002 +15550000001") == ("+15550000001", "+15550000002")
+    assert parse_numbers(None) == ()
+    with pytest.raises(ValueError):
+        CallerIdPool("")
+
+
+def test_calls_go_to_the_least_loaded_number():
+    pool = CallerIdPool(["+15550000001", "+15550000002"], calls_per_second=0)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first, second} == {"+15550000001", "+15550000002"}
+    pool.release(first)
+    assert pool.acquire() == first  # no call in flight on it any more
+
+
+def test_affinity_keeps_a_recipient_on_one_number():
+    numbers = [f"+1555000000{index}" for index in range(4)]
+    pool = CallerIdPool(numbers, calls_per_second=0, affinity=True)
+    recipients = [f"+9100000{index:05d}" for index in range(200)]
+    chosen = {to: pool.acquire(to) for to in recipients}
+    assert all(pool.acquire(to) == number for to, number in chosen.items())
+    assert len(set(chosen.values())) == 4
+
+    # Adding a number only moves the recipients it takes over
+    grown = CallerIdPool(numbers + ["+15550000009"], calls_per_second=0, affinity=True)
+    moved = [to for to in recipients if grown.preferred(to) != chosen[to]]
+    assert moved and all(grown.preferred(to) == "+15550000009" for to in moved)
+
+
+def test_numbers_rest_after_repeated_sender_faults():
+    pool = CallerIdPool(["+15550000001", "+15550000002"], calls_per_second=0, affinity=True,
+                        failure_threshold=2, cooldown=60)
+    to = "+910000000001"
+    preferred = pool.preferred(to)
+    other = next(number for number in pool.numbers if number != preferred)
+    for _ in range(2):
+        assert pool.acquire(to) == preferred
+        pool.release(preferred, Throttled())
+    assert pool.acquire(to) == other
+    assert pool.stats()[preferred]["resting_for"] > 0
+
+    # Errors about the dialed number do not count against the sender
+    pool.release(other, ValueError("invalid 'To' number"))
+    assert pool.stats()[other]["resting_for"] == 0
+
+
+def test_when_every_number_rests_the_longest_rested_is_used():
+    pool = CallerIdPool(["+15550000001", "+15550000002"], calls_per_second=0, failure_threshold=1, cooldown=60)
+    pool.acquire()
+    pool.release("+15550000001", Throttled())
+    pool.acquire()
+    pool.release("+15550000002", Throttled())
+    assert pool.acquire() == "+15550000001"
+
+
+def test_each_number_has_its_own_rate():
+    pool = CallerIdPool(["+15550000001", "+15550000002"], calls_per_second=1)
+    assert {pool.acquire(), pool.acquire()} == {"+15550000001", "+15550000002"}
+    assert all(sender.bucket.wait_time() > 0 for sender in pool._senders.values())
+
+
+def test_buckets_are_asked_outside_the_pool_lock():
+    pool = CallerIdPool(["+15550000001", "+15550000002"], calls_per_second=0)
+
+    class Bucket:
+        # Stands in for a SharedTokenBucket, whose every call is a SQLite transaction
+        def wait_time(self):
+            assert not pool._lock.locked()
+            return 0.0
+
+        def try_acquire(self):
+            assert not pool._lock.locked()
+            return 0.0
+
+    for sender in pool._senders.values():
+        sender.bucket = Bucket()
+    assert pool.acquire() in pool.numbers
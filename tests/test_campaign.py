@@ -0,0 +1,54 @@
+import threading
+
+from outbound.campaign import group_by_language, prepare_variants
+
+
+def test_recipients_are_grouped_by_preferred_language():
+    recipients = [("+911", None), ("+912", "hi-IN"), ("+913", "en-IN"), ("+914", "hi-IN")]
+    assert group_by_language(recipients, "en-IN") == {"en-IN": ["+911", "+913"], "hi-IN": ["+912", "+914"]}
+
+
+def test_each_language_is_prepared_once():
+    prepared = []
+
+    def prepare(code):
+        prepared.append(code)
+        return f"<{code}>"
+
+    assert prepare_variants(["hi-IN", "en-IN", "hi-IN"], prepare) == {"hi-IN": "<hi-IN>", "en-IN": "<en-IN>"}
+    assert sorted(prepared) == ["en-IN", "hi-IN"]
+    assert prepare_variants([], prepare) == {}
+
+
+def test_languages_are_prepared_concurrently():
+    # Only passes if all three preparations are in flight at once
+    barrier = threading.Barrier(3, timeout=5)
+
+    def prepare(code):
+        barrier.wait()
+        return code
+
+    assert prepare_variants(["hi-IN", "ta-IN", "en-IN"], prepare, max_workers=3) == {
+        "hi-IN": "hi-IN", "ta-IN": "ta-IN", "en-IN": "en-IN"
+    }
+
+
+def test_a_failing_language_does_not_sink_the_others():
+    def prepare(code):
+        if code == "ta-IN":
+            raise RuntimeError("no voice")
+        return code
+
+    variants = prepare_variants(["ta-IN", "hi-IN"], prepare)
+    assert variants["hi-IN"] == "hi-IN"
+    assert isinstance(variants["ta-IN"], RuntimeError)
+
+
+def test_workers_run_the_initializer():
+    local = threading.local()
+
+    def prepare(code):
+        return getattr(local, "ready", False)
+
+    variants = prepare_variants(["hi-IN", "ta-IN"], prepare, initializer=lambda: setattr(local, "ready", True))
+    assert variants == {"hi-IN": True, "ta-IN": True}
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("twilio")
+
+import requests
+
+from outbound.clients import _rebase_url, get_pool_config, get_twilio_client
+
+
+def test_rebase_url_keeps_path_and_query():
+    assert _rebase_url("https://api.twilio.com/2010-04-01/Calls.json?x=1", "http://127.0.0.1:9000/twilio/") == (
+        "http://127.0.0.1:9000/twilio/2010-04-01/Calls.json?x=1"
+    )
+
+
+def test_twilio_client_replaces_and_closes_its_own_session(monkeypatch):
+    closed = []
+    close = requests.Session.close
+    monkeypatch.setattr(requests.Session, "close", lambda session: closed.append(session) or close(session))
+
+    client = get_twilio_client("AC-test-session", "token", "http://127.0.0.1:9")
+    session = client.http_client.session
+    assert session not in closed and len(closed) == 1
+    assert session.get_adapter("https://api.twilio.com")._pool_maxsize == get_pool_config().pool_maxsize
+    assert get_twilio_client("AC-test-session", "token", "http://127.0.0.1:9") is client
@@ -0,0 +1,101 @@
+import types
+
+import pytest
+
+from outbound import dispatch
+from outbound.dispatch import SharedTokenBucket, TokenBucket, dispatch_calls, token_bucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    fake_time = types.SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now, sleep=clock.sleep)
+    monkeypatch.setattr(dispatch, "time", fake_time)
+    return clock
+
+
+def test_token_bucket_starts_full_and_refills_at_its_rate(clock):
+    bucket = TokenBucket(2, capacity=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    assert bucket.wait_time() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert bucket.try_acquire() == 0.0
+    clock.now += 100
+    assert bucket.wait_time(3) == 0.0
+    assert bucket.wait_time(4) == pytest.approx(0.5)  # never holds more than its capacity
+
+
+def test_token_bucket_acquire_waits_for_a_token(clock):
+    bucket = TokenBucket(4)
+    for _ in range(4):
+        bucket.acquire()
+    started = clock.now
+    bucket.acquire()
+    assert clock.now - started == pytest.approx(0.25)
+
+
+def test_token_bucket_rejects_a_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+    assert token_bucket(0, "dispatch") is None
+    assert isinstance(token_bucket(5, "dispatch"), TokenBucket)
+
+
+def test_shared_token_bucket_is_one_rate_for_every_instance(clock, tmp_path):
+    path = str(tmp_path / "rate.sqlite3")
+    first = SharedTokenBucket(path, "dispatch", 2, capacity=2)
+    second = SharedTokenBucket(path, "dispatch", 2, capacity=2)
+    other = SharedTokenBucket(path, "other", 2, capacity=2)
+
+    assert first.try_acquire() == 0.0
+    assert second.try_acquire() == 0.0
+    assert first.try_acquire() == pytest.approx(0.5)
+    assert second.wait_time() == pytest.approx(0.5)
+    assert other.try_acquire() == 0.0  # buckets are separate per name
+
+    clock.now += 0.5
+    assert second.try_acquire() == 0.0
+    assert first.try_acquire() == pytest.approx(0.5)
+    clock.now += 60
+    assert first.wait_time(2) == 0.0
+    assert first.wait_time(3) == pytest.approx(0.5)
+
+
+def test_token_bucket_is_shared_given_a_path(tmp_path):
+    assert isinstance(token_bucket(5, "dispatch", str(tmp_path / "rate.sqlite3")), SharedTokenBucket)
+
+
+def test_dispatch_calls_keeps_recipient_order():
+    results = dispatch_calls(
+        [(f"+1555000{index}", index) for index in range(6)],
+        lambda index: {"success": True, "sid": f"CA{index}"},
+        calls_per_second=None,
+        max_workers=3,
+    )
+    assert [entry["result"]["sid"] for entry in results] == [f"CA{index}" for index in range(6)]
+
+
+def test_dispatch_calls_turns_errors_into_failed_results():
+    progress = []
+
+    def send_call(index):
+        if index == 1:
+            raise RuntimeError("busy")
+        return {"success": True}
+
+    results = dispatch_calls(
+        [("+15550000", 0), ("+15550001", 1)], send_call, calls_per_second=None,
+        on_progress=lambda done, total, number: progress.append((done, total)),
+    )
+    assert results[1] == {"number": "+15550001", "result": {"success": False, "error": "busy"}}
+    assert sorted(progress) == [(1, 2), (2, 2)]
@@ -0,0 +1,133 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("twilio")
+
+from outbound import campaign
+from outbound.jobs import DONE, FAILED, IN_FLIGHT, PENDING, SENT, JobStore, run_job
+from outbound.recipients import Recipient
+
+
+def test_job_keeps_the_reviewed_text_and_builds_twiml_when_it_runs(settings, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job(
+        [Recipient("+15550000001", "en-US"), Recipient("+15550000002", "en-US")],
+        "Your payment is due.", "en-US", translated={"en-US": "Reviewed: your payment is due."},
+    )
+    assert store.get_job(job_id)["translated"] == {"en-US": "Reviewed: your payment is due."}
+
+    sent = []
+
+    def send_call(number, twiml):
+        sent.append(twiml)
+        return {"success": True, "sid": f"CA{len(sent)}", "status": "queued"}
+
+    assert run_job(store, job_id, send_call=send_call) == DONE
+    assert len(sent) == 2
+    assert all("Reviewed: your payment is due." in twiml for twiml in sent)
+
+
+def test_store_from_before_translations_ignores_its_stored_twiml(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, state TEXT NOT NULL, message TEXT NOT NULL,"
+        " default_language TEXT NOT NULL, prepared TEXT, total INTEGER NOT NULL, created REAL NOT NULL,"
+        " updated REAL NOT NULL)"
+    )
+    db.execute(
+        "INSERT INTO jobs VALUES ('old', 'paused', 'Hello', 'en-US',"
+        " '{\"en-US\": \"<Response><Play>https://expired</Play></Response>\"}', 0, 0, 0)"
+    )
+    db.commit()
+    db.close()
+
+    assert JobStore(path).get_job("old")["translated"] == {}
+
+
+def make_job(store, languages):
+    recipients = [Recipient(f"+1555000{index:04d}", language) for index, language in enumerate(languages)]
+    return store.create_job(recipients, "Hello", "en-US")
+
+
+def test_claim_marks_rows_in_flight_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = make_job(store, ["en-US"] * 5)
+
+    first = store.claim(job_id, 3, "host:1:a")
+    second = store.claim(job_id, 3, "host:1:b")
+    assert [position for position, _, _ in first] == [0, 1, 2]
+    assert [position for position, _, _ in second] == [3, 4]
+    assert store.claim(job_id, 3, "host:1:c") == []
+    assert store.counts(job_id)[IN_FLIGHT] == 5
+
+
+def test_checkpoint_records_outcomes(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = make_job(store, ["en-US"] * 3)
+    store.claim(job_id, 3, "host:1:a")
+
+    store.checkpoint(job_id, [(0, SENT, "CA0", None), (1, FAILED, None, "busy"), (2, PENDING, None, None)])
+    assert store.counts(job_id) == {PENDING: 1, IN_FLIGHT: 0, SENT: 1, FAILED: 1}
+    results = store.results(job_id)
+    assert results[0]["result"]["sid"] == "CA0"
+    assert results[1]["result"]["error"] == "busy"
+
+
+def test_recover_settles_only_dead_workers_rows(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = make_job(store, ["en-US"] * 4)
+    store.register_worker("elsewhere:1:live", job_id)
+    store.claim(job_id, 2, "elsewhere:1:live")
+    dead = store.claim(job_id, 2, "elsewhere:1:dead")  # never registered: no heartbeat
+
+    placed = {dead[0][2].number: "CA1"}
+    assert store.recover(job_id, placed) == (1, 1)
+    assert store.counts(job_id) == {PENDING: 1, IN_FLIGHT: 2, SENT: 1, FAILED: 0}
+    assert store.results(job_id)[dead[0][0]]["result"]["sid"] == "CA1"
+
+
+def test_rows_requeued_mid_run_are_dialed_in_their_language(settings, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = make_job(store, ["fr-FR", "fr-FR", "de-DE"])
+    # A peer took the French rows, then dies while this worker dials the rest
+    store.register_worker("elsewhere:1:peer", job_id)
+    store.claim(job_id, 2, "elsewhere:1:peer")
+    sent = []
+
+    def send_call(number, twiml):
+        store.unregister_worker("elsewhere:1:peer")
+        sent.append(number)
+        return {"success": True, "sid": f"CA{len(sent)}", "status": "queued"}
+
+    assert run_job(store, job_id, send_call=send_call) == DONE
+    assert store.counts(job_id)[SENT] == 3
+    assert sorted(sent) == sorted(r["number"] for r in store.results(job_id))
+
+
+def test_long_runs_prepare_again_once_the_audio_urls_age(settings, tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    recipients = [Recipient(f"+1555000{index:04d}", "en-US") for index in range(3)]
+    job_id = store.create_job(recipients, "Hello", "en-US", translated={"en-US": "Hello"})
+    prepare_campaign = campaign.prepare_campaign
+    prepared = []
+
+    def counting_prepare_campaign(*args, **kwargs):
+        prepared.append(kwargs["prepared"])
+        return prepare_campaign(*args, **kwargs)
+
+    monkeypatch.setattr(campaign, "prepare_campaign", counting_prepare_campaign)
+
+    def send_call(number, twiml):
+        return {"success": True, "sid": f"CA{number}", "status": "queued"}
+
+    caller_twiml = {"en-US": "<Response><Say>Hello</Say></Response>"}
+    assert run_job(store, job_id, send_call=send_call, batch_size=1, prepared=caller_twiml, max_age=0) == DONE
+    # Once at the start, then before every batch; only the first uses the caller's TwiML
+    assert prepared == [caller_twiml, None, None, None]
+
+    job_id = store.create_job(recipients, "Hello", "en-US", translated={"en-US": "Hello"})
+    prepared.clear()
+    assert run_job(store, job_id, send_call=send_call, batch_size=1) == DONE
+    assert len(prepared) == 1
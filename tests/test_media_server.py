@@ -0,0 +1,148 @@
+import http.client
+import os
+import socket
+import time
+
+import pytest
+
+from outbound.media_server import MediaServer, parse_range, sign_media_path, signed_media_url
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-3", (0, 3)),
+    ("bytes=4-", (4, 9)),
+    ("bytes=-3", (7, 9)),
+    ("bytes=5-100", (5, 9)),
+    ("bytes=-100", (0, 9)),
+    ("bytes=10-", False),
+    ("bytes=5-2", False),
+    ("bytes=-0", False),
+    ("bytes=0-1,3-4", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 10) == expected
+
+
+def test_signed_url_carries_expiry_and_signature():
+    url = signed_media_url("https://calls.example/", "secret", "clip.mp3", ttl=60)
+    path, _, query = url.partition("?")
+    assert path == "https://calls.example/media/clip.mp3"
+    params = dict(part.split("=") for part in query.split("&"))
+    assert int(params["exp"]) == pytest.approx(time.time() + 60, abs=2)
+    assert params["sig"] == sign_media_path(b"secret", "clip.mp3", params["exp"])
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = MediaServer(host="127.0.0.1", port=0, secret="secret", fallback_dir=str(tmp_path),
+                         max_open_maps=2, max_body_bytes=16).start()
+    yield server
+    server.stop()
+
+
+def fetch(server, target, method="GET", headers=None, body=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    connection.request(method, target, body=body, headers=headers or {})
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def media_target(server, key, ttl=60):
+    return server.signed_url(key, ttl)[len(server.public_base_url):]
+
+
+def fetch_headers(server, target, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    connection.request("GET", target, headers=headers or {})
+    response = connection.getresponse()
+    response.read()
+    return response.status, dict(response.getheaders())
+
+
+def test_serves_signed_urls_only(server):
+    key = server.publish("clip", data=b"0123456789")
+    assert fetch(server, media_target(server, key)) == (200, b"0123456789")
+    assert fetch(server, media_target(server, key), headers={"Range": "bytes=2-4"}) == (206, b"234")
+    assert fetch(server, media_target(server, key, ttl=-10))[0] == 403
+    assert fetch(server, f"/media/{key}?exp={int(time.time()) + 60}&sig=forged")[0] == 403
+    assert fetch(server, f"/media/{key}")[0] == 403
+
+
+def test_etags_answer_conditional_requests(server):
+    key = server.publish("clip", data=b"0123456789")
+    target = media_target(server, key)
+    status, headers = fetch_headers(server, target)
+    assert status == 200 and headers["ETag"] == f'"{key}"' and "immutable" in headers["Cache-Control"]
+    assert fetch(server, target, headers={"If-None-Match": headers["ETag"]}) == (304, b"")
+    # A range of another version of the file gets the whole file
+    assert fetch(server, target, headers={"Range": "bytes=0-1", "If-Range": '"older"'}) == (200, b"0123456789")
+    assert fetch(server, target, headers={"Range": "bytes=0-1", "If-Range": headers["ETag"]}) == (206, b"01")
+    assert fetch(server, target, headers={"Range": "bytes=20-"})[0] == 416
+    assert fetch(server, target, method="HEAD") == (200, b"")
+
+
+def test_serves_published_files_and_the_fallback_directory(server, tmp_path):
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    (elsewhere / "a.mp3").write_bytes(b"published")
+    key = server.publish("a", path=str(elsewhere / "a.mp3"))
+    assert fetch(server, media_target(server, key)) == (200, b"published")
+    (tmp_path / "cached.mp3").write_bytes(b"from the cache")
+    assert fetch(server, media_target(server, "cached.mp3")) == (200, b"from the cache")
+    assert fetch(server, media_target(server, "missing.mp3"))[0] == 404
+
+
+def test_rejects_bad_and_oversized_bodies(server):
+    async def echo(headers, body):
+        return 200, {}, body
+
+    server.add_route("POST", "/hook", echo)
+    assert fetch(server, "/hook", "POST", body=b"small") == (200, b"small")
+    assert fetch(server, "/hook", "POST", body=b"x" * 17)[0] == 413
+
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        sock.sendall(b"POST /hook HTTP/1.1\r\nHost: x\r\nContent-Length: nope\r\n\r\n")
+        assert sock.recv(1024).startswith(b"HTTP/1.1 400")
+
+
+def test_start_raises_when_the_port_is_taken(server):
+    with pytest.raises(OSError):
+        MediaServer(host="127.0.0.1", port=server.port).start()
+
+
+def test_open_maps_are_bounded_and_closed(server, tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.mp3").write_bytes(name.encode() * 4)
+        server.publish(name, path=str(tmp_path / f"{name}.mp3"))
+    first = server._resolve("a.mp3")[0].obj
+    server._resolve("b.mp3")
+    server._resolve("c.mp3")
+    assert list(server._maps) == ["b.mp3", "c.mp3"]
+    assert first.closed
+
+    # A replaced file is mapped again and its stale map closed
+    stale = server._maps["b.mp3"][2]
+    path = tmp_path / "b.mp3"
+    path.write_bytes(b"new contents")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    assert bytes(server._resolve("b.mp3")[0]) == b"new contents"
+    assert stale.closed
+
+
+def test_published_paths_are_bounded(tmp_path):
+    server = MediaServer(host="127.0.0.1", port=0, secret="secret", fallback_dir=str(tmp_path / "cache"), max_paths=2)
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    for name in ("a", "b", "c"):
+        (elsewhere / f"{name}.mp3").write_bytes(name.encode())
+        server.publish(name, path=str(elsewhere / f"{name}.mp3"))
+    assert list(server._paths) == ["b.mp3", "c.mp3"]
+    assert server._resolve("a.mp3") is None
+
+    # Serving a path keeps it; the least recently served one is forgotten first
+    assert bytes(server._resolve("b.mp3")[0]) == b"b"
+    server.publish("d", path=str(elsewhere / "a.mp3"))
+    assert list(server._paths) == ["b.mp3", "d.mp3"]
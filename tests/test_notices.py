@@ -0,0 +1,20 @@
+import logging
+import threading
+
+from outbound import notices
+
+
+def test_handlers_apply_to_the_thread_that_set_them(caplog):
+    shown = []
+    notices.set_handlers(warning=shown.append, error=shown.append)
+    try:
+        notices.warn("on the page")
+        worker = threading.Thread(target=notices.warn, args=("in the background",))
+        with caplog.at_level(logging.WARNING, logger="outbound"):
+            worker.start()
+            worker.join()
+    finally:
+        notices.set_handlers(warning=notices.logger.warning, error=notices.logger.error)
+
+    assert shown == ["on the page"]
+    assert [record.getMessage() for record in caplog.records] == ["in the background"]
@@ -0,0 +1,60 @@
+from outbound import personalize
+from outbound.languages import LANGUAGES_BY_CODE
+from outbound.personalize import PersonalizedMessage
+from outbound.recipients import Recipient
+
+TWILIO_HINDI = {**LANGUAGES_BY_CODE["hi-IN"], "provider": "twilio", "voice": None}
+
+
+def test_slot_values_are_kept_except_calendar_words(settings, monkeypatch):
+    translated = []
+
+    def translate(text, code):
+        translated.append(text)
+        return {"November": "नवंबर", "Monday": "सोमवार"}.get(text, text)
+
+    monkeypatch.setattr(personalize, "translate_text_groq", translate)
+    message = PersonalizedMessage("Dear {name}, pay {amount} by {due_date}.", TWILIO_HINDI)
+    translated.clear()
+
+    april = Recipient("+910000000001", name="April Mayfield", amount="Rs 500", due_date="Mon, 15th Nov 2025")
+    assert message.text_for(april) == "Dear April Mayfield, pay Rs 500 by सोमवार, 15th नवंबर 2025."
+    assert sorted(translated) == ["Monday", "November"]
+
+    # Calendar words are translated once per language, however many recipients use them
+    other = Recipient("+910000000002", name="Ravi", amount="Rs 900", due_date="1 November 2025")
+    assert message.text_for(other) == "Dear Ravi, pay Rs 900 by 1 नवंबर 2025."
+    assert sorted(translated) == ["Monday", "November"]
+
+
+def test_sequence_clips_are_published_again_before_their_urls_expire(settings, monkeypatch):
+    now = [1000.0]
+    published = []
+    routed = []
+
+    def publish(cache_key, buffer):
+        published.append(cache_key)
+        return f"https://media.example/{len(published)}"
+
+    def route(texts, voice_id):
+        routed.append(list(texts))
+        return "elevenlabs"
+
+    monkeypatch.setattr(personalize, "translate_text_groq", lambda text, code: text)
+    monkeypatch.setattr(personalize, "generate_elevenlabs_tts", lambda text, voice_id: object())
+    monkeypatch.setattr(personalize, "publish_buffer", publish)
+    monkeypatch.setattr(personalize, "route_speech", route)
+    monkeypatch.setattr(personalize.time, "time", lambda: now[0])
+    message = PersonalizedMessage("Dear {name}, your payment is due.", LANGUAGES_BY_CODE["en-IN"])
+    assert len(published) == 2  # the static segments, prepared up front
+
+    ravi = Recipient("+910000000003", name="Ravi")
+    first = message.twiml_for(ravi)
+    assert len(published) == 3 and routed[-1] == ["Ravi"]
+    assert message.twiml_for(ravi) == first and len(published) == 3
+
+    now[0] += personalize.PUBLISHED_URL_TTL
+    routed.clear()
+    second = message.twiml_for(ravi)
+    assert len(published) == 6 and routed == [["Dear ", "Ravi", ", your payment is due."]]
+    assert "https://media.example/1" not in second and "https://media.example/6" in second
@@ -0,0 +1,52 @@
+import pytest
+
+from outbound.phone_numbers import PrefixTrie, country_code_of, normalize_number, normalize_numbers
+
+
+@pytest.mark.parametrize("raw, default, expected", [
+    ("98765 43210", "+91", "+919876543210"),
+    ("098765-43210", "+91", "+919876543210"),
+    ("919876543210", "+91", "+919876543210"),
+    ("+91 98765 43210", "+1", "+919876543210"),
+    ("0091 9876543210", "+1", "+919876543210"),
+    (9876543210.0, "+91", "+919876543210"),
+    ("9876543210.0", "+91", "+919876543210"),
+    ("(415) 555-0100", "+1", "+14155550100"),
+    ("1 415 555 0100", "+1", "+14155550100"),
+    ("+44 (0)20 7946 0958", "+91", "+442079460958"),
+    ("020 7946 0958", "+44", "+442079460958"),
+    ("+380 44 123 4567", "+91", "+380441234567"),  # no rule: general E.164 limits
+])
+def test_normalize_number(raw, default, expected):
+    assert normalize_number(raw, default) == expected
+
+
+@pytest.mark.parametrize("raw, default", [
+    (None, "+91"),
+    ("", "+91"),
+    ("98765", "+91"),
+    ("98765432101", "+91"),
+    ("+91 98765", "+91"),
+    ("call me", "+91"),
+    ("٩٨٧٦٥٤٣٢١٠", "+91"),  # non-ASCII digits
+    ("+1234567890123456", "+91"),
+])
+def test_normalize_number_rejects(raw, default):
+    assert normalize_number(raw, default) is None
+
+
+def test_normalize_numbers_uses_per_number_country_codes():
+    assert normalize_numbers(["9876543210", "4155550100", "bad"], "+91", [None, "+1", "+1"]) == [
+        "+919876543210", "+14155550100", None,
+    ]
+
+
+def test_prefix_trie_finds_the_longest_prefix():
+    trie = PrefixTrie([("9", "a"), ("97", "b"), ("971", "c")])
+    assert trie.longest_match("97150") == ("971", "c")
+    assert trie.longest_match("9650") == ("9", "a")
+    assert trie.longest_match("1") is None
+
+
+def test_country_code_of():
+    assert [country_code_of(raw) for raw in (91, 91.0, "+91", "IN +91", " ")] == ["+91"] * 4 + [None]
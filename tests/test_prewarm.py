@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("twilio")
+
+from outbound import prewarm
+from outbound.languages import LANGUAGES_BY_CODE
+from outbound.prewarm import READY, Prewarmer
+
+ENGLISH = LANGUAGES_BY_CODE["en-US"]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def ready(prewarmer, key):
+    status = prewarmer.status(key)
+    return status is not None and status.state == READY
+
+
+def test_sessions_do_not_supersede_each_other(monkeypatch):
+    translated = []
+    monkeypatch.setattr(prewarm, "translate_text_groq", lambda message, code: translated.append(message))
+    prewarmer = Prewarmer(debounce=0.05)
+
+    first = prewarmer.request("Hello", "Hello", ENGLISH, session="a")
+    second = prewarmer.request("Bonjour", "Bonjour", ENGLISH, session="b")
+    wait_for(lambda: ready(prewarmer, first) and ready(prewarmer, second))
+    assert sorted(translated) == ["Bonjour", "Hello"]
+    assert "Hello" in prewarmer.twiml(first)
+
+
+def test_newer_request_of_a_session_drops_its_waiting_one(monkeypatch):
+    translated = []
+    monkeypatch.setattr(prewarm, "translate_text_groq", lambda message, code: translated.append(message))
+    prewarmer = Prewarmer(debounce=0.2)
+
+    old = prewarmer.request("Draft", "Draft", ENGLISH, session="a")
+    new = prewarmer.request("Final", "Final", ENGLISH, session="a")
+    assert prewarmer.status(old) is None
+    wait_for(lambda: ready(prewarmer, new))
+    assert translated == ["Final"]
+
+
+def test_superseded_request_stops_before_translating(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    translated = []
+    monkeypatch.setattr(prewarm, "translate_text_groq", lambda message, code: translated.append(message))
+    prewarmer = Prewarmer(debounce=0)
+    check = prewarmer._check
+
+    def slow_check(key):
+        # Hold the first request between being picked up and translating
+        if not started.is_set():
+            started.set()
+            release.wait(5)
+        check(key)
+
+    monkeypatch.setattr(prewarmer, "_check", slow_check)
+    old = prewarmer.request("Draft", "Draft", ENGLISH, session="a")
+    assert started.wait(5)
+    new = prewarmer.request("Final", "Final", ENGLISH, session="a")
+    release.set()
+    wait_for(lambda: ready(prewarmer, new))
+    assert translated == ["Final"]
+    assert prewarmer.status(old) is None
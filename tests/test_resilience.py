@@ -0,0 +1,129 @@
+import types
+
+import pytest
+
+from outbound import resilience
+from outbound.resilience import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderError,
+    ProviderGuard,
+    ResilienceConfig,
+    RetryPolicy,
+    classify,
+)
+
+
+class ConnectTimeout(Exception):
+    pass
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+def guard(**overrides):
+    config = ResilienceConfig(policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0), **overrides)
+    return ProviderGuard("test", config)
+
+
+def test_classify():
+    throttled = classify(ProviderError("slow down", status_code=429, retry_after=3))
+    assert throttled.retryable and throttled.throttled and throttled.retry_after == 3
+    assert classify(types.SimpleNamespace(code=20429, status=None)).throttled  # Twilio's own rate limit
+    assert classify(ProviderError("down", status_code=503)).retryable
+    assert not classify(ProviderError("bad number", status_code=400)).retryable
+    assert not classify(ProviderError("bad number", status_code=400)).provider_fault
+    assert not classify(CircuitOpenError("test", 5)).retryable
+
+    # Placing a call is only repeated when the provider cannot have acted on it
+    assert not classify(ProviderError("down", status_code=503), idempotent=False).retryable
+    assert not classify(ReadTimeout(), idempotent=False).retryable
+    assert classify(ReadTimeout()).retryable
+    assert classify(ConnectTimeout(), idempotent=False).retryable
+
+
+def test_retry_delay_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(base_delay=0.5, max_delay=20.0)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3, 8)] == [0.5, 1.0, 2.0, 20.0]
+    assert policy.delay(1, retry_after=7) == 7
+    assert policy.delay(1, retry_after=60) == 20.0
+
+
+def test_retryable_errors_are_retried_and_others_raised_at_once():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ProviderError("down", status_code=502)
+        return "ok"
+
+    provider = guard()
+    assert provider.call(flaky) == "ok"
+    assert len(attempts) == 3 and provider.retries == 2
+
+    attempts.clear()
+
+    def rejected():
+        attempts.append(1)
+        raise ProviderError("bad key", status_code=401)
+
+    with pytest.raises(ProviderError):
+        provider.call(rejected)
+    assert len(attempts) == 1 and provider.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_and_lets_one_probe_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    assert breaker.retry_in() == 30
+
+    now[0] += 30
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 2
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_open_breaker_fails_fast():
+    provider = guard(failure_threshold=1)
+
+    def down():
+        raise ConnectionError("refused")
+
+    with pytest.raises(CircuitOpenError):
+        provider.call(down)
+    assert provider.calls == 1
+
+
+def test_limiter_halves_on_throttling_and_grows_on_healthy_latency(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=16)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4  # the same burst counts once
+
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert 4.9 < limiter.limit < 5
+    limiter.acquire()
+    limiter.release(latency=1.0)  # far slower than the best recent response
+    assert 4.9 < limiter.limit < 5
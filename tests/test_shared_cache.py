@@ -0,0 +1,83 @@
+import threading
+import time
+import types
+
+import pytest
+
+from outbound import shared_cache
+from outbound.shared_cache import SharedCache
+
+
+def test_concurrent_requests_share_one_computation():
+    cache = SharedCache("test", sizeof=lambda value: 1)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+    leader.start()
+    assert started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute))) for _ in range(4)]
+    for waiter in waiters:
+        waiter.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *waiters]:
+        thread.join(5)
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.get_or_compute("key", compute) == "value"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_errors_reach_waiters_and_are_not_cached():
+    cache = SharedCache("test")
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", lambda: (_ for _ in ()).throw(RuntimeError("provider down")))
+    assert cache.get_or_compute("key", lambda: "recovered") == "recovered"
+
+
+def test_uncacheable_results_are_not_kept():
+    cache = SharedCache("test")
+    cache.get_or_compute("key", lambda: None, cacheable=lambda value: value is not None)
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = SharedCache("test", max_bytes=10)
+    for key in ("a", "b", "c"):
+        cache.get_or_compute(key, lambda: b"1234")  # 4 bytes each
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_compute("b", lambda: b"miss") == b"1234"
+    assert cache.get_or_compute("a", lambda: b"miss") == b"miss"
+    # Too large to keep at all
+    assert cache.get_or_compute("huge", lambda: b"x" * 11) == b"x" * 11
+    assert cache.stats()["bytes"] <= 10 and cache.get_or_compute("huge", lambda: b"again") == b"again"
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(shared_cache, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    cache = SharedCache("test", ttl=60)
+    cache.get_or_compute("key", lambda: "old")
+    now[0] += 59
+    assert cache.get_or_compute("key", lambda: "new") == "old"
+    now[0] += 2
+    assert cache.get_or_compute("key", lambda: "new") == "new"
+
+
+def test_discard_forgets_a_stale_entry():
+    cache = SharedCache("test")
+    cache.get_or_compute("key", lambda: "old")
+    cache.discard("key")
+    assert cache.get_or_compute("key", lambda: "new") == "new"
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from outbound import tts
+from outbound.audio_buffer import AudioBuffer
+from outbound.audio_cache import get_audio_cache
+from outbound.config import configure
+
+
+def cache_for(settings):
+    return get_audio_cache(settings.audio_cache_dir, settings.audio_cache_max_bytes)
+
+
+def put_clip(settings, key, data):
+    buffer = AudioBuffer.from_bytes(data)
+    cache_for(settings).put_buffer(key, buffer, "mp3")
+    return key, buffer
+
+
+def test_stitch_joins_cached_clips_in_order(settings):
+    clips = [put_clip(settings, "clip-a", b"AAA"), put_clip(settings, "clip-b", b"BB")]
+    key, buffer = tts.stitch_audio(clips)
+    assert buffer.getvalue() == b"AAABB"
+    assert cache_for(settings).contains(key)
+
+
+def test_stitch_uses_the_buffer_of_an_evicted_clip(settings, tmp_path):
+    clips = [put_clip(settings, "clip-a", b"AAA"), put_clip(settings, "clip-b", b"BB")]
+    os.remove(cache_for(settings).get("clip-a"))
+    # A cache reconfigured to another directory has none of the clips
+    moved = configure(audio_cache_dir=str(tmp_path / "moved"))
+
+    key, buffer = tts.stitch_audio(clips)
+    assert buffer.getvalue() == b"AAABB"
+    assert cache_for(moved).contains("clip-a") and cache_for(moved).contains(key)
+
+
+def test_stitch_without_audio_for_an_evicted_clip_raises(settings):
+    clips = [put_clip(settings, "clip-a", b"AAA"), ("clip-gone", None)]
+    with pytest.raises(RuntimeError, match="evicted"):
+        tts.stitch_audio(clips)
+
+
+def test_shared_call_audio_drops_a_clip_the_disk_cache_evicted(settings, monkeypatch):
+    calls = []
+
+    def synthesize(text, voice_id):
+        calls.append(text)
+        return put_clip(settings, tts.call_audio_key(text, voice_id), b"audio")
+
+    monkeypatch.setattr(tts, "synthesize_call_audio", synthesize)
+    text = f"Evicted clip test {id(calls)}"
+    key, _ = tts.shared_call_audio(text, "voice")
+    tts.shared_call_audio(text, "voice")
+    assert len(calls) == 1
+
+    os.remove(cache_for(settings).get(key))
+    tts.shared_call_audio(text, "voice")
+    assert len(calls) == 2
@@ -0,0 +1,84 @@
+import types
+
+import pytest
+
+from outbound import translation
+from outbound.translation import stream_segments_groq, translate_segments_groq, translation_messages
+
+
+def completion(content):
+    message = types.SimpleNamespace(content=content)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def chunks(*deltas):
+    return [
+        types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=delta))])
+        for delta in deltas
+    ]
+
+
+@pytest.fixture
+def groq(settings, monkeypatch):
+    """Replies with ``groq.reply`` (a completion, or a list of streamed chunks) and records each request."""
+    state = types.SimpleNamespace(reply=None, requests=[])
+
+    def create(**kwargs):
+        state.requests.append(kwargs)
+        return state.reply
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    monkeypatch.setattr(translation, "get_groq_client", lambda api_key, base_url=None: client)
+    monkeypatch.setattr(translation, "call_with_resilience", lambda provider, fn, *args, **kwargs: fn(*args, **kwargs))
+    return state
+
+
+def test_segments_are_numbered_in_the_request():
+    prompt = translation_messages(["First.", "Second."], "Hindi")[1]["content"]
+    assert prompt.endswith("<1> First.\n<2> Second.")
+
+
+def test_segments_are_reassembled_by_marker(groq):
+    groq.reply = completion("<2> दूसरा।\n<1>  पहला। ")
+    assert translate_segments_groq(["First.", "Second."], "Hindi") == ["पहला।", "दूसरा।"]
+
+
+def test_segments_that_do_not_line_up_are_rejected(groq):
+    groq.reply = completion("<1> पहला। दूसरा।")
+    assert translate_segments_groq(["First.", "Second."], "Hindi") is None
+    groq.reply = completion("<1> पहला। <3> दूसरा।")
+    assert translate_segments_groq(["First.", "Second."], "Hindi") is None
+
+
+def test_a_single_segment_needs_no_markers(groq):
+    groq.reply = completion("  नमस्ते  ")
+    assert translate_segments_groq(["Hello"], "Hindi") == ["नमस्ते"]
+    assert "<1>" not in groq.requests[0]["messages"][1]["content"]
+
+
+def test_streamed_segments_are_yielded_as_each_completes(groq):
+    received = []
+
+    def stream():
+        # A marker split across chunks; each segment is complete once the next marker arrives
+        for chunk in chunks("<1", "> पहला।", " <", "2> दूसरा।", None, " <3> तीसरा।"):
+            yield chunk
+            received.append(chunk)
+
+    groq.reply = stream()
+    yielded = []
+    for position, part in stream_segments_groq(["First.", "Second.", "Third."], "Hindi"):
+        yielded.append((position, part, len(received)))
+    assert [(position, part) for position, part, _ in yielded] == [(0, "पहला।"), (1, "दूसरा।"), (2, "तीसरा।")]
+    # The first segment came out before the stream ended
+    assert yielded[0][2] < len(received)
+
+
+@pytest.mark.parametrize("deltas", [
+    ("<1> पहला। ", "<3> तीसरा। ", "<2> दूसरा।"),
+    ("<1> पहला। दूसरा।",),
+])
+def test_streamed_segments_that_do_not_line_up_raise(groq, deltas):
+    groq.reply = iter(chunks(*deltas))
+    with pytest.raises(ValueError):
+        list(stream_segments_groq(["First.", "Second."], "Hindi"))
@@ -0,0 +1,75 @@
+from outbound import translation_cache
+from outbound.text import normalize_text, split_sentences
+from outbound.translation_cache import TranslationCache, translate_with_memory, translation_cache_key
+
+
+def test_sentences_split_after_latin_and_devanagari_stops():
+    assert split_sentences("  Pay today.  Thank you!\nनमस्ते। धन्यवाद ") == ["Pay today.", "Thank you!", "नमस्ते।", "धन्यवाद"]
+    assert split_sentences("   ") == []
+    assert normalize_text(" a \n b ") == "a b"
+
+
+def test_keys_ignore_whitespace_but_not_language_model_or_prompt():
+    key = translation_cache_key("Pay  today.", "hi-IN", "model", 1)
+    assert key == translation_cache_key(" Pay today. ", "hi-IN", "model", 1)
+    assert len({
+        key,
+        translation_cache_key("Pay today.", "ta-IN", "model", 1),
+        translation_cache_key("Pay today.", "hi-IN", "other-model", 1),
+        translation_cache_key("Pay today.", "hi-IN", "model", 2),
+    }) == 4
+
+
+def test_entries_expire_after_their_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translation_cache.time, "time", lambda: now[0])
+    cache = TranslationCache(str(tmp_path / "translations.sqlite3"), ttl_seconds=60)
+    cache.put("key", "value")
+    assert cache.get("key") == "value"
+    now[0] += 61
+    assert cache.get("key") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translation_cache.time, "time", lambda: now[0])
+    cache = TranslationCache(str(tmp_path / "translations.sqlite3"), max_entries=2)
+    cache.put("a", "1")
+    now[0] += 1
+    cache.put("b", "2")
+    now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.stats()["entries"] == 2 and cache.evictions == 1
+
+
+def test_editing_one_sentence_translates_only_that_sentence(tmp_path):
+    cache = TranslationCache(str(tmp_path / "translations.sqlite3"))
+    requests = []
+
+    def translate_segments(segments):
+        requests.append(segments)
+        return [f"[{segment}]" for segment in segments]
+
+    def translate(text):
+        return translate_with_memory(text, "hi-IN", translate_segments, cache, "model", 1)
+
+    assert translate("Pay today. Thank you.") == "[Pay today.] [Thank you.]"
+    assert translate("Pay tomorrow. Thank you.") == "[Pay tomorrow.] [Thank you.]"
+    assert requests == [["Pay today.", "Thank you."], ["Pay tomorrow."]]
+    assert translate("Pay today.  Thank you.") == "[Pay today.] [Thank you.]"
+    assert len(requests) == 2
+
+
+def test_misaligned_sentences_fall_back_to_the_whole_message(tmp_path):
+    cache = TranslationCache(str(tmp_path / "translations.sqlite3"))
+
+    def translate_segments(segments):
+        return None if len(segments) > 1 else ["[whole]"]
+
+    assert translate_with_memory("Pay today. Thank you.", "hi-IN", translate_segments, cache, "model", 1) == "[whole]"
+    assert cache.get(translation_cache_key("Pay today.", "hi-IN", "model", 1)) is None
@@ -0,0 +1,81 @@
+import pytest
+
+from outbound import tts_router
+from outbound.resilience import ProviderError, configure_resilience
+from outbound.tts_router import ELEVENLABS, TWILIO, TtsRouter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    configure_resilience()  # a fresh ElevenLabs circuit breaker
+    now = [1000.0]
+    monkeypatch.setattr(tts_router.time, "monotonic", lambda: now[0])
+    return now
+
+
+def synthesize(router, clock, seconds, characters=100, error=None):
+    with router.observe(characters):
+        clock[0] += seconds
+        if error is not None:
+            raise error
+
+
+def test_slow_synthesis_switches_to_twilio_with_hysteresis(clock):
+    router = TtsRouter(max_latency=4.0, hold=30.0, smoothing=1.0)
+    synthesize(router, clock, 1.0)
+    assert router.choose(50) == ELEVENLABS
+
+    synthesize(router, clock, 6.0)
+    assert router.degraded == "slow"
+    assert router.choose(50) == ELEVENLABS  # a probe
+    assert router.choose(50) == TWILIO
+    assert router.choose(0) == ELEVENLABS  # cached audio is always played
+
+    clock[0] += 30.0
+    synthesize(router, clock, 3.5)  # under the limit, but not under it by the hysteresis
+    assert not router.available(50)
+    synthesize(router, clock, 2.0)
+    assert router.available(50) and router.degraded is None and router.switches == 2
+
+
+def test_a_stuck_request_counts_before_it_finishes(clock):
+    router = TtsRouter(max_latency=4.0)
+    with router.observe(100):
+        clock[0] += 5.0
+        assert not router.available(50)
+        assert router.degraded == "slow"
+
+
+def test_provider_errors_count_and_rejections_do_not(clock):
+    router = TtsRouter(max_error_rate=0.5, smoothing=0.5, min_samples=3)
+    for _ in range(3):
+        with pytest.raises(ProviderError):
+            synthesize(router, clock, 0.1, error=ProviderError("bad voice", status_code=400))
+    assert router.samples == 0 and router.available(50)
+
+    for _ in range(3):
+        with pytest.raises(ProviderError):
+            synthesize(router, clock, 0.1, error=ProviderError("overloaded", status_code=503))
+    assert router.degraded == "errors" and not router.available(50)
+
+
+def test_hourly_budget(clock):
+    router = TtsRouter(cost_per_character=0.001, hourly_budget=1.0)
+    synthesize(router, clock, 0.1, characters=800)
+    assert router.choose(100) == ELEVENLABS
+    assert router.choose(300) == TWILIO
+    with router.observe(500) as outcome:
+        outcome["cached"] = True  # cache hits cost nothing
+    assert router.stats()["spent_last_hour"] == pytest.approx(0.8)
+
+    clock[0] += 60 * 60 + 1
+    assert router.choose(300) == ELEVENLABS
+
+
+def test_fixed_policies(clock):
+    fixed = TtsRouter(policy="fixed", max_latency=1.0)
+    synthesize(fixed, clock, 5.0)
+    assert fixed.choose(100) == ELEVENLABS
+    assert TtsRouter(policy="twilio").choose(0) == TWILIO
+    with pytest.raises(ValueError):
+        TtsRouter(policy="cheapest")